@@ -9,6 +9,7 @@ from werkzeug.middleware.proxy_fix import ProxyFix  # Import ProxyFix
 from .config import config_by_name
 from zhipuai import ZhipuAI
 from .utils.log_context import ContextFilter
+from .utils.log_setup import install_queue_logging
 from .utils.time_utils import to_beijing_time
 
 # Initialize extensions
@@ -42,10 +43,16 @@ def create_app(config_name=None, config_overrides=None):
     formatter = logging.Formatter(log_format)
     for handler in app.logger.handlers:
         handler.setFormatter(formatter)
+        # 子日志器（如 app.utils.confidence_core）的记录只经过处理器的过滤器，
+        # 处理器上也需要注入 context 字段
+        handler.addFilter(ContextFilter())
     
     if config_overrides:
         app.config.update(config_overrides)
 
+    # 日志写入移到后台线程（QueueHandler + QueueListener），并按配置设置级别与原始载荷抽样率
+    install_queue_logging(app)
+
     # Initialize extensions with the app
     db.init_app(app)
     login_manager.init_app(app)
@@ -38,8 +38,69 @@ class Config:
     TIANDITU_KEY = os.environ.get('TIANDITU_KEY')
     ZHIPUAI_KEY = os.environ.get('ZHIPUAI_KEY')
     
+    # Logging：LOG_LEVEL 为空时沿用 Flask 默认级别；第三方API原始请求/响应按抽样率记录（0 表示不记录）
+    LOG_LEVEL = os.environ.get('LOG_LEVEL')
+    LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get('LOG_PAYLOAD_SAMPLE_RATE', 0.01))
+    LOG_PAYLOAD_MAX_CHARS = int(os.environ.get('LOG_PAYLOAD_MAX_CHARS', 2000))
+    LOG_USE_QUEUE = os.environ.get('LOG_USE_QUEUE', 'true').lower() in ['true', '1', 't']
+
     # Application constants
     REQUIRED_CONFIDENCE_THRESHOLD = 0.9
+    # POI置信度剪枝：只保证前 K 名候选的置信度为精确值（None 表示全部精确计算），
+    # 上界低于 FLOOR 的候选也跳过精确计算
+    POI_CONFIDENCE_TOP_K = int(os.environ.get('POI_CONFIDENCE_TOP_K', 5))
+    POI_CONFIDENCE_FLOOR = float(os.environ.get('POI_CONFIDENCE_FLOOR', 0.0))
+    # POI搜索结果缓存：按搜索源设置 TTL（秒），空结果使用较短的 TTL，超过条目上限时淘汰最久未使用的
+    POI_CACHE_TTL = {
+        'amap': int(os.environ.get('POI_CACHE_TTL_AMAP', 6 * 3600)),
+        'baidu': int(os.environ.get('POI_CACHE_TTL_BAIDU', 6 * 3600)),
+        'tianditu': int(os.environ.get('POI_CACHE_TTL_TIANDITU', 24 * 3600)),
+    }
+    POI_CACHE_NEGATIVE_TTL = int(os.environ.get('POI_CACHE_NEGATIVE_TTL', 10 * 60))
+    POI_CACHE_MAX_ENTRIES = int(os.environ.get('POI_CACHE_MAX_ENTRIES', 5000))
+    # POI分页：返回某页时后台预取下一页，最多预取到第 N 页（0 表示不预取）
+    POI_PREFETCH_MAX_PAGE = int(os.environ.get('POI_PREFETCH_MAX_PAGE', 2))
+    # 服务端批量智能校准：同时处理的行数上限（限制POI与LLM的并发调用）与单次任务的行数上限
+    SMART_CALIBRATION_MAX_CONCURRENCY = int(os.environ.get('SMART_CALIBRATION_MAX_CONCURRENCY', 4))
+    SMART_CALIBRATION_MAX_ROWS = int(os.environ.get('SMART_CALIBRATION_MAX_ROWS', 2000))
+    # 网络情报（本地搜狗抓取）：整体截止时间（秒），到时仍未抓取完正文的结果只保留搜索页上的标题与简介；
+    # 同一主机同时进行的请求数上限
+    WEB_SEARCH_DEADLINE_SECONDS = float(os.environ.get('WEB_SEARCH_DEADLINE_SECONDS', 20))
+    WEB_SEARCH_PER_HOST_LIMIT = int(os.environ.get('WEB_SEARCH_PER_HOST_LIMIT', 4))
+    # 单个网页正文最多读取的字节数，超出部分不再下载与解析
+    WEB_ARTICLE_MAX_BYTES = int(os.environ.get('WEB_ARTICLE_MAX_BYTES', 512 * 1024))
+    # 网络情报磁盘缓存：搜索页解析结果、跳转后的真实链接、正文文本各自的 TTL（秒）；WEB_CACHE_DIR 置空则不缓存
+    WEB_CACHE_DIR = os.environ.get('WEB_CACHE_DIR', os.path.join(_PROJECT_ROOT, 'cache', 'web'))
+    WEB_CACHE_TTL = {
+        'serp': int(os.environ.get('WEB_CACHE_TTL_SERP', 6 * 3600)),
+        'redirect': int(os.environ.get('WEB_CACHE_TTL_REDIRECT', 7 * 24 * 3600)),
+        'article': int(os.environ.get('WEB_CACHE_TTL_ARTICLE', 3 * 24 * 3600)),
+    }
+    # 网络情报档案的服务端存储：按 id 保存并以标准化地址建立索引，TTL 内同一地址直接复用（DOSSIER_CACHE_DIR 置空则不保存）
+    DOSSIER_CACHE_DIR = os.environ.get('DOSSIER_CACHE_DIR', os.path.join(_PROJECT_ROOT, 'cache', 'dossier'))
+    DOSSIER_CACHE_TTL = int(os.environ.get('DOSSIER_CACHE_TTL', 24 * 3600))
+    # 网络情报LLM摘录：同时进行的LLM调用数上限；有效摘录达到该数量即开始聚合（0 表示等待全部网页摘录完成）
+    WEB_INTEL_LLM_CONCURRENCY = int(os.environ.get('WEB_INTEL_LLM_CONCURRENCY', 4))
+    WEB_INTEL_AGGREGATE_MIN_EXCERPTS = int(os.environ.get('WEB_INTEL_AGGREGATE_MIN_EXCERPTS', 5))
+    # 单次LLM接口调用的总超时（秒），超时后按重试次数重新调用
+    LLM_REQUEST_TIMEOUT = float(os.environ.get('LLM_REQUEST_TIMEOUT', 60))
+    # LLM全局调度：同时进行的调用数上限、单个用户的并发上限、每分钟滚动 token 预算（0 表示不限），
+    # 以及只留给交互请求（选点、网络情报等）的名额数，批量任务（智能校准、语义预分析）只使用剩余名额；
+    # 上游返回 429 限流时暂停放行的秒数
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 8))
+    LLM_PER_USER_CONCURRENCY = int(os.environ.get('LLM_PER_USER_CONCURRENCY', 4))
+    LLM_TOKENS_PER_MINUTE = int(os.environ.get('LLM_TOKENS_PER_MINUTE', 200000))
+    LLM_INTERACTIVE_RESERVE = int(os.environ.get('LLM_INTERACTIVE_RESERVE', 2))
+    LLM_RATE_LIMIT_PAUSE = float(os.environ.get('LLM_RATE_LIMIT_PAUSE', 5))
+    # LLM响应持久缓存：按模型+系统提示词+提示词的指纹缓存成功的响应，命中时不计费（LLM_CACHE_DIR 置空则不缓存）
+    LLM_CACHE_DIR = os.environ.get('LLM_CACHE_DIR', os.path.join(_PROJECT_ROOT, 'cache', 'llm'))
+    LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', 7 * 24 * 3600))
+    LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 20000))
+    # 调用LLM前的本地句子筛选：每个网页正文、POI验证时的情报背景各自保留的 token 预算
+    WEB_INTEL_PAGE_TOKEN_BUDGET = int(os.environ.get('WEB_INTEL_PAGE_TOKEN_BUDGET', 600))
+    WEB_INTEL_BACKGROUND_TOKEN_BUDGET = int(os.environ.get('WEB_INTEL_BACKGROUND_TOKEN_BUDGET', 500))
+    # 批量智能校准时每次LLM调用打包决策的地址数（共用一份系统提示词；≤1 表示逐条调用）
+    LLM_SELECT_PACK_SIZE = int(os.environ.get('LLM_SELECT_PACK_SIZE', 5))
     NO_PASSWORD_PLACEHOLDER = 'NO_PASSWORD_SMS_LOGIN'
     
     # Session/Cookie settings (to keep session across subdomains when configured)
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, jsonify, flash, redirect,
 from flask_login import login_required, current_user
 from ..models import LocationType, User, GeocodingTask, AddressLog, Task
 from .. import db
+from ..services import llm_service
 from functools import wraps
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
@@ -139,3 +140,15 @@ def user_tasks():
 def user_task_details(task_id):
     task = Task.query.get_or_404(task_id)
     return render_template('admin/user_task_details.html', task=task)
+
+@admin_bp.route('/llm_cache_stats')
+@admin_required
+def llm_cache_stats():
+    """当前进程的LLM响应缓存统计（命中率、节省的 token 数等）。"""
+    return jsonify({'success': True, 'stats': llm_service.llm_cache_stats()})
+
+@admin_bp.route('/llm_scheduler_stats')
+@admin_required
+def llm_scheduler_stats():
+    """当前进程的LLM调度器状态（进行中/排队的请求数、窗口内 token 用量、限流暂停剩余时间）。"""
+    return jsonify({'success': True, 'stats': llm_service.llm_scheduler_stats()})
@@ -1,20 +1,27 @@
 import asyncio
+import base64
+import io
 import re
 import json
 import time
 import os
+import shutil
+import tempfile
+import unicodedata
 from datetime import datetime
+from urllib.parse import quote
 import jionlp as jio
 
-from flask import Blueprint, request, jsonify, session, current_app, send_file
+from flask import Blueprint, request, jsonify, session, current_app, send_file, Response, stream_with_context
 from flask_login import login_required, current_user
+from werkzeug.datastructures import Headers
 
 from ..services import geocoding_apis, poi_search, llm_service
-from ..services.web_search_local import search_sogou
-from ..utils import geo_transforms, decorators, api_managers, address_processing
+from ..services.web_search_local import search_sogou_async
+from ..utils import geo_transforms, decorators, api_managers, address_processing, coordinate_stream, gcj02_grid, poi_merge, http_client, llm_scheduler, sentence_rank, stream_parse
 from ..utils.log_context import request_context_var
 from ..models import LocationType, User, ApiRequestLog, db, GeocodingTask, AddressLog
-from ..services import user_service
+from ..services import user_service, task_service, dossier_store
 
 geocoding_bp = Blueprint('geocoding', __name__, url_prefix='/geocode')
 
@@ -343,7 +350,9 @@ async def _process_batch_geocoding_async(raw_addresses, user_id, debug: bool = F
     try:
         current_app.logger.info("开始批量语义预分析...")
         completed_addresses = [item['completed_address'] for item in pre_processed_data]
-        semantic_analysis_result = await llm_service.batch_semantic_analysis(completed_addresses)
+        # 语义预分析按批量优先级调度，不挤占交互式LLM调用的名额
+        with llm_scheduler.scope(priority=llm_scheduler.PRIORITY_BATCH):
+            semantic_analysis_result = await llm_service.batch_semantic_analysis(completed_addresses)
         if semantic_analysis_result and not semantic_analysis_result.get('error'):
             current_app.logger.info(f"批量语义预分析完成，主题名称: {semantic_analysis_result.get('theme_name', '未知')}")
         else:
@@ -536,7 +545,7 @@ def geocode_address_batch():
         # Debug flag
         debug = bool(data.get('debug'))
         # Run the async core logic
-        response_data = asyncio.run(_process_batch_geocoding_async(raw_addresses, user_id, debug))
+        response_data = http_client.run(_process_batch_geocoding_async(raw_addresses, user_id, debug))
         
         # 构造响应，确保向后兼容
         return jsonify({
@@ -551,149 +560,327 @@ def geocode_address_batch():
         return jsonify({'success': False, 'results': [], 'message': f'服务器内部错误: {str(e)}'}), 500
 
 # === Web Intelligence (三步骤) 路由 ===
+_WI_VALID_EXCERPT_PATTERN = re.compile(r"位于|坐落|地处|隶属|行政区|省|市|县|区|镇|乡|街道|大道|公路|道路|路|巷|村|社区|附近|坐标")
+
+
+def _wi_extraction_prompt(original_address, title, truncated):
+    return (
+        f"请仅从下方网页‘原文正文’中，逐条摘录与“{original_address}”相关的地理定位信息的‘原句’，不要改写。\n"
+        f"覆盖要点（尽可能多地抓取，不编造）：\n"
+        f"- 位置与行政区层级：位于/坐落/隶属/省市县区镇/街道/社区等\n"
+        f"- 范围与边界：范围/边界描述/面积/范围内的道路或河流\n"
+        f"- 相邻/关联地标与交通：附近地标/渡口/桥梁/道路/河流/方向关系\n"
+        f"- 内部构成：范围内的街道、建筑、节点（如‘南胜街、西门街、城内街…’）\n"
+        f"输出要求：\n"
+        f"1) 只输出网页‘原文句子’，每条一行；\n"
+        f"2) 优先含有‘位于/坐落/隶属/范围/边界/面积/渡口/大桥/街/路/河’等关键词；\n"
+        f"3) 期望返回 5-12 条，若确无相关信息，仅输出：无相关信息。\n\n"
+        f"[网页标题]\n{title}\n\n[原文正文节选]\n{truncated}"
+    )
+
+
+async def _wi_extract_excerpt(idx, item, original_address, semaphore, use_cache=True):
+    """对单条搜索结果调用LLM摘录定位相关原句，无有效内容时返回 None。"""
+    raw_content = (item.get('raw_content') or '').strip()
+    title = item.get('title') or ''
+    url = item.get('url') or ''
+
+    # 构造提示词：只保留正文中与地址最相关的句子（按原文顺序，控制在 token 预算内）
+    truncated = sentence_rank.select_relevant_text(
+        original_address, raw_content, current_app.config.get('WEB_INTEL_PAGE_TOKEN_BUDGET', 600)
+    )
+    llm_prompt = _wi_extraction_prompt(original_address, title, truncated)
+
+    # 调用LLM（使用现有的聊天接口而非联网搜索）
+    try:
+        async with semaphore:
+            llm_resp = await llm_service.call_llm_api(llm_prompt, use_cache=use_cache)
+        llm_text = (llm_resp or {}).get('content') or ''
+    except Exception as e:
+        current_app.logger.error(f"[WI][Sogou][llm-fail] #{idx+1} {title}: {e}")
+        llm_text = ''
+
+    # 后台记录：原文、提示词、结果
+    current_app.logger.info(
+        f"\n[WI][Sogou][#{idx+1}] URL: {url}\n[RAW]\n{truncated}\n\n[PROMPT]\n{llm_prompt}\n\n[LLM]\n{llm_text}\n"
+    )
+
+    # 有效性判断（简单启发式）
+    if not llm_text or '无相关信息' in llm_text or not _WI_VALID_EXCERPT_PATTERN.search(llm_text):
+        return None
+    return {
+        'title': title,
+        'url': url,
+        'excerpt': llm_text.strip(),
+        'sources': [url] if url else [],
+        'debug': {
+            'raw_content': truncated,
+            'llm_prompt': llm_prompt,
+            'llm_output': llm_text
+        }
+    }
+
+
+def _resolve_dossier(data):
+    """
+    优先按 dossier_id 读取服务端保存的档案，找不到时退回请求体中的 dossier。
+    只给了 dossier_id 且档案已过期时返回 None。
+    """
+    dossier_id = data.get('dossier_id')
+    if dossier_id:
+        dossier = dossier_store.get_dossier(dossier_id)
+        if dossier is not None:
+            return dossier
+        if not data.get('dossier'):
+            return None
+    return data.get('dossier') or {}
+
+
+async def _wi_collect_excerpts(sogou_items, original_address, use_cache=True):
+    """
+    并发地对各条搜索结果做LLM摘录（同时进行的调用数受 WEB_INTEL_LLM_CONCURRENCY 限制）。
+    有效摘录数达到 WEB_INTEL_AGGREGATE_MIN_EXCERPTS 时取消其余调用并立即返回，以便尽早开始聚合；
+    该值为 0 时等待全部完成。返回结果保持搜索结果的原始顺序。
+    """
+    concurrency = max(1, int(current_app.config.get('WEB_INTEL_LLM_CONCURRENCY', 4)))
+    enough = int(current_app.config.get('WEB_INTEL_AGGREGATE_MIN_EXCERPTS', 5))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    tasks = {}
+    for idx, item in enumerate(sogou_items):
+        if len((item.get('raw_content') or '').strip()) < 80:
+            # 原文过短，跳过
+            current_app.logger.info(f"[WI][Sogou][skip-short] #{idx+1} {item.get('title') or ''} {item.get('url') or ''}")
+            continue
+        tasks[asyncio.ensure_future(_wi_extract_excerpt(idx, item, original_address, semaphore, use_cache))] = idx
+
+    collated = {}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                excerpt = task.result()
+                if excerpt:
+                    collated[tasks[task]] = excerpt
+            if enough > 0 and len(collated) >= enough and pending:
+                current_app.logger.info(
+                    f"[WI] 已获得 {len(collated)} 条有效摘录，跳过其余 {len(pending)} 条LLM摘录，开始聚合。"
+                )
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    return [collated[idx] for idx in sorted(collated)]
+
+
+def _wi_aggregate_prompt(original_address, agg_input_lines):
+    """第二步：聚合去重（将前面所有摘录统一给LLM，去掉重复，合并相似，尽量保留不同信息）。"""
+    return (
+        f"以下是从多个网页中摘取的与“{original_address}”相关的‘原文句子’列表。\n"
+        f"任务：去重并合并表述相同或近似的信息，尽量保留不同信息；若两句信息量不同，保留信息更全的一句；保持原文风格，不要改写或编造。\n"
+        f"输出要求：\n"
+        f"- 仅输出合并后的句子清单，每行一句；\n"
+        f"- 建议返回 8-20 条；\n"
+        f"- 若没有有效内容，请输出：无相关信息。\n\n"
+        f"[原句列表]\n{chr(10).join(agg_input_lines)}"
+    )
+
+
+def _wi_aggregate_line(line):
+    """清理聚合输出中的一行，空行或“无相关信息”返回 None。"""
+    if not line.strip() or '无相关信息' in line:
+        return None
+    return line.strip('- ').strip() or None
+
+
+def _wi_excerpt_with_sources(line, collated):
+    """将聚合结果映射回来源URL（简单子串匹配聚合来源）。"""
+    src_urls = []
+    for itm in collated:
+        ex = itm.get('excerpt','')
+        if not ex:
+            continue
+        if line in ex or ex in line:
+            for u in (itm.get('sources') or []):
+                if u and u not in src_urls:
+                    src_urls.append(u)
+    return {'excerpt': line, 'sources': src_urls}
+
+
+def _wi_finish_collate(original_address, sogou_items, collated, final_excerpts, agg_prompt, agg_input_count):
+    """组装情报档案、计费并保存，返回响应数据（流式与非流式接口共用）。"""
+    dossier = {
+        'original_address': original_address,
+        'web_search_results_count': len(sogou_items),
+        'collated_excerpts': final_excerpts if final_excerpts else collated,
+        'source': 'sogou_local',
+        'debug': {
+            'aggregate_prompt': agg_prompt,
+            'aggregate_input_count': agg_input_count
+        }
+    }
+
+    # 新策略：网络搜索（本地搜狗抓取也视为“网络搜索”）按 2 分计费
+    try:
+        if current_user.is_authenticated:
+            user_id = current_user.id
+            points_to_deduct = get_points_cost('web_search', used_user_key=False)
+            if points_to_deduct and points_to_deduct > 0:
+                deduct_points(user_id, points_to_deduct)
+                current_app.logger.info(f"计费：网络搜索 扣除 {points_to_deduct} 积分。")
+    except Exception as e:
+        current_app.logger.error(f"网络搜索扣分异常: {e}")
+
+    if not (final_excerpts or collated):
+        return {'success': False, 'dossier': dossier, 'message': '未提取到有效定位信息'}
+    dossier_store.save_dossier(dossier)
+    return {'success': True, 'dossier': dossier, 'cached': False, 'message': None}
+
+
+def _sse(event, data):
+    """格式化一条 Server-Sent Events 消息。"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _sse_response(agen, error_message):
+    """
+    以 text/event-stream 流式返回异步生成器产出的 (event, data)；
+    生成过程中出现异常时发送 error 事件（message 以 error_message 开头）后结束。
+    """
+    def _generate():
+        try:
+            for event, data in http_client.iterate(agen):
+                yield _sse(event, data)
+        except Exception as e:
+            current_app.logger.error(f"{error_message}: {e}", exc_info=True)
+            yield _sse('error', {'success': False, 'message': f'{error_message}: {str(e)}'})
+
+    return Response(stream_with_context(_generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @geocoding_bp.route('/web_intelligence/search_collate', methods=['POST'])
-def wi_search_collate():
+@decorators.async_route
+async def wi_search_collate():
     try:
         data = request.get_json() or {}
         original_address = data.get('original_address', '').strip()
         if not original_address:
             return jsonify({'success': False, 'message': 'original_address 不能为空'}), 400
 
+        # 同一地址在有效期内已有档案时直接返回，不再搜索与调用LLM，也不计费；
+        # refresh=true 强制重新搜集，同时绕过LLM响应缓存
+        refresh = bool(data.get('refresh'))
+        if not refresh:
+            cached_dossier = dossier_store.find_dossier_by_address(original_address)
+            if cached_dossier is not None:
+                current_app.logger.info(f"[WI-CACHE] 复用情报档案 {cached_dossier.get('dossier_id')}: '{original_address}'")
+                return jsonify({'success': True, 'dossier': cached_dossier, 'cached': True, 'message': None})
+
         current_app.logger.info(f"[WI-START] Starting web intelligence search for address: '{original_address}'")
 
         # 根据需求：直接跳过联网LLM与DuckDuckGo，走本地搜狗抓取
-        sogou_items = search_sogou(original_address, max_results=8)
+        sogou_items = await search_sogou_async(original_address, max_results=8)
 
         # 针对每条结果：记录原文、构造LLM提示词、调用LLM做摘录、判断是否有效
-        collated = []
-        for idx, item in enumerate(sogou_items):
-            raw_content = (item.get('raw_content') or '').strip()
-            title = item.get('title') or ''
-            url = item.get('url') or ''
-
-            if not raw_content or len(raw_content) < 80:
-                # 原文过短，跳过
-                current_app.logger.info(f"[WI][Sogou][skip-short] #{idx+1} {title} {url}")
-                continue
-
-            # 构造提示词（按长度截断）
-            truncated = raw_content[:2500]
-            llm_prompt = (
-                f"请仅从下方网页‘原文正文’中，逐条摘录与“{original_address}”相关的地理定位信息的‘原句’，不要改写。\n"
-                f"覆盖要点（尽可能多地抓取，不编造）：\n"
-                f"- 位置与行政区层级：位于/坐落/隶属/省市县区镇/街道/社区等\n"
-                f"- 范围与边界：范围/边界描述/面积/范围内的道路或河流\n"
-                f"- 相邻/关联地标与交通：附近地标/渡口/桥梁/道路/河流/方向关系\n"
-                f"- 内部构成：范围内的街道、建筑、节点（如‘南胜街、西门街、城内街…’）\n"
-                f"输出要求：\n"
-                f"1) 只输出网页‘原文句子’，每条一行；\n"
-                f"2) 优先含有‘位于/坐落/隶属/范围/边界/面积/渡口/大桥/街/路/河’等关键词；\n"
-                f"3) 期望返回 5-12 条，若确无相关信息，仅输出：无相关信息。\n\n"
-                f"[网页标题]\n{title}\n\n[原文正文节选]\n{truncated}"
-            )
-
-            # 调用LLM（使用现有的聊天接口而非联网搜索）
-            try:
-                llm_resp = asyncio.run(llm_service.call_llm_api(llm_prompt))
-                llm_text = (llm_resp or {}).get('content') or ''
-            except Exception as e:
-                current_app.logger.error(f"[WI][Sogou][llm-fail] #{idx+1} {title}: {e}")
-                llm_text = ''
+        collated = await _wi_collect_excerpts(sogou_items, original_address, use_cache=not refresh)
 
-            # 后台记录：原文、提示词、结果
-            current_app.logger.info(
-                f"\n[WI][Sogou][#{idx+1}] URL: {url}\n[RAW]\n{truncated}\n\n[PROMPT]\n{llm_prompt}\n\n[LLM]\n{llm_text}\n"
-            )
-
-            # 有效性判断（简单启发式）
-            has_valid = False
-            if llm_text and ('无相关信息' not in llm_text):
-                if re.search(r"位于|坐落|地处|隶属|行政区|省|市|县|区|镇|乡|街道|大道|公路|道路|路|巷|村|社区|附近|坐标", llm_text):
-                    has_valid = True
-
-            if has_valid:
-                collated.append({
-                    'title': title,
-                    'url': url,
-                    'excerpt': llm_text.strip(),
-                    'sources': [url] if url else [],
-                    'debug': {
-                        'raw_content': truncated,
-                        'llm_prompt': llm_prompt,
-                        'llm_output': llm_text
-                    }
-                })
-
-        # 第二步：聚合去重（将前面所有摘录统一给LLM，去掉重复，合并相似，尽量保留不同信息）
         agg_input_lines = [f"- {itm.get('excerpt','').strip()}" for itm in collated if itm.get('excerpt')]
-        agg_prompt = (
-            f"以下是从多个网页中摘取的与“{original_address}”相关的‘原文句子’列表。\n"
-            f"任务：去重并合并表述相同或近似的信息，尽量保留不同信息；若两句信息量不同，保留信息更全的一句；保持原文风格，不要改写或编造。\n"
-            f"输出要求：\n"
-            f"- 仅输出合并后的句子清单，每行一句；\n"
-            f"- 建议返回 8-20 条；\n"
-            f"- 若没有有效内容，请输出：无相关信息。\n\n"
-            f"[原句列表]\n{chr(10).join(agg_input_lines)}"
-        )
+        agg_prompt = _wi_aggregate_prompt(original_address, agg_input_lines)
 
         final_lines: list[str] = []
         if agg_input_lines:
             try:
-                agg_resp = asyncio.run(llm_service.call_llm_api(agg_prompt))
+                agg_resp = await llm_service.call_llm_api(agg_prompt, use_cache=not refresh)
                 agg_text = (agg_resp or {}).get('content') or ''
-                final_lines = [ln.strip('- ').strip() for ln in agg_text.split('\n') if ln.strip() and '无相关信息' not in ln]
+                final_lines = [ln for ln in map(_wi_aggregate_line, agg_text.split('\n')) if ln]
             except Exception as e:
                 current_app.logger.error(f"[WI][Aggregate][llm-fail] {e}")
 
-        # 将聚合结果映射回来源URL（简单子串匹配聚合来源）
-        final_excerpts = []
-        for line in final_lines:
-            src_urls = []
-            for itm in collated:
-                ex = itm.get('excerpt','')
-                if not ex:
-                    continue
-                if line in ex or ex in line:
-                    for u in (itm.get('sources') or []):
-                        if u and u not in src_urls:
-                            src_urls.append(u)
-            final_excerpts.append({'excerpt': line, 'sources': src_urls})
-
-        dossier = {
-            'original_address': original_address,
-            'web_search_results_count': len(sogou_items),
-            'collated_excerpts': final_excerpts if final_excerpts else collated,
-            'source': 'sogou_local',
-            'debug': {
-                'aggregate_prompt': agg_prompt,
-                'aggregate_input_count': len(agg_input_lines)
-            }
-        }
-
-        # 新策略：网络搜索（本地搜狗抓取也视为“网络搜索”）按 2 分计费
-        try:
-            if current_user.is_authenticated:
-                user_id = current_user.id
-                points_to_deduct = get_points_cost('web_search', used_user_key=False)
-                if points_to_deduct and points_to_deduct > 0:
-                    deduct_points(user_id, points_to_deduct)
-                    current_app.logger.info(f"计费：网络搜索 扣除 {points_to_deduct} 积分。")
-        except Exception as e:
-            current_app.logger.error(f"网络搜索扣分异常: {e}")
-
-        if not (final_excerpts or collated):
-            return jsonify({'success': False, 'dossier': dossier, 'message': '未提取到有效定位信息'}), 200
-        return jsonify({'success': True, 'dossier': dossier, 'message': None})
+        final_excerpts = [_wi_excerpt_with_sources(line, collated) for line in final_lines]
+        return jsonify(_wi_finish_collate(
+            original_address, sogou_items, collated, final_excerpts, agg_prompt, len(agg_input_lines)
+        ))
     except Exception as e:
         current_app.logger.error(f"/web_intelligence/search_collate 异常: {e}")
         return jsonify({'success': False, 'message': f'服务器内部错误: {str(e)}'}), 500
 
 
+@geocoding_bp.route('/web_intelligence/search_collate_stream', methods=['POST'])
+def wi_search_collate_stream():
+    """
+    search_collate 的流式版本（text/event-stream），参数相同。依次发送：
+        event: progress  {"stage": "search" | "extract" | "aggregate", ...}
+        event: excerpt   {"excerpt": ..., "sources": [...]}   聚合结果每生成一行即发送
+        event: aggregate_incomplete  {"message": ..., "discarded": n}   聚合中途失败：已发送的 excerpt 作废，
+                         与 search_collate 一样改用未聚合的摘录
+        event: done      与 search_collate 的响应相同
+    同一地址已有档案时只发送 done；出错时发送 error。
+    """
+    data = request.get_json(silent=True) or {}
+    original_address = (data.get('original_address') or '').strip()
+    if not original_address:
+        return jsonify({'success': False, 'message': 'original_address 不能为空'}), 400
+    refresh = bool(data.get('refresh'))
+
+    async def _events():
+        if not refresh:
+            cached_dossier = dossier_store.find_dossier_by_address(original_address)
+            if cached_dossier is not None:
+                current_app.logger.info(f"[WI-CACHE] 复用情报档案 {cached_dossier.get('dossier_id')}: '{original_address}'")
+                yield 'done', {'success': True, 'dossier': cached_dossier, 'cached': True, 'message': None}
+                return
+
+        current_app.logger.info(f"[WI-START] Starting streamed web intelligence search for address: '{original_address}'")
+        yield 'progress', {'stage': 'search'}
+        sogou_items = await search_sogou_async(original_address, max_results=8)
+        yield 'progress', {'stage': 'extract', 'results': len(sogou_items)}
+        collated = await _wi_collect_excerpts(sogou_items, original_address, use_cache=not refresh)
+
+        agg_input_lines = [f"- {itm.get('excerpt','').strip()}" for itm in collated if itm.get('excerpt')]
+        agg_prompt = _wi_aggregate_prompt(original_address, agg_input_lines)
+        yield 'progress', {'stage': 'aggregate', 'excerpts': len(agg_input_lines)}
+
+        final_excerpts = []
+        if agg_input_lines:
+            lines = stream_parse.LineAssembler()
+            async for chunk in llm_service.stream_llm_api(agg_prompt, use_cache=not refresh):
+                if chunk.get('done') and chunk.get('error'):
+                    # 聚合不完整：丢弃已生成的行，避免把残缺结果保存为档案
+                    current_app.logger.error(f"[WI][Aggregate][llm-fail] {chunk['error']}")
+                    yield 'aggregate_incomplete', {
+                        'message': '汇总未完成，已改用未汇总的网页摘录',
+                        'discarded': len(final_excerpts),
+                    }
+                    final_excerpts = []
+                    break
+                if chunk.get('done'):
+                    completed = lines.flush()
+                else:
+                    completed = lines.feed(chunk['delta'])
+                for line in filter(None, map(_wi_aggregate_line, completed)):
+                    excerpt = _wi_excerpt_with_sources(line, collated)
+                    final_excerpts.append(excerpt)
+                    yield 'excerpt', excerpt
+
+        yield 'done', _wi_finish_collate(
+            original_address, sogou_items, collated, final_excerpts, agg_prompt, len(agg_input_lines)
+        )
+
+    return _sse_response(_events(), '/web_intelligence/search_collate_stream 异常')
+
+
 @geocoding_bp.route('/web_intelligence/validate_candidates', methods=['POST'])
 def wi_validate_candidates():
     try:
         data = request.get_json() or {}
-        dossier = data.get('dossier') or {}
+        dossier = _resolve_dossier(data)
+        if dossier is None:
+            return jsonify({'success': False, 'message': '情报档案不存在或已过期，请重新搜集'}), 404
         poi_candidates = data.get('poi_candidates') or []
         if not poi_candidates:
             return jsonify({'success': False, 'message': 'poi_candidates 不能为空'}), 400
@@ -701,7 +888,9 @@ def wi_validate_candidates():
         original_address = dossier.get('original_address') or ''
 
         # 使用LLM结合情报进行验证
-        decision = asyncio.run(llm_service.validate_poi_with_dossier(original_address, poi_candidates, dossier))
+        decision = http_client.run(llm_service.validate_poi_with_dossier(
+            original_address, poi_candidates, dossier, use_cache=not data.get('bypass_cache')
+        ))
 
         response_payload = {
             'success': True,
@@ -710,14 +899,15 @@ def wi_validate_candidates():
             'selected_poi': (poi_candidates[decision['best_match_index']] if (decision.get('has_match') and isinstance(decision.get('best_match_index'), int) and 0 <= decision['best_match_index'] < len(poi_candidates)) else None),
             'match_confidence': float(decision.get('match_confidence') or 0.0),
             'validation_reason': decision.get('validation_reason') or '',
-            'mismatch_reasons': decision.get('mismatch_reasons') or []
+            'mismatch_reasons': decision.get('mismatch_reasons') or [],
+            'cached': bool(decision.get('cached'))
         }
-        # 新策略：本接口会触发一次 LLM 调用，按 2 分计费
+        # 新策略：本接口会触发一次 LLM 调用，按 2 分计费（命中LLM响应缓存时不计费）
         try:
             if current_user.is_authenticated:
                 user_id = current_user.id
                 points_to_deduct = get_points_cost('llm_call', used_user_key=False)
-                if points_to_deduct and points_to_deduct > 0:
+                if points_to_deduct and points_to_deduct > 0 and not decision.get('cached'):
                     deduct_points(user_id, points_to_deduct)
                     current_app.logger.info(f"计费：POI验证 LLM 扣除 {points_to_deduct} 积分。")
                 
@@ -736,38 +926,8 @@ def wi_validate_candidates():
         return jsonify({'success': False, 'message': f'服务器内部错误: {str(e)}'}), 500
 
 
-@geocoding_bp.route('/web_intelligence/suggest_keywords', methods=['POST'])
-def wi_suggest_keywords():
-    try:
-        data = request.get_json() or {}
-        original_address = (data.get('original_address') or '').strip()
-        dossier = data.get('dossier') or {}
-        mismatch_reasons = data.get('mismatch_reasons') or []
-
-        # 优先：调用LLM生成关键词（JSON）
-        excerpts = []
-        try:
-            for it in (dossier.get('collated_excerpts') or [])[:15]:
-                ex = (it.get('excerpt') or '').strip()
-                if ex:
-                    excerpts.append(f"- {ex}")
-        except Exception:
-            pass
-        bg_str = "\n".join(excerpts) if excerpts else '（无）'
-
-        # 解析行政区，便于生成完整可搜索地址
-        try:
-            parsed_admin = jio.parse_location(original_address)
-        except Exception:
-            parsed_admin = {}
-        
-        province = parsed_admin.get('province') or ''
-        city = parsed_admin.get('city') or ''
-        county = parsed_admin.get('county') or ''
-        admin_parts = [part for part in [province, city, county] if part and part != 'None']
-        admin_prefix = "".join(admin_parts)
-
-        prompt = f"""
+def _wi_suggest_prompt(original_address, bg_str, admin_prefix, mismatch_reasons):
+    return f"""
 # 角色
 你是一名专业的地理信息分析师，专门从非结构化文本中提取可用于地图POI检索的有效关键词。
 
@@ -826,131 +986,341 @@ def wi_suggest_keywords():
 }}
 ```
 """
-        
+
+
+def _wi_suggest_context(data, dossier):
+    """整理关键词建议所需的地址、情报摘录、行政区前缀与提示词（流式与非流式接口共用）。"""
+    original_address = (data.get('original_address') or dossier.get('original_address') or '').strip()
+    mismatch_reasons = data.get('mismatch_reasons') or []
+
+    # 优先：调用LLM生成关键词（JSON）
+    excerpts = []
+    try:
+        for it in (dossier.get('collated_excerpts') or [])[:15]:
+            ex = (it.get('excerpt') or '').strip()
+            if ex:
+                excerpts.append(f"- {ex}")
+    except Exception:
+        pass
+    bg_str = "\n".join(excerpts) if excerpts else '（无）'
+
+    # 解析行政区，便于生成完整可搜索地址
+    try:
+        parsed_admin = jio.parse_location(original_address)
+    except Exception:
+        parsed_admin = {}
+
+    province = parsed_admin.get('province') or ''
+    city = parsed_admin.get('city') or ''
+    county = parsed_admin.get('county') or ''
+    admin_parts = [part for part in [province, city, county] if part and part != 'None']
+    admin_prefix = "".join(admin_parts)
+
+    return {
+        'original_address': original_address,
+        'mismatch_reasons': mismatch_reasons,
+        'excerpts': excerpts,
+        'admin_prefix': admin_prefix,
+        'prompt': _wi_suggest_prompt(original_address, bg_str, admin_prefix, mismatch_reasons),
+    }
+
+
+def _wi_clean_suggestion(s, original_address):
+    """校验并截断LLM给出的一条关键词建议，无效或与原始地址重复时返回 None。"""
+    display_kw = (s.get('display_keyword') or '').strip()
+    full_addr = (s.get('full_address_for_search') or '').strip()
+
+    if not display_kw or not full_addr:
+        return None
+
+    # 后端再次过滤，确保不与原始地址重复
+    if full_addr == original_address or full_addr in original_address or original_address in full_addr:
+        return None
+
+    return {
+        'display': display_kw[:30],
+        'query': full_addr[:120],
+        'reason': (s.get('reason') or '').strip()[:120] or '基于情报分析生成',
+    }
+
+
+def _wi_finish_suggestions(suggestions, context, llm_cached):
+    """兜底补充、去重限量并计费，返回响应数据（流式与非流式接口共用）。"""
+    original_address = context['original_address']
+    admin_prefix = context['admin_prefix']
+
+    # 兜底：从情报句子里抽取包含街/路/桥/渡/塔/山/河等词的短语
+    if not suggestions:
+        pattern = re.compile(r"([\u4e00-\u9fa5A-Za-z0-9]{2,15}(?:街|路|巷|大道|大街|桥|渡|塔|山|公园|广场|河|湖|村|社区))")
+        picked = []
+        for line in context['excerpts']:
+            for m in pattern.finditer(line):
+                kw = m.group(1)
+                if kw and kw not in picked and kw not in original_address and original_address not in kw:
+                    picked.append(kw)
+        for kw in picked[:10]:
+            full_kw = f"{admin_prefix}{kw}" if admin_prefix else kw
+            suggestions.append({
+                'display': kw,
+                'query': full_kw,
+                'reason': '来源于情报句子的地标/街路等名词',
+            })
+
+    # 最终去重并限量
+    uniq = []
+    seen_queries = set()
+    for s in suggestions:
+        if s['query'] in seen_queries:
+            continue
+        uniq.append(s)
+        seen_queries.add(s['query'])
+    suggestions = uniq[:12]
+
+    # 新策略：本接口会触发一次 LLM 调用，按 2 分计费（命中LLM响应缓存时不计费）
+    try:
+        if current_user.is_authenticated and not llm_cached:
+            user_id = current_user.id
+            points_to_deduct = get_points_cost('llm_call', used_user_key=False)
+            if points_to_deduct and points_to_deduct > 0:
+                deduct_points(user_id, points_to_deduct)
+                current_app.logger.info(f"计费：关键词建议 LLM 扣除 {points_to_deduct} 积分。")
+    except Exception as e:
+        current_app.logger.error(f"关键词建议扣分异常: {e}")
+
+    response_data = {'success': True, 'keyword_suggestions': suggestions,
+                     'mismatch_reasons': context['mismatch_reasons'], 'cached': llm_cached}
+    if current_user.is_authenticated:
+        updated_user = user_service.get_user_by_id(current_user.id)
+        if updated_user:
+            response_data['user'] = {'points': updated_user.points}
+    return response_data
+
+
+@geocoding_bp.route('/web_intelligence/suggest_keywords', methods=['POST'])
+def wi_suggest_keywords():
+    try:
+        data = request.get_json() or {}
+        dossier = _resolve_dossier(data)
+        if dossier is None:
+            return jsonify({'success': False, 'message': '情报档案不存在或已过期，请重新搜集'}), 404
+        context = _wi_suggest_context(data, dossier)
+
         suggestions = []
+        llm_cached = False
         try:
-            llm_resp = asyncio.run(llm_service.call_llm_api(prompt))
+            llm_resp = http_client.run(llm_service.call_llm_api(context['prompt'], use_cache=not data.get('bypass_cache')))
+            llm_cached = bool((llm_resp or {}).get('cached'))
             content = (llm_resp or {}).get('content') or ''
             m = re.search(r"```json\s*([\s\S]+?)\s*```", content)
             json_str = m.group(1) if m else content
             obj = json.loads(json_str)
-            raw_sugs = obj.get('suggestions') or []
-            
-            for s in raw_sugs:
-                display_kw = (s.get('display_keyword') or '').strip()
-                full_addr = (s.get('full_address_for_search') or '').strip()
-                
-                if not display_kw or not full_addr:
-                    continue
-                
-                # 后端再次过滤，确保不与原始地址重复
-                if full_addr == original_address or full_addr in original_address or original_address in full_addr:
-                    continue
-
-                suggestions.append({
-                    'display': display_kw[:30],
-                    'query': full_addr[:120],
-                    'reason': (s.get('reason') or '').strip()[:120] or '基于情报分析生成',
-                })
+            for s in (obj.get('suggestions') or []):
+                suggestion = _wi_clean_suggestion(s, context['original_address'])
+                if suggestion:
+                    suggestions.append(suggestion)
         except Exception as e:
             current_app.logger.error(f"关键词LLM生成失败: {e}")
 
-        # 兜底：从情报句子里抽取包含街/路/桥/渡/塔/山/河等词的短语
-        if not suggestions:
-            pattern = re.compile(r"([\u4e00-\u9fa5A-Za-z0-9]{2,15}(?:街|路|巷|大道|大街|桥|渡|塔|山|公园|广场|河|湖|村|社区))")
-            picked = []
-            for line in excerpts:
-                for m in pattern.finditer(line):
-                    kw = m.group(1)
-                    if kw and kw not in picked and kw not in original_address and original_address not in kw:
-                        picked.append(kw)
-            for kw in picked[:10]:
-                full_kw = f"{admin_prefix}{kw}" if admin_prefix else kw
-                suggestions.append({
-                    'display': kw,
-                    'query': full_kw,
-                    'reason': '来源于情报句子的地标/街路等名词',
-                })
-
-        # 最终去重并限量
-        uniq = []
+        return jsonify(_wi_finish_suggestions(suggestions, context, llm_cached))
+    except Exception as e:
+        current_app.logger.error(f"/web_intelligence/suggest_keywords 异常: {e}")
+        return jsonify({'success': False, 'message': f'服务器内部错误: {str(e)}'}), 500
+
+
+@geocoding_bp.route('/web_intelligence/suggest_keywords_stream', methods=['POST'])
+def wi_suggest_keywords_stream():
+    """
+    suggest_keywords 的流式版本（text/event-stream），参数相同。依次发送：
+        event: suggestion  {"display": ..., "query": ..., "reason": ...}   LLM每生成完一条建议即发送
+        event: done        与 suggest_keywords 的响应相同（含兜底补充后的完整列表）
+    出错时发送 error。
+    """
+    data = request.get_json(silent=True) or {}
+    dossier = _resolve_dossier(data)
+    if dossier is None:
+        return jsonify({'success': False, 'message': '情报档案不存在或已过期，请重新搜集'}), 404
+    context = _wi_suggest_context(data, dossier)
+
+    async def _events():
+        suggestions = []
         seen_queries = set()
-        for s in suggestions:
-            if s['query'] in seen_queries:
+        llm_cached = False
+        scanner = stream_parse.JSONObjectScanner()
+        async for chunk in llm_service.stream_llm_api(context['prompt'], use_cache=not data.get('bypass_cache')):
+            if chunk.get('done'):
+                llm_cached = bool(chunk.get('cached'))
+                if chunk.get('error'):
+                    current_app.logger.error(f"关键词LLM生成失败: {chunk['error']}")
                 continue
-            uniq.append(s)
-            seen_queries.add(s['query'])
-        suggestions = uniq[:12]
+            for s in scanner.feed(chunk['delta']):
+                suggestion = _wi_clean_suggestion(s, context['original_address'])
+                if suggestion and suggestion['query'] not in seen_queries and len(suggestions) < 12:
+                    seen_queries.add(suggestion['query'])
+                    suggestions.append(suggestion)
+                    yield 'suggestion', suggestion
+        yield 'done', _wi_finish_suggestions(suggestions, context, llm_cached)
 
-        # 新策略：本接口会触发一次 LLM 调用，按 2 分计费
-        try:
-            if current_user.is_authenticated:
-                user_id = current_user.id
-                points_to_deduct = get_points_cost('llm_call', used_user_key=False)
+    return _sse_response(_events(), '/web_intelligence/suggest_keywords_stream 异常')
+
+POI_SEARCH_SOURCES = ('amap', 'baidu', 'tianditu')
+
+
+def _charge_poi_search(user_id, source):
+    """按源扣积分（天地图0，高德/百度2）。"""
+    try:
+        if user_id:
+            src = (source or '').lower()
+            if src in POI_SEARCH_SOURCES:
+                task_key = f"poi_search_{src}"
+                used_user_key = False  # POI搜索不区分用户Key优惠，统一价
+                points_to_deduct = get_points_cost(task_key, used_user_key)
                 if points_to_deduct and points_to_deduct > 0:
                     deduct_points(user_id, points_to_deduct)
-                    current_app.logger.info(f"计费：关键词建议 LLM 扣除 {points_to_deduct} 积分。")
-        except Exception as e:
-            current_app.logger.error(f"关键词建议扣分异常: {e}")
+                    current_app.logger.info(f"计费：POI搜索[{src}] 扣除 {points_to_deduct} 积分。")
+    except Exception as e:
+        current_app.logger.error(f"POI搜索扣分异常: {e}")
 
-        response_data = {'success': True, 'keyword_suggestions': suggestions, 'mismatch_reasons': mismatch_reasons}
-        if current_user.is_authenticated:
-            updated_user = user_service.get_user_by_id(current_user.id)
-            if updated_user:
-                response_data['user'] = {'points': updated_user.points}
 
-        return jsonify(response_data)
-    except Exception as e:
-        current_app.logger.error(f"/web_intelligence/suggest_keywords 异常: {e}")
-        return jsonify({'success': False, 'message': f'服务器内部错误: {str(e)}'}), 500
+def _encode_poi_cursor(keyword, sources, city_limit, page, multi_source=False):
+    """分页游标：把查询条件与下一页页码编码为不透明字符串，客户端原样回传即可获取下一页。"""
+    payload = json.dumps(
+        {'k': keyword, 's': sources, 'c': city_limit, 'p': page, 'm': multi_source}, ensure_ascii=False
+    )
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def _decode_poi_cursor(cursor):
+    """解析分页游标，格式错误时抛出 ValueError。"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        keyword, sources, city_limit, page = payload['k'], payload['s'], payload.get('c', ''), int(payload['p'])
+        multi_source = bool(payload.get('m'))
+    except (ValueError, KeyError, TypeError, AttributeError, UnicodeError):
+        raise ValueError('无效的分页游标')
+    if not keyword or not isinstance(sources, list) or not sources or page < 1:
+        raise ValueError('无效的分页游标')
+    return keyword, sources, city_limit or '', page, multi_source
+
+
+def _maybe_prefetch_next_page(searcher, keyword, city_limit, page, has_more):
+    """当前页之后还有结果时，后台预取下一页（最多预取到 POI_PREFETCH_MAX_PAGE 页）。"""
+    if has_more and page + 1 <= current_app.config.get('POI_PREFETCH_MAX_PAGE', 0):
+        searcher.prefetch_page(keyword, city_limit, page + 1)
+
+
+async def _multi_source_poi_search(keyword, sources, user_id, city_limit='', page=1):
+    """
+    并发查询多个服务商，合并去重后返回 (合并结果, 各源状态, 仍有下一页的服务商列表)。
+    总耗时约等于最慢的服务商；只对成功且未命中缓存的服务商计费。
+    """
+    searchers = {source: poi_search.get_searcher(source, user_id) for source in sources}
+    outcomes = await asyncio.gather(
+        *(searcher.search_with_cache(keyword, city_limit, page) for searcher in searchers.values()),
+        return_exceptions=True
+    )
+
+    results_by_source = {}
+    source_status = {}
+    sources_with_more = []
+    for source, outcome in zip(searchers, outcomes):
+        if isinstance(outcome, Exception):
+            source_status[source] = {'success': False, 'message': str(outcome)}
+            continue
+        results, from_cache = outcome
+        if 'error' in results:
+            source_status[source] = {'success': False, 'message': results['error']}
+        else:
+            pois = results.get('pois', [])
+            results_by_source[source] = pois
+            source_status[source] = {'success': True, 'count': len(pois), 'cached': from_cache}
+            if not from_cache:
+                _charge_poi_search(user_id, source)
+            if results.get('has_more'):
+                sources_with_more.append(source)
+                _maybe_prefetch_next_page(searchers[source], keyword, city_limit, page, True)
+
+    return poi_merge.merge_poi_results(results_by_source), source_status, sources_with_more
+
 
 @geocoding_bp.route('/poi_search', methods=['POST'])
 @decorators.async_route
 async def poi_search_route():
     """
     Handles POI search requests from different map providers.
+    传入 sources 列表时并发查询多个服务商，返回合并去重后的单一列表，
+    每个结果的 sources 字段记录提供该地点的服务商。
+    还有更多结果时返回 next_cursor，以 {'cursor': next_cursor} 请求即可获取下一页；
+    下一页会在后台预取到POI缓存中。
     """
     try:
         data = request.get_json()
         if not data:
             return jsonify({'success': False, 'results': [], 'message': '无效的请求数据'}), 400
 
-        keyword = data.get('keyword')
-        source = data.get('source', 'amap') # Default to amap if not provided
         user_id = current_user.id if current_user.is_authenticated else None
+        cursor = data.get('cursor')
+        if cursor:
+            try:
+                keyword, sources, city_limit, page, multi_source = _decode_poi_cursor(cursor)
+            except ValueError as e:
+                return jsonify({'success': False, 'results': [], 'message': str(e)}), 400
+            source = sources[0]
+        else:
+            keyword = data.get('keyword')
+            source = data.get('source', 'amap') # Default to amap if not provided
+            sources = data.get('sources')
+            city_limit = data.get('city_limit') or ''
+            page = 1
+            multi_source = bool(sources)
 
         if not keyword:
             return jsonify({'success': False, 'results': [], 'message': '搜索关键词不能为空'}), 400
-        
-        # Get the appropriate searcher instance from the factory/service module
-        searcher = poi_search.get_searcher(source, user_id)
-        
-        if searcher is None:
-            return jsonify({'success': False, 'results': [], 'message': f"不支持的搜索源: {source}"}), 400
 
-        # Perform the search
-        results = await searcher.search(keyword)
-        
-        # The 'results' from the searcher should already be in the correct format.
-        # It usually returns a dictionary like {'pois': [...]} or {'error': ...}
-        if 'error' in results:
-            return jsonify({'success': False, 'results': [], 'message': results['error']}), 500
+        if multi_source:
+            if not isinstance(sources, list):
+                return jsonify({'success': False, 'results': [], 'message': 'sources 必须是列表'}), 400
+            sources = list(dict.fromkeys(str(s).lower() for s in sources))
+            unsupported = [s for s in sources if s not in POI_SEARCH_SOURCES]
+            if unsupported:
+                return jsonify({'success': False, 'results': [], 'message': f"不支持的搜索源: {', '.join(unsupported)}"}), 400
 
-        # 新策略：按源扣积分（天地图0，高德/百度2）
-        try:
-            if user_id:
-                src = (source or '').lower()
-                if src in ('amap', 'baidu', 'tianditu'):
-                    task_key = f"poi_search_{src}"
-                    used_user_key = False  # POI搜索不区分用户Key优惠，统一价
-                    points_to_deduct = get_points_cost(task_key, used_user_key)
-                    if points_to_deduct and points_to_deduct > 0:
-                        deduct_points(user_id, points_to_deduct)
-                        current_app.logger.info(f"计费：POI搜索[{src}] 扣除 {points_to_deduct} 积分。")
-        except Exception as e:
-            current_app.logger.error(f"POI搜索扣分异常: {e}")
+            merged, source_status, sources_with_more = await _multi_source_poi_search(
+                keyword, sources, user_id, city_limit, page
+            )
+            if not any(status['success'] for status in source_status.values()):
+                return jsonify({
+                    'success': False, 'results': [], 'sources': source_status, 'message': '所有搜索源均请求失败'
+                }), 500
+            next_cursor = None
+            if sources_with_more:
+                next_cursor = _encode_poi_cursor(keyword, sources_with_more, city_limit, page + 1, multi_source=True)
+            response_data = {
+                'success': True, 'results': merged, 'sources': source_status, 'page': page, 'next_cursor': next_cursor
+            }
+        else:
+            # Get the appropriate searcher instance from the factory/service module
+            searcher = poi_search.get_searcher(source, user_id)
+
+            if searcher is None:
+                return jsonify({'success': False, 'results': [], 'message': f"不支持的搜索源: {source}"}), 400
+
+            # Perform the search（命中缓存时不调用第三方API，也不扣积分）
+            results, from_cache = await searcher.search_with_cache(keyword, city_limit, page)
+
+            # The 'results' from the searcher should already be in the correct format.
+            # It usually returns a dictionary like {'pois': [...]} or {'error': ...}
+            if 'error' in results:
+                return jsonify({'success': False, 'results': [], 'message': results['error']}), 500
+
+            if not from_cache:
+                _charge_poi_search(user_id, source)
+            has_more = bool(results.get('has_more'))
+            _maybe_prefetch_next_page(searcher, keyword, city_limit, page, has_more)
+            response_data = {
+                'success': True, 'results': results.get('pois', []), 'cached': from_cache, 'page': page,
+                'next_cursor': _encode_poi_cursor(keyword, [source.lower()], city_limit, page + 1) if has_more else None
+            }
 
-        response_data = {'success': True, 'results': results.get('pois', [])}
         if user_id:
             updated_user = user_service.get_user_by_id(user_id)
             if updated_user:
@@ -962,6 +1332,18 @@ async def poi_search_route():
         current_app.logger.error(f"POI搜索路由 /poi_search 发生异常: {e}", exc_info=True)
         return jsonify({'success': False, 'results': [], 'message': f'服务器内部错误: {str(e)}'}), 500
 
+def _charge_llm_select(user_id, llm_cached=False):
+    """新策略：一次 LLM 选点调用扣 2 分；决策来自LLM响应缓存时不计费。"""
+    try:
+        if user_id and not llm_cached:
+            points_to_deduct = get_points_cost('llm_call', used_user_key=False)
+            if points_to_deduct and points_to_deduct > 0:
+                deduct_points(user_id, points_to_deduct)
+                current_app.logger.info(f"计费：LLM选点 扣除 {points_to_deduct} 积分。")
+    except Exception as e:
+        current_app.logger.error(f"LLM选点扣分异常: {e}")
+
+
 @geocoding_bp.route('/auto_select_point', methods=['POST'])
 @decorators.async_route
 async def auto_select_point_route():
@@ -989,20 +1371,13 @@ async def auto_select_point_route():
             original_address=original_address,
             poi_results=pois,
             user_id=user_id,
-            source_context=source_context
+            source_context=source_context,
+            use_cache=not data.get('bypass_cache')
         )
         current_app.logger.info(f"LLM选点结果：{json.dumps(selected_poi, ensure_ascii=False)}")
 
         if selected_poi and 'error' not in selected_poi:
-            # 新策略：一次 LLM 调用扣 2 分
-            try:
-                if user_id:
-                    points_to_deduct = get_points_cost('llm_call', used_user_key=False)
-                    if points_to_deduct and points_to_deduct > 0:
-                        deduct_points(user_id, points_to_deduct)
-                        current_app.logger.info(f"计费：LLM选点 扣除 {points_to_deduct} 积分。")
-            except Exception as e:
-                current_app.logger.error(f"LLM选点扣分异常: {e}")
+            _charge_llm_select(user_id, selected_poi.get('llm_cached'))
 
             # 使用LLM返回的索引信息
             index = selected_poi.get('selected_index')
@@ -1033,6 +1408,216 @@ async def auto_select_point_route():
         current_app.logger.error(f"路由 /auto_select_point 发生异常: {e}", exc_info=True)
         return jsonify({'success': False, 'message': f'服务器内部错误: {str(e)}'}), 500 
 
+def _rows_needing_calibration(rows, threshold):
+    """
+    挑出需要智能校准的行：已有选中结果且置信度低于阈值（与前端"可信度低于90%"的筛选规则一致）。
+    返回 [(行号, 原始地址)]。
+    """
+    selected = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            continue
+        address = (row.get('address') or '').strip()
+        confidence = (row.get('selected_result') or {}).get('confidence')
+        if not address or not isinstance(confidence, (int, float)):
+            continue
+        if confidence < threshold:
+            selected.append((index, address))
+    return selected
+
+
+async def _search_calibration_row(index, address, source, user_id):
+    """智能校准的POI搜索阶段：返回 (POI列表, None)，失败时返回 (None, 失败的决策记录)。"""
+    searcher = poi_search.get_searcher(source, user_id)
+    results, from_cache = await searcher.search_with_cache(address)
+    if 'error' in results:
+        return None, {'type': 'decision', 'index': index, 'address': address, 'success': False,
+                      'message': f"POI搜索失败: {results['error']}"}
+    if not from_cache:
+        _charge_poi_search(user_id, source)
+
+    pois = results.get('pois', [])
+    if not pois:
+        return None, {'type': 'decision', 'index': index, 'address': address, 'success': False,
+                      'message': 'POI搜索无结果'}
+    return pois, None
+
+
+def _calibration_decision(index, address, pois, selected_poi, user_id):
+    """把LLM选点结果转为一条决策记录，采纳时按行计费（命中LLM缓存不计费）。"""
+    decision = {'type': 'decision', 'index': index, 'address': address, 'success': False}
+    if not selected_poi or 'error' in selected_poi:
+        decision['message'] = (selected_poi or {}).get('error', '未能决策出最佳匹配点')
+        decision['reasons'] = (selected_poi or {}).get('reasons', [])
+        return decision
+
+    _charge_llm_select(user_id, selected_poi.get('llm_cached'))
+    best_index = selected_poi.get('selected_index')
+    decision.update({
+        'success': True,
+        'best_match_index': best_index,
+        'best_match': pois[best_index],
+        'reasoning': selected_poi.get('llm_reason', ''),
+        'llm_confidence': selected_poi.get('llm_confidence'),
+    })
+    return decision
+
+
+async def _calibrate_row(index, address, source, user_id):
+    """单行智能校准：POI搜索 + LLM选点，返回一条决策记录。"""
+    pois, failure = await _search_calibration_row(index, address, source, user_id)
+    if failure:
+        return failure
+    selected_poi = await llm_service.select_best_poi_from_search(
+        original_address=address, poi_results=pois, user_id=user_id, source_context='智能校准'
+    )
+    return _calibration_decision(index, address, pois, selected_poi, user_id)
+
+
+async def _calibrate_pack(rows, user_id):
+    """对已完成POI搜索的若干行 [(index, address, pois)] 进行一次打包LLM选点，返回各行的决策记录。"""
+    selections = await llm_service.select_best_pois_packed(
+        [(address, pois) for _, address, pois in rows], user_id=user_id, source_context='智能校准'
+    )
+    return [
+        _calibration_decision(index, address, pois, selected_poi, user_id)
+        for (index, address, pois), selected_poi in zip(rows, selections)
+    ]
+
+
+def _iter_calibration_decisions(targets, source, user_id, concurrency, pack_size=1):
+    """
+    在独立事件循环中以最多 concurrency 个并发执行各行的校准，按完成顺序逐条产出决策。
+    pack_size > 1 时各行先完成POI搜索，再每凑满 pack_size 行进行一次打包LLM选点（剩余不足的行最后一起处理）。
+    生成器被提前关闭（客户端断开）时取消尚未完成的行。
+    """
+    loop = asyncio.new_event_loop()
+    queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = []  # 已完成POI搜索、等待打包选点的行
+
+    def _failed(index, address, e):
+        current_app.logger.error(f"智能校准第 {index} 行异常: {e}", exc_info=True)
+        return {'type': 'decision', 'index': index, 'address': address, 'success': False, 'message': str(e)}
+
+    async def _flush(rows):
+        async with semaphore:
+            try:
+                decisions = await _calibrate_pack(rows, user_id)
+            except Exception as e:
+                decisions = [_failed(index, address, e) for index, address, _ in rows]
+        for decision in decisions:
+            await queue.put(decision)
+
+    async def _worker(index, address):
+        async with semaphore:
+            try:
+                if pack_size <= 1:
+                    decision = await _calibrate_row(index, address, source, user_id)
+                else:
+                    pois, decision = await _search_calibration_row(index, address, source, user_id)
+            except Exception as e:
+                decision = _failed(index, address, e)
+        if decision:
+            await queue.put(decision)
+            return
+        pending.append((index, address, pois))
+        if len(pending) >= pack_size:
+            rows = pending[:pack_size]
+            del pending[:pack_size]
+            await _flush(rows)
+
+    async def _run_all():
+        # 批量优先级：交互请求（选点、网络情报）优先放行，校准只使用剩余的LLM名额
+        with llm_scheduler.scope(user=user_id, priority=llm_scheduler.PRIORITY_BATCH):
+            await asyncio.gather(*(_worker(index, address) for index, address in targets))
+            if pending:
+                await _flush(list(pending))
+                pending.clear()
+
+    runner = loop.create_task(_run_all())
+    try:
+        for _ in range(len(targets)):
+            yield loop.run_until_complete(queue.get())
+        loop.run_until_complete(runner)
+    finally:
+        if not runner.done():
+            runner.cancel()
+            loop.run_until_complete(asyncio.gather(runner, return_exceptions=True))
+        loop.run_until_complete(http_client.close_session())
+        loop.close()
+
+
+@geocoding_bp.route('/smart_calibration', methods=['POST'])
+@login_required
+def smart_calibration_route():
+    """
+    服务端批量智能校准。
+    对任务中置信度低于阈值的行，以有限并发依次执行 POI 搜索与 LLM 选点（LLM 选点按 LLM_SELECT_PACK_SIZE 打包调用），
+    并以 NDJSON 流的形式逐行返回决策（按完成顺序，每行带 index）：
+        {"type": "start", "total": N}
+        {"type": "decision", "index": i, "address": ..., "success": true, "best_match": {...}, ...}
+        {"type": "summary", "success": x, "failed": y, "user": {"points": ...}}
+
+    请求JSON：task_id（已保存的任务）或 rows（结果行列表）二选一；
+    可选 threshold（默认 REQUIRED_CONFIDENCE_THRESHOLD）、source（默认 amap）、concurrency。
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'success': False, 'message': '无效的请求数据'}), 400
+
+    user_id = current_user.id
+    if data.get('task_id') is not None:
+        task = task_service.get_task_by_id(data.get('task_id'), user_id)
+        if not task:
+            return jsonify({'success': False, 'message': '任务不存在'}), 404
+        result_data = task['result_data']
+        rows = result_data.get('results', []) if isinstance(result_data, dict) else result_data
+    else:
+        rows = data.get('rows')
+    if not isinstance(rows, list):
+        return jsonify({'success': False, 'message': '缺少任务ID或结果行列表'}), 400
+
+    source = (data.get('source') or 'amap').lower()
+    if source not in POI_SEARCH_SOURCES:
+        return jsonify({'success': False, 'message': f"不支持的搜索源: {source}"}), 400
+
+    try:
+        threshold = float(data.get('threshold', current_app.config.get('REQUIRED_CONFIDENCE_THRESHOLD', 0.9)))
+        max_concurrency = current_app.config.get('SMART_CALIBRATION_MAX_CONCURRENCY', 4)
+        concurrency = max(1, min(int(data.get('concurrency', max_concurrency)), max_concurrency))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'threshold 或 concurrency 参数无效'}), 400
+
+    targets = _rows_needing_calibration(rows, threshold)
+    max_rows = current_app.config.get('SMART_CALIBRATION_MAX_ROWS', 2000)
+    if len(targets) > max_rows:
+        return jsonify({'success': False, 'message': f'待校准的行数超过上限 {max_rows}，请分批校准'}), 400
+    pack_size = current_app.config.get('LLM_SELECT_PACK_SIZE', 5)
+    current_app.logger.info(
+        f"服务端智能校准开始: 待校准 {len(targets)} 行, 搜索源 {source}, 并发 {concurrency}, 打包 {pack_size}"
+    )
+
+    def _generate():
+        yield json.dumps({'type': 'start', 'total': len(targets)}, ensure_ascii=False) + '\n'
+        succeeded = failed = 0
+        for decision in _iter_calibration_decisions(targets, source, user_id, concurrency, pack_size):
+            if decision['success']:
+                succeeded += 1
+            else:
+                failed += 1
+            yield json.dumps(decision, ensure_ascii=False) + '\n'
+
+        summary = {'type': 'summary', 'success': succeeded, 'failed': failed}
+        updated_user = user_service.get_user_by_id(user_id)
+        if updated_user:
+            summary['user'] = {'points': updated_user.points}
+        current_app.logger.info(f"服务端智能校准完成: 成功 {succeeded}, 失败 {failed}")
+        yield json.dumps(summary, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(_generate()), mimetype='application/x-ndjson')
+
+
 @geocoding_bp.route('/reverse_geocode', methods=['POST'])
 @decorators.async_route
 async def reverse_geocode_route():
@@ -1091,4 +1676,130 @@ def get_approved_suffixes():
         return jsonify({'success': True, 'suffixes': suffixes})
     except Exception as e:
         current_app.logger.error(f"Error fetching approved suffixes: {e}")
-        return jsonify({'success': False, 'message': '获取后缀列表失败'}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'message': '获取后缀列表失败'}), 500
+
+
+_TRANSFORM_MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def _attachment_headers(download_name):
+    """
+    构造附件下载的 Content-Disposition 响应头（与 werkzeug send_file 的做法一致）：
+    非 ASCII 文件名提供 ASCII 回退名与 RFC 5987 的 filename*=UTF-8''<百分号编码>。
+    """
+    headers = Headers()
+    try:
+        download_name.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        quoted = quote(download_name, safe="!#$&+^`|~")
+        headers.set('Content-Disposition', 'attachment', filename=simple, **{'filename*': f"UTF-8''{quoted}"})
+    else:
+        headers.set('Content-Disposition', 'attachment', filename=download_name)
+    return headers
+
+
+@geocoding_bp.route('/transform', methods=['POST'])
+@login_required
+def transform_coordinates_route():
+    """
+    批量坐标转换（流式）。
+    上传 CSV / JSON 数组 / JSON Lines 文件（multipart 字段 file，或直接作为请求体），
+    按块向量化转换坐标列，并以流的形式返回转换后的文件，内存占用与文件大小无关。
+
+    参数（query string 或表单）：
+        from_sys / to_sys: WGS84、GCJ02、BD09
+        lng_col / lat_col: 坐标列名，默认 lng / lat
+        format: csv、json、jsonl，缺省时根据文件扩展名推断，默认 csv
+        chunk_size: 每次向量化转换的记录数
+        engine: analytic（解析公式，默认）或 grid（预计算偏移网格，网格文件缺失时自动回退）
+    """
+    params = request.values
+    from_sys = (params.get('from_sys') or '').upper()
+    to_sys = (params.get('to_sys') or '').upper()
+    if from_sys not in coordinate_stream.SUPPORTED_SYSTEMS or to_sys not in coordinate_stream.SUPPORTED_SYSTEMS:
+        return jsonify({
+            'success': False,
+            'message': f"坐标系必须是 {', '.join(coordinate_stream.SUPPORTED_SYSTEMS)} 之一"
+        }), 400
+
+    lng_col = params.get('lng_col') or 'lng'
+    lat_col = params.get('lat_col') or 'lat'
+    try:
+        chunk_size = int(params.get('chunk_size', coordinate_stream.DEFAULT_CHUNK_SIZE))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'chunk_size 必须是整数'}), 400
+    chunk_size = max(1, min(chunk_size, 100000))
+
+    engine = params.get('engine', 'analytic')
+    if engine == 'grid':
+        transform = gcj02_grid.coordinate_transform_grid
+    elif engine == 'analytic':
+        transform = geo_transforms.coordinate_transform_batch
+    else:
+        return jsonify({'success': False, 'message': f'不支持的转换引擎: {engine}'}), 400
+
+    upload = request.files.get('file')
+    if upload is not None:
+        filename = upload.filename or 'coordinates'
+        # 请求结束时上传文件会被关闭，而响应体在此之后才被迭代，因此先复制到独立的临时文件
+        binary_stream = tempfile.TemporaryFile()
+        shutil.copyfileobj(upload.stream, binary_stream)
+        binary_stream.seek(0)
+    else:
+        filename = 'coordinates'
+        binary_stream = request.stream
+
+    base_name, ext = os.path.splitext(filename)
+    file_format = (params.get('format') or ext.lstrip('.') or 'csv').lower()
+    if file_format == 'ndjson':
+        file_format = 'jsonl'
+    if file_format not in _TRANSFORM_MIMETYPES:
+        if upload is not None:
+            binary_stream.close()
+        return jsonify({'success': False, 'message': f'不支持的文件格式: {file_format}'}), 400
+
+    # utf-8-sig 兼容 Excel 导出的带 BOM 的 CSV
+    text_stream = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    try:
+        if file_format == 'csv':
+            chunks = coordinate_stream.transform_csv_stream(
+                text_stream, from_sys, to_sys, lng_col, lat_col, chunk_size, transform
+            )
+        else:
+            chunks = coordinate_stream.transform_json_stream(
+                text_stream, from_sys, to_sys, lng_col, lat_col, chunk_size,
+                json_lines=(file_format == 'jsonl'), transform=transform
+            )
+    except coordinate_stream.CoordinateStreamError as e:
+        text_stream.close()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except UnicodeDecodeError:
+        text_stream.close()
+        return jsonify({'success': False, 'message': '文件编码必须是 UTF-8'}), 400
+
+    def _generate():
+        try:
+            yield from chunks
+        except (coordinate_stream.CoordinateStreamError, UnicodeDecodeError) as e:
+            # 响应头已发出：JSON / JSON Lines 先写出错误标记，再抛出异常使服务器中止分块传输，
+            # 客户端得到不完整的响应，而不是看似完整却缺少后续记录的文件
+            current_app.logger.error(f"流式坐标转换中途失败，中止响应: {e}")
+            if file_format != 'csv':
+                marker = json.dumps({'__error__': f'坐标转换中途失败: {e}'}, ensure_ascii=False)
+                yield ('' if file_format == 'jsonl' else '\n') + marker + '\n'
+            raise
+        finally:
+            if upload is not None:
+                text_stream.close()
+
+    download_name = f"{base_name or 'coordinates'}_{to_sys.lower()}.{file_format}"
+    return Response(
+        stream_with_context(_generate()),
+        mimetype=_TRANSFORM_MIMETYPES[file_format],
+        headers=_attachment_headers(download_name)
+    )
@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template, session, redirect, url_for, jsonify, request, send_file, current_app
 from flask_login import current_user, login_required
 from ..services import geocoding_apis
-from ..utils import address_processing
+from ..utils import address_processing, geo_transforms
 from ..models import LocationType # Import SQLAlchemy model
 from .. import db # Import db instance
 # from ..utils.auth import login_required # This is replaced by flask_login's decorator
@@ -145,6 +145,32 @@ def jionlp_autocomplete():
         print(f"自动补全地址时出错: {e}")
         return jsonify({'success': False, 'message': '服务器内部错误'}), 500
 
+def _fill_wgs84_from_gcj02(df):
+    """
+    导出需要 WGS84 的 lng/lat 列。对缺少 lng/lat 但带有 GCJ02 坐标
+    (longitude_gcj02/latitude_gcj02) 的记录，整列批量换算补全。
+    """
+    if 'longitude_gcj02' not in df.columns or 'latitude_gcj02' not in df.columns:
+        return df
+    for col in ('lng', 'lat'):
+        if col not in df.columns:
+            df[col] = float('nan')
+
+    lng = pd.to_numeric(df['lng'], errors='coerce')
+    lat = pd.to_numeric(df['lat'], errors='coerce')
+    gcj_lng = pd.to_numeric(df['longitude_gcj02'], errors='coerce')
+    gcj_lat = pd.to_numeric(df['latitude_gcj02'], errors='coerce')
+    missing = (lng.isna() | lat.isna()) & gcj_lng.notna() & gcj_lat.notna()
+    if missing.any():
+        wgs_lng, wgs_lat = geo_transforms.gcj02_to_wgs84_batch(
+            gcj_lng[missing].to_numpy(), gcj_lat[missing].to_numpy()
+        )
+        df['lng'] = lng
+        df['lat'] = lat
+        df.loc[missing, 'lng'] = wgs_lng
+        df.loc[missing, 'lat'] = wgs_lat
+    return df
+
 @main_bp.route('/export', methods=['POST'])
 @login_required
 def export_data():
@@ -174,7 +200,7 @@ def export_data():
             deduct_points(user_id, points_to_deduct)
             current_app.logger.info(f"计费：用户 {user_id} 导出 {export_format.upper()} 文件扣除 {points_to_deduct} 积分。")
 
-        df = pd.DataFrame(results)
+        df = _fill_wgs84_from_gcj02(pd.DataFrame(results))
 
         # 获取最新的用户积分
         updated_user = user_service.get_user_by_id(user_id)
@@ -207,6 +233,8 @@ def export_data():
                     lat = float(row['lat'])
                 except Exception:
                     continue
+                if pd.isna(lng) or pd.isna(lat):
+                    continue
                 # KML显示名称优先使用“原始地址”，避免被显示为标准化后的详细地址
                 address_original = str(row.get('address') or '')
                 name_standardized = str(row.get('name') or '')  # 可能为 formatted_address
@@ -14,6 +14,7 @@ from .. import db
 from ..models import (User, Feedback, GeocodingHistory, Notification, 
                       UserApiKey, Referral, Task, LocationType)
 from ..services import user_service, llm_service
+from ..utils import http_client
 from ..utils.storage import upload_file_to_r2
 from flask_login import logout_user
 
@@ -223,9 +224,7 @@ def generate_social_share_copy():
 
     try:
         # 同步调用异步LLM封装
-        result = llm_service.call_llm_api
-        import asyncio
-        llm_resp = asyncio.run(result(prompt))
+        llm_resp = http_client.run(llm_service.call_llm_api(prompt))
         content = (llm_resp or {}).get('content') or ''
         if not content:
             content = (
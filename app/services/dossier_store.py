@@ -0,0 +1,64 @@
+"""
+网络情报档案（dossier）的服务端存储。
+
+`wi_search_collate` 生成的档案按 id 存放在磁盘缓存中，并以标准化后的原始地址建立索引：
+- 后续的验证、关键词建议接口只需回传 dossier_id，无需客户端上传整个档案；
+- 同一地址在 TTL 内再次搜集时直接返回已有档案。
+磁盘存储可被同一台机器上的多个工作进程共享；DOSSIER_CACHE_DIR 为空时不保存。
+"""
+import uuid
+
+from flask import current_app
+
+from ..utils.confidence_core import normalize_detail_text
+from ..utils.disk_cache import DiskCache
+
+_store = None
+
+
+def _get_store():
+    global _store
+    directory = current_app.config.get('DOSSIER_CACHE_DIR')
+    if not directory:
+        return None
+    if _store is None or _store.directory != directory:
+        _store = DiskCache(directory)
+    return _store
+
+
+def _address_key(address: str) -> str:
+    return normalize_detail_text(address)
+
+
+def save_dossier(dossier: dict):
+    """保存档案并返回其 id（写入档案的 'dossier_id' 字段）；未启用存储时返回 None。"""
+    store = _get_store()
+    if store is None:
+        return None
+    ttl = current_app.config.get('DOSSIER_CACHE_TTL', 0)
+    dossier_id = uuid.uuid4().hex
+    dossier['dossier_id'] = dossier_id
+    store.set('dossier', dossier_id, dossier, ttl)
+    address_key = _address_key(dossier.get('original_address'))
+    if address_key:
+        store.set('dossier_by_address', address_key, dossier_id, ttl)
+    return dossier_id
+
+
+def get_dossier(dossier_id: str):
+    """按 id 读取档案，不存在或已过期时返回 None。"""
+    store = _get_store()
+    if store is None or not dossier_id:
+        return None
+    hit, dossier = store.get('dossier', str(dossier_id))
+    return dossier if hit else None
+
+
+def find_dossier_by_address(address: str):
+    """返回该地址（标准化后比较）在有效期内的最新档案，没有时返回 None。"""
+    store = _get_store()
+    address_key = _address_key(address)
+    if store is None or not address_key:
+        return None
+    hit, dossier_id = store.get('dossier_by_address', address_key)
+    return get_dossier(dossier_id) if hit else None
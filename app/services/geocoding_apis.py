@@ -1,7 +1,7 @@
 import json
 import asyncio
 import aiohttp
-import traceback
+import logging
 import abc
 
 from flask import current_app
@@ -9,6 +9,8 @@ from ..utils import geo_transforms, address_processing
 from ..utils.api_managers import baidu_limiter, APIKeyManager, APIRateLimiter, REASON_INVALID, REASON_QUOTA_EXCEEDED, REASON_RATE_LIMITED, REASON_OTHER
 from ..exceptions import RateLimitError, ThirdPartyAPIError, InvalidApiKeyError
 
+logger = logging.getLogger(__name__)
+
 # --- Refactored Geocoder Service Structure ---
 
 class BaseGeocoder(abc.ABC):
@@ -37,13 +39,12 @@ class BaseGeocoder(abc.ABC):
                     self.key_manager.report_success(current_key)
                     return await response.json(content_type=None)
         except aiohttp.ClientError as e:
-            print(f"Aiohttp client error for {self.__class__.__name__}: {e}")
+            logger.warning("Aiohttp client error for %s: %s", self.__class__.__name__, e)
             # Here you might want to parse the error to determine the reason
             self.key_manager.report_failure(current_key, REASON_RATE_LIMITED) # Example reason
             return {'error': f'API request failed: {e}'}
         except Exception as e:
-            print(f"An unexpected error occurred in {self.__class__.__name__}: {e}")
-            traceback.print_exc()
+            logger.exception("An unexpected error occurred in %s: %s", self.__class__.__name__, e)
             self.key_manager.report_failure(current_key, REASON_OTHER) # Example reason
             return {'error': f'An unexpected error occurred: {e}'}
 
@@ -140,12 +141,12 @@ class AmapGeocoder(BaseGeocoder):
             return {'error': 'Amap geocoding failed to find any valid candidate.'}
 
         # SOP 5.1 内部选优: 无论有几个结果，始终返回置信度最高的单个结果
-        current_app.logger.debug(f"高德返回 {len(geocodes)} 个候选结果，进行内部选优。")
+        logger.debug("高德返回 %d 个候选结果，进行内部选优。", len(geocodes))
         for r_idx, r in enumerate(standardized_results):
-            current_app.logger.debug(f"  候选 {r_idx + 1}: {r.get('formatted_address', 'N/A')}, 置信度: {r.get('confidence', 'N/A')}")
+            logger.debug("  候选 %d: %s, 置信度: %s", r_idx + 1, r.get('formatted_address', 'N/A'), r.get('confidence', 'N/A'))
         
         best_result = max(standardized_results, key=lambda x: x.get('confidence', 0.0))
-        current_app.logger.debug(f"高德内部选优 - 最佳结果: {best_result.get('formatted_address', 'N/A')}，置信度: {best_result.get('confidence', 'N/A')}")
+        logger.debug("高德内部选优 - 最佳结果: %s，置信度: %s", best_result.get('formatted_address', 'N/A'), best_result.get('confidence', 'N/A'))
         
         # 关键修复：确保返回的是单个字典对象，而不是列表
         return best_result
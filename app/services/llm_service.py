@@ -1,9 +1,209 @@
 import json
 import re
 import asyncio
+import hashlib
+import random
+import threading
 import traceback
 from datetime import datetime
-from flask import current_app
+import aiohttp
+from flask import current_app, has_request_context
+from flask_login import current_user
+
+from ..utils import http_client, llm_scheduler, sentence_rank
+from ..utils.disk_cache import DiskCache
+
+LLM_MODEL = "glm-4-flash"
+LLM_SYSTEM_PROMPT = "你是一个地理位置分析专家，请基于用户的提示词判断地址匹配程度。"
+
+DEFAULT_LLM_REQUEST_TIMEOUT = 60
+ZHIPU_DEFAULT_BASE_URL = "https://open.bigmodel.cn/api/paas/v4"
+
+
+# 估算请求 token 数时为回复预留的 token 数（未指定 max_tokens 时）
+DEFAULT_COMPLETION_TOKENS = 512
+# 重试间隔：指数退避（带随机抖动）的基数与上限（秒）
+RETRY_BACKOFF_BASE = 1.0
+RETRY_BACKOFF_MAX = 20.0
+
+
+class LLMRequestError(Exception):
+    """智谱接口返回非 2xx 状态或无法解析的响应。"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def _retry_delay(attempt: int) -> float:
+    """第 attempt 次（从0开始）失败后的重试间隔：指数增长并加入抖动，避免多个请求同时重试。"""
+    delay = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.5)
+
+
+# 全局LLM调度器（按配置懒加载，配置变化时重建）
+_llm_scheduler = None
+_llm_scheduler_config = None
+_llm_scheduler_lock = threading.Lock()
+
+
+def _get_llm_scheduler() -> llm_scheduler.LLMScheduler:
+    global _llm_scheduler, _llm_scheduler_config
+    config = current_app.config
+    settings = (
+        config.get('LLM_MAX_CONCURRENCY', 8),
+        config.get('LLM_PER_USER_CONCURRENCY', 4),
+        config.get('LLM_TOKENS_PER_MINUTE', 0),
+        config.get('LLM_INTERACTIVE_RESERVE', 2),
+    )
+    with _llm_scheduler_lock:
+        if _llm_scheduler is None or _llm_scheduler_config != settings:
+            max_concurrency, per_user, tokens_per_minute, reserve = settings
+            _llm_scheduler = llm_scheduler.LLMScheduler(
+                max_concurrency, per_user, tokens_per_minute, window=60.0, interactive_reserve=reserve
+            )
+            _llm_scheduler_config = settings
+        return _llm_scheduler
+
+
+def _scheduling_user():
+    """调度时归属的用户：优先取 llm_scheduler.scope 指定的用户，其次为当前登录用户。"""
+    user = llm_scheduler.current_user()
+    if user is None and has_request_context() and getattr(current_user, 'is_authenticated', False):
+        user = current_user.id
+    return user
+
+
+def _estimate_request_tokens(messages: list, max_tokens: int = None) -> int:
+    prompt_tokens = sum(sentence_rank.estimate_tokens(m.get('content') or '') for m in messages)
+    return prompt_tokens + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+def llm_scheduler_stats() -> dict:
+    return _get_llm_scheduler().stats()
+
+
+async def _zhipu_post(client, path: str, payload: dict, timeout: float = None) -> dict:
+    """
+    直接调用智谱 HTTP 接口（地址与鉴权头取自 ZhipuAI 客户端），不再占用线程池；
+    请求在 http_client 的后台事件循环上发出，跨 Flask 请求复用到智谱的 keep-alive 连接。
+    调用方任务被取消时请求随之中止。timeout 为本次调用的总超时（秒）。
+    """
+    url, headers, timeout = _zhipu_request_args(client, path, timeout)
+    return await http_client.in_background(_zhipu_post_json(url, payload, headers, timeout))
+
+
+async def _zhipu_post_json(url: str, payload: dict, headers: dict, timeout) -> dict:
+    session = http_client.get_session()
+    async with session.post(url, json=payload, headers=headers, timeout=timeout) as resp:
+        try:
+            data = await resp.json(content_type=None)
+        except ValueError:
+            raise LLMRequestError(f"HTTP {resp.status}: 响应不是有效JSON", resp.status)
+        _raise_for_zhipu_status(resp.status, data)
+        return data or {}
+
+
+async def _zhipu_stream_lines(url: str, payload: dict, headers: dict, timeout):
+    """以流式方式 POST，逐个产出 SSE 的 data 字段（不含 [DONE]），HTTP 错误时抛出 LLMRequestError。"""
+    session = http_client.get_session()
+    async with session.post(url, json=payload, headers=headers, timeout=timeout) as resp:
+        if resp.status >= 400:
+            try:
+                data = await resp.json(content_type=None)
+            except ValueError:
+                data = None
+            _raise_for_zhipu_status(resp.status, data)
+        async for raw_line in resp.content:
+            line = raw_line.decode('utf-8', errors='replace').strip()
+            if not line.startswith('data:'):
+                continue
+            data = line[len('data:'):].strip()
+            if data == '[DONE]':
+                break
+            yield data
+
+
+def _zhipu_request_args(client, path: str, timeout: float = None):
+    """返回 (url, 请求头, aiohttp 超时)。"""
+    if timeout is None:
+        timeout = current_app.config.get('LLM_REQUEST_TIMEOUT', DEFAULT_LLM_REQUEST_TIMEOUT)
+    base_url = getattr(client, 'base_url', None) or getattr(client, '_base_url', None) or ZHIPU_DEFAULT_BASE_URL
+    url = f"{str(base_url).rstrip('/')}/{path.lstrip('/')}"
+    return url, dict(client.auth_headers), aiohttp.ClientTimeout(total=timeout)
+
+
+def _raise_for_zhipu_status(status: int, data):
+    if status >= 400:
+        message = ((data or {}).get('error') or {}).get('message') if isinstance(data, dict) else None
+        raise LLMRequestError(f"HTTP {status}: {message or data}", status)
+
+
+async def _chat_completion(client, messages: list, timeout: float = None, **params) -> dict:
+    """
+    调用 chat/completions，返回原始响应 JSON（choices / usage 等字段）。
+    发出前向全局调度器申请名额（用户与优先级取自 llm_scheduler.scope / 当前登录用户），
+    上游返回 429 限流时暂停调度器放行，所有调用方一起退避。
+    """
+    payload = {'model': LLM_MODEL, 'messages': messages, 'stream': False}
+    payload.update(params)
+    scheduler = _get_llm_scheduler()
+    async with scheduler.slot(_scheduling_user(), llm_scheduler.current_priority(),
+                              _estimate_request_tokens(messages, params.get('max_tokens'))) as grant:
+        try:
+            response = await _zhipu_post(client, 'chat/completions', payload, timeout)
+        except LLMRequestError as e:
+            if e.status == 429:
+                scheduler.pause(current_app.config.get('LLM_RATE_LIMIT_PAUSE', 5))
+            raise
+        usage = (response.get('usage') or {}).get('total_tokens')
+        if usage:
+            grant.tokens = usage
+        return response
+
+
+async def _chat_completion_stream(client, messages: list, timeout: float = None, **params):
+    """
+    以流式方式调用 chat/completions（SSE），逐个产出解析后的增量 JSON（choices[0].delta / usage 等）。
+    调度与限流处理同 _chat_completion，名额在流结束（或调用方提前关闭生成器）时归还；
+    与 _zhipu_post 一样在后台事件循环上读取响应。
+    """
+    payload = {'model': LLM_MODEL, 'messages': messages, 'stream': True}
+    payload.update(params)
+    scheduler = _get_llm_scheduler()
+    url, headers, client_timeout = _zhipu_request_args(client, 'chat/completions', timeout)
+    async with scheduler.slot(_scheduling_user(), llm_scheduler.current_priority(),
+                              _estimate_request_tokens(messages, params.get('max_tokens'))) as grant:
+        lines = http_client.iterate_in_background(_zhipu_stream_lines(url, payload, headers, client_timeout))
+        try:
+            async for data in lines:
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    continue
+                usage = (chunk.get('usage') or {}).get('total_tokens')
+                if usage:
+                    grant.tokens = usage
+                yield chunk
+        except LLMRequestError as e:
+            if e.status == 429:
+                scheduler.pause(current_app.config.get('LLM_RATE_LIMIT_PAUSE', 5))
+            raise
+        finally:
+            await lines.aclose()
+
+
+def _completion_content(response: dict):
+    """取第一条回复的文本，没有有效回复时返回 None。"""
+    choices = (response or {}).get('choices') or []
+    message = (choices[0] or {}).get('message') if choices else None
+    return (message or {}).get('content')
+
+
+# LLM响应的持久缓存（LLM_CACHE_DIR 为空时不缓存）与命中统计
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+_llm_cache_metrics = {'hits': 0, 'misses': 0, 'bypassed': 0, 'stored': 0, 'tokens_saved': 0}
 
 SMART_SEARCH_PROMPT = '''请分析以下搜索关键词，并以JSON格式返回相关的地理位置信息：
 {query}
@@ -45,12 +245,13 @@ async def call_zhipu_web_enabled_llm(original_query_address: str, max_retries: i
         }
 
     try:
-        search_response = client.web_search.web_search(
-            search_engine="search-pro",
-            search_query=original_query_address
-        )
-        
-        if not search_response or not search_response.search_result:
+        search_response = await _zhipu_post(client, 'web_search', {
+            'search_engine': 'search-pro',
+            'search_query': original_query_address
+        })
+        search_results = search_response.get('search_result') or []
+
+        if not search_results:
             return {
                 "llm_output": "未能获取到有效的搜索结果",
                 "web_search_results_count": 0,
@@ -61,8 +262,8 @@ async def call_zhipu_web_enabled_llm(original_query_address: str, max_retries: i
             }
 
         search_context = "\n\n".join([
-            f"来源：{result.media if result.media else '未知来源'}\n{result.content}"
-            for result in search_response.search_result if result.content
+            f"来源：{result.get('media') or '未知来源'}\n{result.get('content')}"
+            for result in search_results if result.get('content')
         ])
 
         main_prompt = f'''
@@ -84,37 +285,27 @@ N. 地点：地点名称（可以是单个或多个，多个地点用顿号、
 说明：前面条目如此列先后的理由。
 '''
         print(main_prompt)
-        llm_response = await asyncio.to_thread(
-            client.chat.completions.create,
-            model="glm-4-flash",
-            messages=[{"role": "user", "content": main_prompt}],
-            stream=False,
+        llm_response = await _chat_completion(
+            client,
+            [{"role": "user", "content": main_prompt}],
             max_tokens=4090
         )
+        llm_content = _completion_content(llm_response)
 
-        if not llm_response.choices or not llm_response.choices[0].message:
-            web_search_references = []
-            for r in search_response.search_result:
-                if hasattr(r, 'refer') and r.refer:
-                    web_search_references.append(r.refer)
-                    
+        web_search_references = [r['refer'] for r in search_results if r.get('refer')]
+        if llm_content is None:
             return {
                 "llm_output": "大模型未能生成有效回复",
-                "web_search_results_count": len(search_response.search_result),
+                "web_search_results_count": len(search_results),
                 "web_search_references": web_search_references,
                 "request_timestamp": datetime.now().isoformat(),
                 "response_timestamp": datetime.now().isoformat(),
                 "error": "LLM响应无效"
             }
 
-        web_search_references = []
-        for r in search_response.search_result:
-            if hasattr(r, 'refer') and r.refer:
-                web_search_references.append(r.refer)
-        
         return {
-            "llm_output": llm_response.choices[0].message.content.strip(),
-            "web_search_results_count": len(search_response.search_result),
+            "llm_output": llm_content.strip(),
+            "web_search_results_count": len(search_results),
             "web_search_references": web_search_references,
             "request_timestamp": datetime.now().isoformat(),
             "response_timestamp": datetime.now().isoformat(),
@@ -133,8 +324,140 @@ N. 地点：地点名称（可以是单个或多个，多个地点用顿号、
             "error": str(e)
         }
 
-async def call_llm_api(prompt, max_retries=3):
-    """调用智谱AI的API，并返回包含时间戳和内容的字典"""
+def _get_llm_cache():
+    global _llm_cache
+    directory = current_app.config.get('LLM_CACHE_DIR')
+    if not directory:
+        return None
+    max_entries = current_app.config.get('LLM_CACHE_MAX_ENTRIES')
+    if _llm_cache is None or _llm_cache.directory != directory:
+        _llm_cache = DiskCache(directory, max_entries=max_entries)
+    _llm_cache.max_entries = max_entries
+    return _llm_cache
+
+
+def llm_cache_key(model: str, system_prompt: str, prompt: str) -> str:
+    """提示词指纹：模型、系统提示词与用户提示词共同决定一次调用的结果。"""
+    raw = json.dumps([model, system_prompt, prompt], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _count_llm_cache(metric, amount=1):
+    with _llm_cache_lock:
+        _llm_cache_metrics[metric] += amount
+
+
+def llm_cache_stats() -> dict:
+    """当前进程的LLM缓存统计：命中/未命中/显式绕过/写入次数、命中节省的 token 数与命中率。"""
+    with _llm_cache_lock:
+        stats = dict(_llm_cache_metrics)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    stats['enabled'] = bool(current_app.config.get('LLM_CACHE_DIR'))
+    return stats
+
+
+async def call_llm_api(prompt, max_retries=3, use_cache=True):
+    """
+    调用智谱AI的API，并返回包含时间戳和内容的字典。
+
+    相同的模型、系统提示词与提示词在 LLM_CACHE_TTL 内直接返回缓存的响应，返回字典中的
+    'cached' 为 True（调用方据此免于计费）；use_cache=False 时绕过缓存强制重新调用，
+    新结果仍会写入缓存。只缓存成功的响应。
+    """
+    entry = _llm_cache_lookup(prompt, use_cache)
+    if entry is not None:
+        now = datetime.now().isoformat()
+        return {
+            'content': entry['content'],
+            'request_timestamp': now,
+            'response_timestamp': now,
+            'error': None,
+            'cached': True
+        }
+
+    result = await _call_llm_api_uncached(prompt, max_retries)
+    result['cached'] = False
+    if result.get('content') and not result.get('error'):
+        _llm_cache_store(prompt, result['content'], result.get('total_tokens'))
+    return result
+
+
+def _llm_cache_lookup(prompt, use_cache=True):
+    """查询LLM响应缓存并计数，命中时返回缓存条目 {'content', 'total_tokens'}，否则返回 None。"""
+    cache = _get_llm_cache()
+    if cache is None:
+        return None
+    if not use_cache:
+        _count_llm_cache('bypassed')
+        return None
+    hit, entry = cache.get('llm', llm_cache_key(LLM_MODEL, LLM_SYSTEM_PROMPT, prompt))
+    if hit:
+        _count_llm_cache('hits')
+        _count_llm_cache('tokens_saved', entry.get('total_tokens') or 0)
+        return entry
+    _count_llm_cache('misses')
+    return None
+
+
+def _llm_cache_store(prompt, content, total_tokens=None):
+    cache = _get_llm_cache()
+    if cache is None:
+        return
+    cache.set('llm', llm_cache_key(LLM_MODEL, LLM_SYSTEM_PROMPT, prompt),
+              {'content': content, 'total_tokens': total_tokens},
+              current_app.config.get('LLM_CACHE_TTL', 0))
+    _count_llm_cache('stored')
+
+
+async def stream_llm_api(prompt, max_retries=3, use_cache=True):
+    """
+    call_llm_api 的流式版本（异步生成器）：回复生成过程中逐段产出 {'delta': 文本}，
+    最后产出 {'done': True, 'content': 完整回复, 'cached': bool, 'error': 错误信息或 None}。
+    与 call_llm_api 共用响应缓存（命中时一次性产出完整回复）；只有在尚未产出任何文本时才会重试。
+    """
+    entry = _llm_cache_lookup(prompt, use_cache)
+    if entry is not None:
+        yield {'delta': entry['content']}
+        yield {'done': True, 'content': entry['content'], 'cached': True, 'error': None}
+        return
+
+    client = current_app.extensions.get('zhipuai_client')
+    if not client:
+        yield {'done': True, 'content': None, 'cached': False, 'error': "智谱AI客户端未初始化"}
+        return
+
+    messages = [
+        {"role": "system", "content": LLM_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    pieces = []
+    total_tokens = None
+    error = None
+    for attempt in range(max_retries):
+        try:
+            async for chunk in _chat_completion_stream(client, messages):
+                total_tokens = (chunk.get('usage') or {}).get('total_tokens') or total_tokens
+                choices = chunk.get('choices') or []
+                delta = ((choices[0] or {}).get('delta') or {}).get('content') if choices else None
+                if delta:
+                    pieces.append(delta)
+                    yield {'delta': delta}
+            error = None if pieces else f"API响应格式错误 (尝试 {attempt + 1}/{max_retries})"
+        except Exception as e:
+            error = f"API调用出错 (尝试 {attempt + 1}/{max_retries}): {str(e)}"
+            current_app.logger.warning(f"LLM流式调用失败: {error}")
+        if not error or pieces or attempt == max_retries - 1:
+            break
+        await asyncio.sleep(_retry_delay(attempt))
+
+    content = ''.join(pieces) or None
+    if content and not error:
+        _llm_cache_store(prompt, content, total_tokens)
+    yield {'done': True, 'content': content, 'cached': False, 'error': error}
+
+
+async def _call_llm_api_uncached(prompt, max_retries=3):
     client = current_app.extensions.get('zhipuai_client')
     llm_req_ts = None
     llm_res_ts = None
@@ -152,13 +475,12 @@ async def call_llm_api(prompt, max_retries=3):
         for attempt in range(max_retries):
             try:
                 llm_req_ts = datetime.now().isoformat()
-                response = await asyncio.to_thread(
-                    client.chat.completions.create,
-                    model="glm-4-flash",
-                    messages=[
+                response = await _chat_completion(
+                    client,
+                    [
                         {
                             "role": "system",
-                            "content": "你是一个地理位置分析专家，请基于用户的提示词判断地址匹配程度。"
+                            "content": LLM_SYSTEM_PROMPT
                         },
                         {
                             "role": "user",
@@ -167,12 +489,13 @@ async def call_llm_api(prompt, max_retries=3):
                     ]
                 )
                 llm_res_ts = datetime.now().isoformat()
+                content = _completion_content(response)
                 
-                if not response or not response.choices:
+                if content is None:
                     error_msg = f"API响应格式错误 (尝试 {attempt + 1}/{max_retries})"
                     print(error_msg)
                     if attempt < max_retries - 1:
-                        await asyncio.sleep(1)
+                        await asyncio.sleep(_retry_delay(attempt))
                         continue
                     return {
                         'content': None,
@@ -182,9 +505,10 @@ async def call_llm_api(prompt, max_retries=3):
                     }
                 
                 return {
-                    'content': response.choices[0].message.content,
+                    'content': content,
                     'request_timestamp': llm_req_ts,
                     'response_timestamp': llm_res_ts,
+                    'total_tokens': (response.get('usage') or {}).get('total_tokens'),
                     'error': None 
                 }
                     
@@ -194,7 +518,7 @@ async def call_llm_api(prompt, max_retries=3):
                 print(error_msg)
                 traceback.print_exc() 
                 if attempt < max_retries - 1:
-                    await asyncio.sleep(1)
+                    await asyncio.sleep(_retry_delay(attempt))
                     continue
                 return {
                     'content': None,
@@ -244,7 +568,7 @@ N. 地点：地点名称（可以是单个或多个，多个地点用顿号、
 
         # Call the async function using asyncio.run or from an async context
         # For now, we will assume this is called from a context that can await
-        response_dict = asyncio.run(call_llm_api(prompt))
+        response_dict = http_client.run(call_llm_api(prompt))
         
         result = response_dict.get('content')
         if response_dict.get('error'):
@@ -378,17 +702,31 @@ def parse_llm_suggested_locations(llm_output_str: str) -> list[str]:
             
     return list(dict.fromkeys(suggestions))
 
-async def select_best_poi_from_search(original_address: str, poi_results: list, user_id: int, source_context: str) -> dict:
-    """
-    使用LLM（通用代表性模板）从POI搜索结果中选择代表性最强的一项。
-    仅当返回的 confidence ≥ 0.90 且 decision=index 时才采纳；否则返回错误用于回退。
-    """
-    if not poi_results:
-        return {'error': 'POI结果列表为空，无法进行决策。'}
-
-    # 注：不再做“街道名必须字面匹配”的机械校验，统一由模型+阈值+need_web_info 控制回退
-
-    # 组织候选清单（尽量提供 name/address/type/admin）
+POI_SELECT_SYSTEM_PROMPT = (
+    '你是“地理地址-POI 匹配验证官”，你的核心职责是进行严格的、基于证据的验证。'
+    '你的任务是分级决策：首先，尝试验证是否存在一个【完全等价】的POI。如果不存在，则在有充分理由的情况下，审慎地选择一个能【最大程度代表】用户意图的POI。如果连代表性POI都找不到，则必须弃权。\n\n'
+    '**核心指令：**\n'
+    '1.  **严守证据**: 绝对禁止任何主观猜测、常识推断。只使用输入信息。\n'
+    '2.  **分级决策**: 你的任务不是简单地“找一个最像的”，而是根据证据的强度进行分级判断。\n'
+    '3.  **高标准置信度**: 只有在满足【所有】硬性匹配标准时，置信度才能超过 0.9。\n\n'
+    '**硬性匹配标准 (置信度 > 0.9 的【必要条件】):**\n'
+    '*   **行政区划必须完全匹配**: 省、市、区县必须一致。\n'
+    '*   **核心名称必须高度相关**: \n'
+    '    *   A) 目标地址的核心名称【完全包含】在 POI 的名称或地址中。\n'
+    '    *   B) 或，POI 名称【完全包含】在目标地址的核心名称中，且 POI 类型与目标地址类别相符。\n'
+    '*   **类别必须兼容**: 目标地址描述的是一个建筑物，POI 不能是一条路或一个地区。反之亦然。\n\n'
+    '**中等置信度代表点标准 (置信度 0.6-0.89 的【选择条件】):**\n'
+    '*   **主次实体判断**: 当目标地址包含多个地名时（如 A—B），如果候选POI中有一个与主要地名（通常是第一个）完全匹配，且行政区划一致，你可以选择它作为代表点。\n'
+    '*   **别名或简称**: 当目标地址可能是某个POI的别名或不完整名称时，如果POI的类型和位置能提供强有力的旁证，你可以选择它。\n'
+    '*   **明确陈述局限性**: 在选择中等置信度代表点时，必须在 `reasons` 字段中明确说明这是一个代表性选择，并指出输入中的哪个部分未被完全匹配。例如：“选择‘留犊祠巷’作为主要代表，但用户的输入‘状元巷’部分在当前POI列表中未被匹配。”\n\n'
+    '**决策背景**\n'
+    '如果没有任何一个POI能满足高或中等置信度标准，就必须【弃权 (abstain)】。系统后续会自动通过网络搜索等方式处理这些弃权的地址。\n\n'
+    '**输出格式:** 严格按照用户提供的 JSON 格式输出。在 `reasons` 字段中清晰陈述你的验证逻辑。'
+)
+
+
+def _format_poi_candidates(poi_results: list) -> str:
+    """把POI候选组织为每行一个的类JSON清单（尽量提供 name/address/type/admin）。"""
     cand_lines = []
     for i, p in enumerate(poi_results):
         name = (p.get('name') or '').replace('\n', ' ').strip()
@@ -401,30 +739,61 @@ async def select_best_poi_from_search(original_address: str, poi_results: list,
         cand_lines.append(
             f"{{\"index\":{i},\"name\":\"{name}\",\"address\":\"{addr}\",\"type\":\"{ptype}\",\"admin\":\"{admin}\"}}"
         )
-    cands_json_like = ",\n  ".join(cand_lines)
-
-    # 通用系统提示（一次调用，允许 abstain）
-    system_prompt = (
-        '你是“地理地址-POI 匹配验证官”，你的核心职责是进行严格的、基于证据的验证。'
-        '你的任务是分级决策：首先，尝试验证是否存在一个【完全等价】的POI。如果不存在，则在有充分理由的情况下，审慎地选择一个能【最大程度代表】用户意图的POI。如果连代表性POI都找不到，则必须弃权。\n\n'
-        '**核心指令：**\n'
-        '1.  **严守证据**: 绝对禁止任何主观猜测、常识推断。只使用输入信息。\n'
-        '2.  **分级决策**: 你的任务不是简单地“找一个最像的”，而是根据证据的强度进行分级判断。\n'
-        '3.  **高标准置信度**: 只有在满足【所有】硬性匹配标准时，置信度才能超过 0.9。\n\n'
-        '**硬性匹配标准 (置信度 > 0.9 的【必要条件】):**\n'
-        '*   **行政区划必须完全匹配**: 省、市、区县必须一致。\n'
-        '*   **核心名称必须高度相关**: \n'
-        '    *   A) 目标地址的核心名称【完全包含】在 POI 的名称或地址中。\n'
-        '    *   B) 或，POI 名称【完全包含】在目标地址的核心名称中，且 POI 类型与目标地址类别相符。\n'
-        '*   **类别必须兼容**: 目标地址描述的是一个建筑物，POI 不能是一条路或一个地区。反之亦然。\n\n'
-        '**中等置信度代表点标准 (置信度 0.6-0.89 的【选择条件】):**\n'
-        '*   **主次实体判断**: 当目标地址包含多个地名时（如 A—B），如果候选POI中有一个与主要地名（通常是第一个）完全匹配，且行政区划一致，你可以选择它作为代表点。\n'
-        '*   **别名或简称**: 当目标地址可能是某个POI的别名或不完整名称时，如果POI的类型和位置能提供强有力的旁证，你可以选择它。\n'
-        '*   **明确陈述局限性**: 在选择中等置信度代表点时，必须在 `reasons` 字段中明确说明这是一个代表性选择，并指出输入中的哪个部分未被完全匹配。例如：“选择‘留犊祠巷’作为主要代表，但用户的输入‘状元巷’部分在当前POI列表中未被匹配。”\n\n'
-        '**决策背景**\n'
-        '如果没有任何一个POI能满足高或中等置信度标准，就必须【弃权 (abstain)】。系统后续会自动通过网络搜索等方式处理这些弃权的地址。\n\n'
-        '**输出格式:** 严格按照用户提供的 JSON 格式输出。在 `reasons` 字段中清晰陈述你的验证逻辑。'
-    )
+    return ",\n  ".join(cand_lines)
+
+
+def _parse_llm_json(content: str):
+    """解析LLM输出的JSON（兼容 ```json 代码块包裹），失败时抛出异常。"""
+    m = re.search(r"```json\s*([\s\S]+?)\s*```", content)
+    return json.loads(m.group(1) if m else content)
+
+
+def _interpret_poi_decision(data, poi_results: list, cached: bool) -> dict:
+    """按统一规则（decision=index 且 confidence ≥ 0.60）把一条LLM决策转为选中的POI或错误（兼容新老两种格式）。"""
+    # 新模板
+    if isinstance(data, dict) and 'decision' in data:
+        decision = (data.get('decision') or '').strip()
+        index = data.get('selected_index')
+        confidence = float(data.get('confidence') or 0.0)
+        reasons = data.get('reasons') or []
+
+        # 优先采纳有效的选择
+        if decision == 'index' and isinstance(index, int) and 0 <= index < len(poi_results) and confidence >= 0.60:
+            selected_tmp = poi_results[index].copy()
+            selected_tmp['llm_reason'] = (reasons[0] if reasons else '高置信度代表点')
+            selected_tmp['llm_confidence'] = confidence
+            selected_tmp['selected_index'] = index
+            selected_tmp['llm_cached'] = cached
+            return selected_tmp
+
+        # 否则，视为低置信度或弃权
+        return {'error': 'NO_HIGH_CONFIDENCE', 'reasons': reasons}
+
+    # 兼容旧模板
+    best_index = data.get('best_match_index')
+    conf = float(data.get('confidence') or 0.0)
+    if isinstance(best_index, int) and 0 <= best_index < len(poi_results) and conf >= 0.60:
+        selected_poi_temp = poi_results[best_index].copy()
+        selected_poi_temp['llm_reason'] = data.get('reason', '')
+        selected_poi_temp['llm_confidence'] = conf
+        selected_poi_temp['selected_index'] = best_index
+        selected_poi_temp['llm_cached'] = cached
+        return selected_poi_temp
+
+    return {'error': 'NO_HIGH_CONFIDENCE'}
+
+
+async def select_best_poi_from_search(original_address: str, poi_results: list, user_id: int, source_context: str,
+                                      use_cache: bool = True) -> dict:
+    """
+    使用LLM（通用代表性模板）从POI搜索结果中选择代表性最强的一项。
+    仅当返回的 confidence ≥ 0.90 且 decision=index 时才采纳；否则返回错误用于回退。
+    采纳时结果中的 llm_cached 表示决策来自LLM响应缓存（不应再计费）。
+    """
+    if not poi_results:
+        return {'error': 'POI结果列表为空，无法进行决策。'}
+
+    # 注：不再做“街道名必须字面匹配”的机械校验，统一由模型+阈值+need_web_info 控制回退
 
     user_prompt = f"""
 目标: "{original_address}"
@@ -432,7 +801,7 @@ async def select_best_poi_from_search(original_address: str, poi_results: list,
 
 候选POI（index从0开始）:
 [
-  {cands_json_like}
+  {_format_poi_candidates(poi_results)}
 ]
 
 仅输出严格JSON：
@@ -445,54 +814,101 @@ async def select_best_poi_from_search(original_address: str, poi_results: list,
 """
 
     # 调用 LLM
-    llm_response = await call_llm_api(system_prompt + "\n\n" + user_prompt)
+    llm_response = await call_llm_api(POI_SELECT_SYSTEM_PROMPT + "\n\n" + user_prompt, use_cache=use_cache)
     current_app.logger.info(f"LLM 原始响应: {llm_response.get('content')}") # 增加原始响应日志
     if llm_response.get('error') or not llm_response.get('content'):
         return {'error': f"LLM API调用失败: {llm_response.get('error', '无有效内容返回')}"}
 
     # 解析响应（兼容新老两种格式）
     try:
-        llm_json_content = llm_response['content']
-        m = re.search(r"```json\s*([\s\S]+?)\s*```", llm_json_content)
-        json_str = m.group(1) if m else llm_json_content
-        data = json.loads(json_str)
-
-        # 新模板
-        if isinstance(data, dict) and 'decision' in data:
-            decision = (data.get('decision') or '').strip()
-            index = data.get('selected_index')
-            confidence = float(data.get('confidence') or 0.0)
-            reasons = data.get('reasons') or []
-
-            # 优先采纳有效的选择
-            if decision == 'index' and isinstance(index, int) and 0 <= index < len(poi_results) and confidence >= 0.60:
-                selected_tmp = poi_results[index].copy()
-                selected_tmp['llm_reason'] = (reasons[0] if reasons else '高置信度代表点')
-                selected_tmp['llm_confidence'] = confidence
-                selected_tmp['selected_index'] = index
-                return selected_tmp
-            
-            # 否则，视为低置信度或弃权
-            return {'error': 'NO_HIGH_CONFIDENCE', 'reasons': reasons}
-
-        # 兼容旧模板
-        best_index = data.get('best_match_index')
-        conf = float(data.get('confidence') or 0.0)
-        if isinstance(best_index, int) and 0 <= best_index < len(poi_results) and conf >= 0.60:
-            selected_poi_temp = poi_results[best_index].copy()
-            selected_poi_temp['llm_reason'] = data.get('reason', '')
-            selected_poi_temp['llm_confidence'] = conf
-            selected_poi_temp['selected_index'] = best_index
-            return selected_poi_temp
-
-        return {'error': 'NO_HIGH_CONFIDENCE'}
-
+        data = _parse_llm_json(llm_response['content'])
+        return _interpret_poi_decision(data, poi_results, bool(llm_response.get('cached')))
     except Exception as e:
         current_app.logger.error(f"解析/处理LLM响应失败: {e}\n原始响应: {llm_response.get('content')}")
         return {'error': '解析LLM响应失败，格式不正确。'}
 
 
-async def validate_poi_with_dossier(original_address: str, poi_candidates: list, dossier: dict, max_bg_items: int = 12) -> dict:
+async def select_best_pois_packed(items: list, user_id: int, source_context: str, use_cache: bool = True) -> list:
+    """
+    打包模式的POI选点：把多个地址及其候选清单放进一次LLM调用（共用一份系统提示词），按 id 解析逐条决策。
+
+    :param items: [(original_address, poi_results), ...]
+    :return: 与 items 一一对应的结果列表，每项与 select_best_poi_from_search 的返回格式相同。
+    整体调用失败或响应无法解析时全部改为逐条调用；个别地址缺少有效决策时仅对这些地址逐条调用。
+    """
+    results = [None] * len(items)
+    packed = [i for i, (_, pois) in enumerate(items) if pois]
+    for i, (_, pois) in enumerate(items):
+        if not pois:
+            results[i] = {'error': 'POI结果列表为空，无法进行决策。'}
+
+    decisions = {}
+    if len(packed) > 1:
+        blocks = []
+        for task_id, i in enumerate(packed, start=1):
+            address, pois = items[i]
+            blocks.append(f"""### 目标 {task_id}
+目标: "{address}"
+候选POI（index从0开始）:
+[
+  {_format_poi_candidates(pois)}
+]""")
+        user_prompt = f"""
+以下共有 {len(packed)} 个目标地址，请对每个目标【独立】判断（各目标之间互不参考），index 指该目标自己的候选POI序号。
+来源上下文: "{source_context}"
+
+{chr(10).join(blocks)}
+
+仅输出严格JSON数组，每个目标一项，id 与目标编号对应：
+[
+  {{
+    "id": <目标编号>,
+    "decision": "index" | "abstain",
+    "selected_index": <int or null>,
+    "reasons": ["一条简洁、可核验的理由"],
+    "confidence": 0.0-1.0
+  }}
+]
+"""
+        llm_response = await call_llm_api(POI_SELECT_SYSTEM_PROMPT + "\n\n" + user_prompt, use_cache=use_cache)
+        current_app.logger.info(f"LLM 打包选点原始响应（{len(packed)} 个地址）: {llm_response.get('content')}")
+        if llm_response.get('error') or not llm_response.get('content'):
+            current_app.logger.warning(f"LLM 打包选点调用失败，改为逐条调用: {llm_response.get('error', '无有效内容返回')}")
+        else:
+            try:
+                data = _parse_llm_json(llm_response['content'])
+                if isinstance(data, dict):
+                    data = data.get('results') or data.get('decisions') or []
+                cached = bool(llm_response.get('cached'))
+                for entry in data:
+                    task_id = entry.get('id') if isinstance(entry, dict) else None
+                    if isinstance(task_id, int) and 1 <= task_id <= len(packed) and task_id not in decisions:
+                        i = packed[task_id - 1]
+                        try:
+                            decisions[task_id] = _interpret_poi_decision(entry, items[i][1], cached)
+                        except (TypeError, ValueError, AttributeError):
+                            continue
+            except Exception as e:
+                current_app.logger.warning(f"解析LLM打包选点响应失败，改为逐条调用: {e}")
+
+    for task_id, i in enumerate(packed, start=1):
+        if task_id in decisions:
+            results[i] = decisions[task_id]
+
+    fallback = [i for i in packed if results[i] is None]
+    if fallback and len(packed) > 1:
+        current_app.logger.info(f"LLM 打包选点: {len(packed) - len(fallback)} 个地址已决策，{len(fallback)} 个改为逐条调用")
+    singles = await asyncio.gather(*(
+        select_best_poi_from_search(items[i][0], items[i][1], user_id, source_context, use_cache=use_cache)
+        for i in fallback
+    ))
+    for i, selected in zip(fallback, singles):
+        results[i] = selected
+    return results
+
+
+async def validate_poi_with_dossier(original_address: str, poi_candidates: list, dossier: dict, max_bg_items: int = 12,
+                                    use_cache: bool = True) -> dict:
     """
     使用LLM结合第一步的情报摘录，判断POI候选是否与原始地址匹配，并返回结构化决策。
 
@@ -502,7 +918,8 @@ async def validate_poi_with_dossier(original_address: str, poi_candidates: list,
       'best_match_index': int | None,
       'match_confidence': float,
       'validation_reason': str,
-      'mismatch_reasons': list[str]
+      'mismatch_reasons': list[str],
+      'cached': bool  # 是否来自LLM响应缓存
     }
     """
     try:
@@ -519,13 +936,15 @@ async def validate_poi_with_dossier(original_address: str, poi_candidates: list,
         cands_str = "\n".join(cand_lines)
 
         # 2) 组织情报背景文本
+        # 按与原始地址的相关度选取摘录（最多 max_bg_items 条、控制在 token 预算内，保持原顺序）
         excerpts = []
         try:
             items = (dossier or {}).get('collated_excerpts') or []
-            for it in items[:max_bg_items]:
-                ex = (it.get('excerpt') or '').strip()
-                if ex:
-                    excerpts.append(f"- {ex}")
+            lines = [(it.get('excerpt') or '').strip() for it in items]
+            lines = [ex for ex in lines if ex]
+            token_budget = current_app.config.get('WEB_INTEL_BACKGROUND_TOKEN_BUDGET', 500)
+            for ex in sentence_rank.SentenceRanker(original_address).select(lines, token_budget, max_bg_items):
+                excerpts.append(f"- {ex}")
         except Exception:
             pass
         bg_str = "\n".join(excerpts) if excerpts else '（无）'
@@ -556,7 +975,7 @@ async def validate_poi_with_dossier(original_address: str, poi_candidates: list,
 - 若能判断出匹配项，请给出明确的 best_match_index 和简洁充分的 validation_reason。
 """
 
-        resp = await call_llm_api(prompt)
+        resp = await call_llm_api(prompt, use_cache=use_cache)
         if not resp or resp.get('error'):
             return {
                 'has_match': False,
@@ -589,7 +1008,8 @@ async def validate_poi_with_dossier(original_address: str, poi_candidates: list,
                 'best_match_index': best_idx,
                 'match_confidence': conf,
                 'validation_reason': reason,
-                'mismatch_reasons': mismatch
+                'mismatch_reasons': mismatch,
+                'cached': bool(resp.get('cached'))
             }
         except Exception:
             # 解析失败
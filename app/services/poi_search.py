@@ -2,14 +2,31 @@ import json
 import re
 import asyncio
 import aiohttp
-import traceback
-import requests # For synchronous HTTP requests in Baidu/Tianditu POI searches
+import logging
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from flask import current_app
 
-from ..utils import geo_transforms
+from ..utils import geo_transforms, http_client
 from ..utils.api_managers import APIKeyManager, baidu_limiter
-from ..utils.address_processing import extract_province_city, calculate_unified_confidence
+from ..utils.address_processing import extract_province_city, rank_candidates_by_confidence
+from ..utils.confidence_core import normalize_detail_text
+from ..utils.ttl_cache import TTLCache
+from ..utils.log_setup import log_payload, redact
+
+logger = logging.getLogger(__name__)
+
+# 每页POI数量（三个服务商均按 20 条分页）
+POI_PAGE_SIZE = 20
+
+# POI搜索结果缓存，键为 (搜索源, 标准化关键词, 城市限制, 页码)；条目上限在首次使用时按配置设置
+poi_cache = TTLCache()
+
+# 后台预取下一页的线程池。路由的事件循环在响应返回后即关闭，预取因此放在独立线程的事件循环中执行
+_prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='poi-prefetch')
+_prefetch_futures = {}
+_prefetch_lock = threading.Lock()
 
 # --- Base Class for Searchers ---
 
@@ -20,15 +37,167 @@ class BaseSearcher(ABC):
         self.source_name = ""
 
     @abstractmethod
-    async def search(self, keyword: str):
+    async def search(self, keyword: str, city_limit: str = '', page: int = 1):
+        """
+        返回 {'pois': [...], 'has_more': bool} 或 {'error': ...}。page 从 1 开始。
+        """
         pass
 
+    async def search_with_cache(self, keyword: str, city_limit: str = '', page: int = 1):
+        """
+        带缓存的搜索。返回 (results, from_cache)，from_cache 为 True 表示本次没有替该用户调用第三方API。
+        出错的结果不缓存；空结果按 POI_CACHE_NEGATIVE_TTL 缓存较短时间。
+        后台预取的页第一次被取用时视为一次正常调用（from_cache 为 False），之后再命中才算缓存命中。
+        """
+        poi_cache.maxsize = current_app.config.get('POI_CACHE_MAX_ENTRIES', poi_cache.maxsize)
+        key = poi_cache_key(self.source_name, keyword, city_limit, page)
+
+        # 同一页正在后台预取时等待其完成，避免重复调用API
+        with _prefetch_lock:
+            pending = _prefetch_futures.get(key)
+        if pending is not None:
+            try:
+                await asyncio.wrap_future(pending)
+            except Exception as e:
+                logger.warning("等待POI预取失败: %s: %s", key, e)
+
+        hit, entry = poi_cache.get(key)
+        if hit:
+            if entry['prefetched']:
+                poi_cache.set(key, dict(entry, prefetched=False), self._cache_ttl(entry['pois']))
+            logger.info("POI缓存命中: %s", key)
+            return {'pois': [dict(poi) for poi in entry['pois']], 'has_more': entry['has_more']}, not entry['prefetched']
+
+        results = await self.search(keyword, city_limit=city_limit, page=page)
+        self._store(key, results, prefetched=False)
+        return results, False
+
+    def prefetch_page(self, keyword: str, city_limit: str = '', page: int = 2):
+        """在后台线程中预取指定页并写入缓存；已缓存或正在预取时直接返回。"""
+        key = poi_cache_key(self.source_name, keyword, city_limit, page)
+        if poi_cache.get(key)[0]:
+            return
+        app = current_app._get_current_object()
+        with _prefetch_lock:
+            if key in _prefetch_futures:
+                return
+            future = _prefetch_executor.submit(self._run_prefetch, app, key, keyword, city_limit, page)
+            _prefetch_futures[key] = future
+        future.add_done_callback(lambda _: _prefetch_futures.pop(key, None))
+
+    def _run_prefetch(self, app, key, keyword, city_limit, page):
+        async def _fetch():
+            try:
+                return await self.search(keyword, city_limit=city_limit, page=page)
+            finally:
+                await http_client.close_session()
+
+        with app.app_context():
+            results = asyncio.run(_fetch())
+            self._store(key, results, prefetched=True)
+            app.logger.info(f"POI预取完成: {key}, 结果 {len(results.get('pois', []))} 条")
+
+    def _cache_ttl(self, pois):
+        if pois:
+            return current_app.config.get('POI_CACHE_TTL', {}).get(self.source_name, 0)
+        return current_app.config.get('POI_CACHE_NEGATIVE_TTL', 0)
+
+    def _store(self, key, results, prefetched):
+        if 'error' in results:
+            return
+        pois = results.get('pois', [])
+        entry = {'pois': [dict(poi) for poi in pois], 'has_more': bool(results.get('has_more')), 'prefetched': prefetched}
+        poi_cache.set(key, entry, self._cache_ttl(pois))
+
     def _get_key(self):
         """Gets the next available API key."""
         if self.key_manager:
             return self.key_manager.get_next_key(self.user_id)
         raise ValueError("APIKeyManager not initialized for this searcher.")
 
+    async def _get_json(self, url: str, params: dict, headers: dict = None, retry_count: int = 3, label: str = ''):
+        """
+        通过共享连接池发起GET请求并解析JSON，超时与重试策略与高德POI搜索一致
+        （单次10秒超时，失败后间隔1秒重试，共 retry_count 次）。请求在 http_client 的后台事件循环上发出，
+        跨 Flask 请求复用到服务商的 keep-alive 连接。
+
+        Returns:
+            (data, error)：成功时 error 为 None，全部尝试失败时 data 为 None
+        """
+        label = label or self.source_name
+        # 与 requests 行为一致：忽略值为 None 的参数（aiohttp 不接受 None）
+        params = {k: v for k, v in params.items() if v is not None}
+        error = None
+        for attempt in range(retry_count):
+            try:
+                status, body = await http_client.in_background(http_client.get_text(
+                    url, params=params, headers=headers, timeout=aiohttp.ClientTimeout(total=10)
+                ))
+                logger.debug("%sAPI响应状态: %s", label, status)
+                if status != 200:
+                    logger.warning("%sAPI HTTP错误 (尝试 %d): %s - %s", label, attempt + 1, status, body[:200])
+                    error = f"{label} API HTTP Error: {status}"
+                else:
+                    # 百度/天地图的 Content-Type 并不总是 application/json
+                    return json.loads(body), None
+            except aiohttp.ClientError as e:
+                logger.warning("%sAPI请求客户端错误 (尝试 %d): %s", label, attempt + 1, e)
+                error = f"An exception occurred: {e}"
+            except asyncio.TimeoutError:
+                logger.warning("%sAPI请求超时 (尝试 %d)", label, attempt + 1)
+                error = f"{label} API request timeout (attempt {attempt + 1})"
+            except ValueError as e:
+                logger.warning("%sAPI响应不是有效的JSON (尝试 %d): %s", label, attempt + 1, e)
+                error = f"Invalid JSON response: {e}"
+
+            if attempt < retry_count - 1:
+                await asyncio.sleep(1)
+        return None, error
+
+
+def _to_int(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def poi_cache_key(source: str, keyword: str, city_limit: str = '', page: int = 1):
+    """缓存键：关键词做全角转半角、小写并去除空白，避免写法差异导致重复调用API。"""
+    return (source or '').lower(), normalize_detail_text(keyword), normalize_detail_text(city_limit), page
+
+
+def _attach_confidences(results: list, candidates_for_conf: list, original_keyword: str):
+    """
+    为POI结果批量计算统一置信度。只有前 POI_CONFIDENCE_TOP_K 名保证是精确值，
+    其余被剪枝的候选写入置信度下界，并标记 confidence_estimated。
+    """
+    ranked = rank_candidates_by_confidence(
+        original_address=original_keyword,
+        candidates=candidates_for_conf,
+        mode='poi',
+        top_k=current_app.config.get('POI_CONFIDENCE_TOP_K'),
+        floor=current_app.config.get('POI_CONFIDENCE_FLOOR', 0.0)
+    )
+    for result, (confidence, is_exact) in zip(results, ranked):
+        result['confidence'] = confidence
+        if not is_exact:
+            result['confidence_estimated'] = True
+        logger.debug("[POI_SERVICE_DEBUG] POI: '%s', calculated confidence: %.3f", result.get('name'), confidence)
+
+def _attach_transformed_coordinates(results: list, src: str, dst: str, from_sys: str, to_sys: str):
+    """批量把 longitude_{src}/latitude_{src} 转换到目标坐标系，写入 longitude_{dst}/latitude_{dst}。"""
+    if not results:
+        return
+    lngs, lats = geo_transforms.coordinate_transform_batch(
+        [r[f'longitude_{src}'] for r in results],
+        [r[f'latitude_{src}'] for r in results],
+        from_sys, to_sys
+    )
+    for result, lng, lat in zip(results, lngs.tolist(), lats.tolist()):
+        result[f'longitude_{dst}'] = lng
+        result[f'latitude_{dst}'] = lat
+
 # --- Amap Searcher ---
 
 class AmapSearcher(BaseSearcher):
@@ -38,74 +207,69 @@ class AmapSearcher(BaseSearcher):
         amap_key = current_app.config.get('AMAP_KEY')
         self.key_manager = APIKeyManager('amap', default_key=amap_key)
 
-    async def search(self, keyword: str, city_limit: str = '', retry_count: int = 3):
+    async def search(self, keyword: str, city_limit: str = '', page: int = 1, retry_count: int = 3):
         url = 'https://restapi.amap.com/v3/place/text'
         params = {
             'key': self._get_key(),
             'keywords': keyword,
-            'offset': 20,
-            'page': 1,
+            'offset': POI_PAGE_SIZE,
+            'page': page,
             'extensions': 'all'
         }
         if city_limit:
             params['city'] = city_limit
 
-        print(f"\n开始异步调用高德地图POI搜索API，关键词: {keyword}, 城市限制: {city_limit}")
-        print(f"请求URL: {url}")
-        print(f"请求参数: {params}")
+        logger.info("高德POI搜索: 关键词=%s, 城市限制=%s, 页码=%d", keyword, city_limit, page)
+        log_payload(logger, 'amap_poi_request', redact(params))
 
         for attempt in range(retry_count):
-            print(f"  当前是第 {attempt + 1} 次尝试")
+            logger.debug("高德POI搜索第 %d 次尝试", attempt + 1)
             try:
                 # amap_limiter.acquire() will be called from geocoding.py if needed, not directly here to avoid circular dependency for now
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, params=params, timeout=10) as response:
-                        if response.status != 200:
-                            print(f"    高德POI API HTTP错误: {response.status} - {await response.text()}")
-                            if attempt == retry_count - 1:
-                                return {'error': f"Amap API HTTP Error: {response.status}"}
-                            await asyncio.sleep(1)
-                            continue
-                        
-                        data = await response.json()
-                        
-                        # 添加响应内容日志
-                        print(f"高德API响应状态: {response.status}")
-                        response_text = str(data)
-                        if len(response_text) > 500:
-                            print(f"高德API响应内容: {response_text[:500]}...")
-                        else:
-                            print(f"高德API响应内容: {response_text}")
-
-                        if data.get('status') == '1':
-                            # 成功响应，检查是否有POI结果
-                            pois_list = data.get('pois', [])
-                            if pois_list:
-                                pois = self._process_amap_results(pois_list, keyword)
-                                return {'pois': pois}
-                            else:
-                                # 成功但无结果，这是正常情况，不是错误
-                                print(f"    高德POI API成功响应但无POI结果 (尝试 {attempt + 1})")
-                                return {'pois': []}
-                        else:
-                            error_msg = data.get('info', '未知错误')
-                            print(f"    高德POI API返回错误 (尝试 {attempt + 1}): {error_msg} (状态码: {data.get('infocode')})")
-                            if attempt == retry_count - 1:
-                                return {'error': error_msg}
-                            if data.get('infocode') in ['10001', '10002', '10003']:
-                                print("    密钥相关错误，不再重试。")
-                                return {'error': error_msg}
+                status, text = await http_client.in_background(http_client.get_text(
+                    url, params=params, timeout=aiohttp.ClientTimeout(total=10)
+                ))
+                if status != 200:
+                    logger.warning("高德POI API HTTP错误: %s - %s", status, text[:200])
+                    if attempt == retry_count - 1:
+                        return {'error': f"Amap API HTTP Error: {status}"}
+                    await asyncio.sleep(1)
+                    continue
+                
+                data = json.loads(text)
+                
+                log_payload(logger, 'amap_poi_response', data)
+
+                if data.get('status') == '1':
+                    # 成功响应，检查是否有POI结果
+                    pois_list = data.get('pois', [])
+                    # count 为结果总数
+                    has_more = _to_int(data.get('count')) > page * POI_PAGE_SIZE
+                    if pois_list:
+                        pois = self._process_amap_results(pois_list, keyword)
+                        return {'pois': pois, 'has_more': has_more}
+                    else:
+                        # 成功但无结果，这是正常情况，不是错误
+                        logger.info("高德POI API成功响应但无POI结果 (尝试 %d)", attempt + 1)
+                        return {'pois': [], 'has_more': False}
+                else:
+                    error_msg = data.get('info', '未知错误')
+                    logger.warning("高德POI API返回错误 (尝试 %d): %s (状态码: %s)", attempt + 1, error_msg, data.get('infocode'))
+                    if attempt == retry_count - 1:
+                        return {'error': error_msg}
+                    if data.get('infocode') in ['10001', '10002', '10003']:
+                        logger.warning("高德POI API密钥相关错误，不再重试。")
+                        return {'error': error_msg}
             except aiohttp.ClientError as e:
-                print(f"  高德POI API请求客户端错误 (尝试 {attempt + 1}): {str(e)}")
+                logger.warning("高德POI API请求客户端错误 (尝试 %d): %s", attempt + 1, e)
                 if attempt == retry_count - 1:
                     return {'error': f"An exception occurred: {e}"}
             except asyncio.TimeoutError:
-                print(f"  高德POI API请求超时 (尝试 {attempt + 1})")
+                logger.warning("高德POI API请求超时 (尝试 %d)", attempt + 1)
                 if attempt == retry_count - 1:
                     return {'error': f"Amap API request timeout (attempt {attempt + 1})"}
             except Exception as e:
-                print(f"  高德POI API未知异常 (尝试 {attempt + 1}): {str(e)}")
-                traceback.print_exc()
+                logger.exception("高德POI API未知异常 (尝试 %d): %s", attempt + 1, e)
                 if attempt == retry_count - 1:
                     return {'error': f"An exception occurred: {e}"}
             
@@ -116,162 +280,139 @@ class AmapSearcher(BaseSearcher):
 
     def _process_amap_results(self, pois_data, original_keyword: str):
         results = []
+        candidates_for_conf = []
         for poi in pois_data:
             location_str = poi.get('location')
             if not location_str:
-                print(f"    警告: POI '{poi.get('name')}' 缺少location信息，跳过。")
+                logger.debug("POI '%s' 缺少location信息，跳过。", poi.get('name'))
                 continue
             
             try:
                 lng_gcj02, lat_gcj02 = map(float, location_str.split(','))
-                transformed_lng_wgs84, transformed_lat_wgs84 = geo_transforms.coordinate_transform(lng_gcj02, lat_gcj02, 'GCJ02', 'WGS84')
-                
-                # --- 置信度计算 ---
-                # 在这里调用统一的置信度计算函数
-                confidence = calculate_unified_confidence(
-                    original_address=original_keyword,
-                    candidate_data=poi,
-                    mode='poi'
-                )
-                current_app.logger.debug(f"[POI_SERVICE_DEBUG] POI: '{poi.get('name')}', calculated confidence: {confidence:.3f}")
-                
+                candidates_for_conf.append(poi)
                 results.append({
                     'name': poi.get('name', ''),
                     'address': poi.get('address', ''),
                     'pname': poi.get('pname', ''),
                     'cityname': poi.get('cityname', ''),
                     'adname': poi.get('adname', ''),
+                    'adcode': poi.get('adcode') if isinstance(poi.get('adcode'), str) else '',
                     'latitude_gcj02': lat_gcj02,
                     'longitude_gcj02': lng_gcj02,
-                    'latitude_wgs84': transformed_lat_wgs84,
-                    'longitude_wgs84': transformed_lng_wgs84,
                     'type': poi.get('type', ''),
                     'tel': poi.get('tel', ''),
                     'source': 'amap_poi',
                     'source_api': 'amap_poi',
-                    'source_display_name': '高德地图',
-                    'confidence': confidence # 将置信度添加到结果中
+                    'source_display_name': '高德地图'
                 })
             except (ValueError, TypeError):
-                print(f"    警告: POI '{poi.get('name')}' 的location格式无效 ('{location_str}')，跳过。")
+                logger.debug("POI '%s' 的location格式无效 ('%s')，跳过。", poi.get('name'), location_str)
                 continue
+
+        # 整页结果一次性完成 GCJ02 -> WGS84 转换
+        _attach_transformed_coordinates(results, 'gcj02', 'wgs84', 'GCJ02', 'WGS84')
+
+        # --- 置信度计算 ---
+        # 统一置信度计算（带前 K 名剪枝），结果写回每个POI
+        _attach_confidences(results, candidates_for_conf, original_keyword)
         return results
 
-# --- Baidu Searcher (Sync but wrapped) ---
+# --- Baidu Searcher ---
 
 class BaiduSearcher(BaseSearcher):
     def __init__(self, user_id=None):
         super().__init__(user_id)
         self.source_name = "baidu"
-        # Get config values during initialization to avoid app context issues
         self.baidu_key = current_app.config.get('BAIDU_KEY')
         self.key_manager = APIKeyManager('baidu', default_key=self.baidu_key)
 
-    async def search(self, keyword: str):
-        # Wrap the synchronous search in an async method with Flask app context
-        loop = asyncio.get_event_loop()
+    async def search(self, keyword: str, city_limit: str = '', page: int = 1, retry_count: int = 3):
         try:
-            flask_app = current_app._get_current_object()
-            pois = await loop.run_in_executor(None, lambda: self._sync_search_with_context(flask_app, keyword))
-            return {'pois': pois}
-        except Exception as e:
-            return {'error': f"An exception occurred in Baidu search: {e}"}
+            province, city = extract_province_city(keyword)
+            region = city_limit or city or province or "全国"
+
+            url = "https://api.map.baidu.com/place/v2/search"
+            # 百度的 page_num 从 0 开始
+            params = {
+                "ak": self.baidu_key, "query": keyword, "region": region,
+                "output": "json", "scope": 2, "page_size": POI_PAGE_SIZE, "page_num": page - 1,
+                "ret_coordtype": "bd09ll"
+            }
 
-    def _sync_search_with_context(self, app, keyword):
-        with app.app_context():
-            return self._sync_search(keyword)
+            logger.info("百度POI搜索: 关键词=%s, 区域=%s, 页码=%d", keyword, region, page)
+            log_payload(logger, 'baidu_poi_request', redact(params))
 
-    def _sync_search(self, keyword):
-        from ..utils.address_processing import extract_province_city
-        province, city = extract_province_city(keyword)
-        region = city if city else province or "全国"
-        
-        url = "https://api.map.baidu.com/place/v2/search"
-        params = {
-            "ak": self.baidu_key, "query": keyword, "region": region,
-            "output": "json", "scope": 2, "page_size": 20, "ret_coordtype": "bd09ll"
-        }
-        
-        print(f"百度POI搜索请求: {url}")
-        print(f"百度请求参数: {params}")
-        
-        response = requests.get(url, params=params, timeout=10)
-        print(f"百度API响应状态: {response.status_code}")
-        if response.status_code != 200:
-            print(f"百度API错误响应: {response.text}")
-        else:
-            response_text = response.text
-            if len(response_text) > 500:
-                print(f"百度API响应内容: {response_text[:500]}...")
-            else:
-                print(f"百度API响应内容: {response_text}")
-        
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get("status") == 0 and data.get("results"):
-            return self._process_baidu_results(data["results"], keyword)
-        return []
+            data, error = await self._get_json(url, params, retry_count=retry_count, label='百度')
+            if error:
+                return {'error': error}
+
+            log_payload(logger, 'baidu_poi_response', data)
+
+            if data.get("status") == 0 and data.get("results"):
+                # total 为结果总数
+                has_more = _to_int(data.get("total")) > page * POI_PAGE_SIZE
+                return {'pois': self._process_baidu_results(data["results"], keyword), 'has_more': has_more}
+            return {'pois': [], 'has_more': False}
+        except Exception as e:
+            return {'error': f"An exception occurred in Baidu search: {e}"}
 
     def _process_baidu_results(self, results_data, original_keyword: str):
         results = []
-        for poi in results_data:
-            if 'location' not in poi: continue
-            wgs84 = geo_transforms.bd09_to_wgs84(poi['location']['lng'], poi['location']['lat'])
-            gcj02 = geo_transforms.wgs84_to_gcj02(wgs84[0], wgs84[1])
+        candidates_for_conf = []
+        results_data = [poi for poi in results_data if 'location' in poi]
+        if not results_data:
+            return results
+        # 整页结果一次性完成 BD09 -> WGS84 -> GCJ02 转换
+        wgs_lngs, wgs_lats = geo_transforms.bd09_to_wgs84_batch(
+            [poi['location']['lng'] for poi in results_data],
+            [poi['location']['lat'] for poi in results_data]
+        )
+        gcj_lngs, gcj_lats = geo_transforms.wgs84_to_gcj02_batch(wgs_lngs, wgs_lats)
+        coords = zip(wgs_lngs.tolist(), wgs_lats.tolist(), gcj_lngs.tolist(), gcj_lats.tolist())
+        for poi, (wgs_lng, wgs_lat, gcj_lng, gcj_lat) in zip(results_data, coords):
             # 统一置信度计算需要POI字段对齐：pname/cityname/adname
             candidate_for_conf = {
                 'name': poi.get('name', ''),
                 'address': poi.get('address', ''),
                 'pname': poi.get('province', ''),
                 'cityname': poi.get('city', ''),
-                'adname': poi.get('area', '') or poi.get('district', '')
+                'adname': poi.get('area', '') or poi.get('district', ''),
+                'adcode': poi.get('adcode', '')
             }
-            confidence = calculate_unified_confidence(
-                original_address=original_keyword,
-                candidate_data=candidate_for_conf,
-                mode='poi'
-            )
+            candidates_for_conf.append(candidate_for_conf)
             results.append({
                 'name': poi.get('name', ''),
                 'address': poi.get('address', ''),
                 'pname': poi.get('province', ''),
                 'cityname': poi.get('city', ''),
                 'adname': poi.get('area', '') or poi.get('district', ''),
-                'longitude_wgs84': wgs84[0],
-                'latitude_wgs84': wgs84[1],
-                'longitude_gcj02': gcj02[0],
-                'latitude_gcj02': gcj02[1],
+                'adcode': str(poi.get('adcode', '') or ''),
+                'longitude_wgs84': wgs_lng,
+                'latitude_wgs84': wgs_lat,
+                'longitude_gcj02': gcj_lng,
+                'latitude_gcj02': gcj_lat,
                 'source': 'baidu_poi',
                 'source_api': 'baidu_poi',
-                'source_display_name': '百度地图',
-                'confidence': confidence
+                'source_display_name': '百度地图'
             })
+        _attach_confidences(results, candidates_for_conf, original_keyword)
         return results
 
-# --- Tianditu Searcher (Sync but wrapped) ---
+# --- Tianditu Searcher ---
 class TiandituSearcher(BaseSearcher):
     def __init__(self, user_id=None):
         super().__init__(user_id)
         self.source_name = "tianditu"
-        # Get config values during initialization to avoid app context issues
         self.tianditu_key = current_app.config.get('TIANDITU_KEY')
         self.key_manager = APIKeyManager('tianditu', default_key=self.tianditu_key)
 
-    async def search(self, keyword: str):
-        loop = asyncio.get_event_loop()
+    async def search(self, keyword: str, city_limit: str = '', page: int = 1, retry_count: int = 3):
         try:
-            flask_app = current_app._get_current_object()
-            pois = await loop.run_in_executor(None, lambda: self._sync_search_with_context(flask_app, keyword))
-            return {'pois': pois}
+            return await self._search(keyword, city_limit, page, retry_count)
         except Exception as e:
             return {'error': f"An exception occurred in Tianditu search: {e}"}
 
-    def _sync_search_with_context(self, app, keyword):
-        with app.app_context():
-            return self._sync_search(keyword)
-
-    def _sync_search(self, keyword):
+    async def _search(self, keyword, city_limit, page, retry_count):
         url = "https://api.tianditu.gov.cn/v2/search"
         
         # 使用行政区划区域搜索（queryType=12），并尽量设置 specify 以提高召回的行政区字段
@@ -294,26 +435,26 @@ class TiandituSearcher(BaseSearcher):
             m = re.search(r'([\u4e00-\u9fa5]{2,}(?:省|市|区|县))', text)
             return m.group(1) if m else ''
         
-        admin_specify = city or province or _infer_admin_from_text(keyword)
+        admin_specify = city_limit or city or province or _infer_admin_from_text(keyword)
 
         # 修正：根据官方文档，queryType=1/7（普通/地名搜索）时，level 和 mapBound 均为必填
         # 因此，不再使用 queryType=12，而是统一使用 queryType=1，并按需提供 specify
         post_data = {
             "keyWord": str(keyword),
             "queryType": "1", # 统一使用最通用的关键字搜索
-            "count": "20",
-            "start": "0"
+            "count": str(POI_PAGE_SIZE),
+            "start": str((page - 1) * POI_PAGE_SIZE)
         }
 
         if admin_specify:
-            current_app.logger.info(f"[TDT_SEARCH] 使用 specify='{admin_specify}' 进行区域限定搜索")
+            logger.debug("[TDT_SEARCH] 使用 specify='%s' 进行区域限定搜索", admin_specify)
             post_data["specify"] = admin_specify
             # 区域搜索时，可以使用一个较精细的默认级别
             post_data["level"] = "10" 
             # 修正：即使是区域搜索，mapBound 也是必填项。我们提供一个足够大的默认值。
             post_data["mapBound"] = "73,3,136,54"
         else:
-            current_app.logger.info("[TDT_SEARCH] 未找到行政区, 使用中国范围进行全国搜索")
+            logger.debug("[TDT_SEARCH] 未找到行政区, 使用中国范围进行全国搜索")
             # 全国搜索时，使用一个较宏观的级别和全国范围的Bound
             post_data["level"] = "18"
             post_data["mapBound"] = "73,3,136,54" # 中国大致范围 (minX,minY,maxX,maxY)
@@ -321,76 +462,64 @@ class TiandituSearcher(BaseSearcher):
         # 不使用ensure_ascii=False，保持默认行为；添加 show=2 以返回更详细行政区字段
         params = {"postStr": json.dumps(post_data), "type": "query", "tk": self.tianditu_key, "show": "2"}
 
-        print(f"天地图POI搜索请求: {url}")
-        print(f"天地图请求参数: {params}")
+        logger.info("天地图POI搜索: 关键词=%s, specify=%s, 页码=%d", keyword, admin_specify, page)
+        log_payload(logger, 'tianditu_poi_request', redact(params))
         
         # Add User-Agent header to avoid 418 Client Error
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
 
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        
-        print(f"天地图API响应状态: {response.status_code}")
-        if response.status_code != 200:
-            print(f"天地图API错误响应: {response.text}")
-            response.raise_for_status()
-        else:
-            print(f"天地图API响应内容: {response.text[:500]}...")
-
-        data = response.json()
+        data, error = await self._get_json(url, params, headers=headers, retry_count=retry_count, label='天地图')
+        if error:
+            return {'error': error}
         
         # 根据天地图官方文档解析响应
         result_type = data.get("resultType")
         count = data.get("count", 0)
         
-        # 增加新日志：打印从天地图API返回的未经处理的原始JSON数据
-        print(f"[RAW_TIANDITU_RESPONSE] {json.dumps(data, ensure_ascii=False)}")
-        
-        print(f"天地图响应解析: resultType={result_type}, count={count}")
+        # 原始响应按 LOG_PAYLOAD_SAMPLE_RATE 抽样记录
+        log_payload(logger, 'tianditu_poi_response', data)
+        logger.debug("天地图响应解析: resultType=%s, count=%s", result_type, count)
         
         if result_type == 1:
             # resultType=1: 普通POI，解析pois数组
             pois_data = data.get("pois", [])
             if pois_data:
-                try:
-                    sample = pois_data[:3]
-                    print(f"✅ 天地图找到{len(pois_data)}个POI，样本(前3)：{json.dumps(sample, ensure_ascii=False)}")
-                except Exception:
-                    print(f"✅ 天地图找到{len(pois_data)}个POI（样本打印失败）")
-                return self._process_tianditu_results(pois_data, keyword, province, city)
+                logger.info("天地图找到 %d 个POI", len(pois_data))
+                has_more = _to_int(count) > page * POI_PAGE_SIZE
+                return {'pois': self._process_tianditu_results(pois_data, keyword, province, city), 'has_more': has_more}
             else:
-                print("天地图resultType=1但pois为空")
-                return []
+                logger.info("天地图resultType=1但pois为空")
+                return {'pois': [], 'has_more': False}
         elif result_type == 2:
-            print("天地图返回统计信息(resultType=2)，无POI数据")
-            return []
+            logger.info("天地图返回统计信息(resultType=2)，无POI数据")
+            return {'pois': [], 'has_more': False}
         elif result_type == 3:
-            print("天地图返回行政区信息(resultType=3)，无POI数据")
-            return []
+            logger.info("天地图返回行政区信息(resultType=3)，无POI数据")
+            return {'pois': [], 'has_more': False}
         elif result_type == 4:
-            print("天地图返回搜索建议(resultType=4)，无POI数据")
-            return []
+            logger.info("天地图返回搜索建议(resultType=4)，无POI数据")
+            return {'pois': [], 'has_more': False}
         elif result_type == 5:
-            print("天地图返回线路信息(resultType=5)，无POI数据")
-            return []
+            logger.info("天地图返回线路信息(resultType=5)，无POI数据")
+            return {'pois': [], 'has_more': False}
         else:
-            print(f"天地图返回未知类型(resultType={result_type})")
-            return []
+            logger.warning("天地图返回未知类型(resultType=%s)", result_type)
+            return {'pois': [], 'has_more': False}
         
     def _process_tianditu_results(self, pois_data, original_keyword: str, keyword_province: str = "", keyword_city: str = ""):
         results = []
+        candidates_for_conf = []
         for poi in pois_data:
             lonlat = poi.get("lonlat")
             if not lonlat: continue
             try:
                 # 天地图官方API返回的是CGCS2000坐标系，这在大多数场景下等同于WGS-84。
                 # 因此，我们直接将API返回的坐标视为WGS-84坐标。
-                wgs_lng, wgs_lat = map(float, lonlat.split(','))
-                
                 # 为了与应用内其他使用GCJ-02坐标的服务（如高德地图）保持一致性，
-                # 我们需要从WGS-84坐标转换生成一份GCJ-02坐标。
-                gcj_lng, gcj_lat = geo_transforms.wgs84_to_gcj02(wgs_lng, wgs_lat)
+                # 循环结束后会从WGS-84坐标批量转换生成一份GCJ-02坐标。
+                wgs_lng, wgs_lat = map(float, lonlat.split(','))
                 
                 # 改进地址处理：如果address只是省市区信息，使用name作为主要地址
                 address = poi.get('address', '')
@@ -431,11 +560,7 @@ class TiandituSearcher(BaseSearcher):
                     'cityname': cityname,
                     'adname': adname
                 }
-                confidence = calculate_unified_confidence(
-                    original_address=original_keyword,
-                    candidate_data=candidate_for_conf,
-                    mode='poi'
-                )
+                candidates_for_conf.append(candidate_for_conf)
                 results.append({
                     'name': name,
                     'address': full_address,
@@ -444,15 +569,14 @@ class TiandituSearcher(BaseSearcher):
                     'adname': adname,
                     'longitude_wgs84': wgs_lng, 
                     'latitude_wgs84': wgs_lat,
-                    'longitude_gcj02': gcj_lng, 
-                    'latitude_gcj02': gcj_lat,
                     'source': 'tianditu_poi',
                     'source_api': 'tianditu_poi',
-                    'source_display_name': '天地图',
-                    'confidence': confidence
+                    'source_display_name': '天地图'
                 })
             except (ValueError, TypeError):
                 continue
+        _attach_transformed_coordinates(results, 'wgs84', 'gcj02', 'WGS84', 'GCJ02')
+        _attach_confidences(results, candidates_for_conf, original_keyword)
         return results
 
 # --- Factory Function ---
@@ -1,9 +1,16 @@
+import asyncio
+import codecs
 import re
 import urllib.parse
-import requests
+
+import aiohttp
 from bs4 import BeautifulSoup
 from flask import current_app
 
+from ..utils import html_extract, http_client, sentence_rank
+from ..utils.confidence_core import normalize_detail_text
+from ..utils.disk_cache import DiskCache
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
@@ -11,6 +18,43 @@ HEADERS = {
     "Connection": "keep-alive",
 }
 
+DEFAULT_DEADLINE_SECONDS = 20
+DEFAULT_PER_HOST_LIMIT = 4
+DEFAULT_ARTICLE_MAX_BYTES = 512 * 1024
+ARTICLE_MAX_CHARS = 4000
+
+_SERP_TIMEOUT = aiohttp.ClientTimeout(total=10)
+_RESOLVE_HEAD_TIMEOUT = aiohttp.ClientTimeout(total=8)
+_RESOLVE_GET_TIMEOUT = aiohttp.ClientTimeout(total=10)
+_ARTICLE_TIMEOUT = aiohttp.ClientTimeout(total=12)
+_ARTICLE_CHUNK_SIZE = 16 * 1024
+
+# 搜索页解析结果、真实链接与正文文本的磁盘缓存（WEB_CACHE_DIR 为空时不缓存）
+_web_cache = None
+
+
+def _get_web_cache():
+    global _web_cache
+    directory = current_app.config.get('WEB_CACHE_DIR')
+    if not directory:
+        return None
+    if _web_cache is None or _web_cache.directory != directory:
+        _web_cache = DiskCache(directory)
+    return _web_cache
+
+
+def _cache_get(kind: str, key):
+    cache = _get_web_cache()
+    if cache is None:
+        return False, None
+    return cache.get(kind, key)
+
+
+def _cache_set(kind: str, key, value):
+    cache = _get_web_cache()
+    if cache is not None:
+        cache.set(kind, key, value, current_app.config.get('WEB_CACHE_TTL', {}).get(kind, 0))
+
 def _fix_weixin_url(url: str) -> str:
     try:
         if 'mp.weixin.qq.com' in url:
@@ -29,7 +73,22 @@ def _fix_weixin_url(url: str) -> str:
         return url
 
 
-def _get_real_url(sogou_url: str) -> str:
+class _HostLimiter:
+    """按主机名限制同时进行的请求数，同一次搜索内的所有请求共享。"""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, int(limit))
+        self._semaphores = {}
+
+    def __call__(self, url: str) -> asyncio.Semaphore:
+        host = urllib.parse.urlparse(url).hostname or ''
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.limit)
+        return semaphore
+
+
+async def _get_real_url(session: aiohttp.ClientSession, limiter: _HostLimiter, sogou_url: str) -> str:
     try:
         if 'weixin.qq.com' in sogou_url or 'mp.weixin.qq.com' in sogou_url:
             return _fix_weixin_url(sogou_url)
@@ -39,53 +98,74 @@ def _get_real_url(sogou_url: str) -> str:
         else:
             full_url = sogou_url
 
-        resp = requests.head(full_url, headers=HEADERS, allow_redirects=False, timeout=8)
-        if resp.status_code in (301, 302):
-            return resp.headers.get('Location', '')
-
-        resp = requests.get(full_url, headers=HEADERS, allow_redirects=False, timeout=10)
-        if resp.status_code in (301, 302):
-            return resp.headers.get('Location', '')
-
-        m = re.search(r"window\.location\.replace\([\"\'](.*?)[\"\']", resp.text)
-        if m:
-            return m.group(1)
-        return full_url
+        hit, real_url = _cache_get('redirect', full_url)
+        if hit:
+            return real_url
+        real_url = await _resolve_link(session, limiter, full_url)
+        if _is_resolved_target(real_url):
+            _cache_set('redirect', full_url, real_url)
+        return real_url
     except Exception:
         return sogou_url
 
 
-def _get_article_content(url: str) -> str:
+def _is_resolved_target(url: str) -> bool:
+    """跳转目标是否为站外网址：空值、相对地址或仍指向搜狗（如反爬验证页）的结果不缓存。"""
+    host = (urllib.parse.urlparse(url or '').hostname or '').lower()
+    return bool(host) and host != 'sogou.com' and not host.endswith('.sogou.com')
+
+
+async def _resolve_link(session: aiohttp.ClientSession, limiter: _HostLimiter, full_url: str) -> str:
+    """跟随搜狗跳转链接得到目标网址，网络错误时抛出异常。"""
+    async with limiter(full_url):
+        async with session.head(full_url, headers=HEADERS, allow_redirects=False,
+                                timeout=_RESOLVE_HEAD_TIMEOUT) as resp:
+            if resp.status in (301, 302):
+                return resp.headers.get('Location', '')
+
+        async with session.get(full_url, headers=HEADERS, allow_redirects=False,
+                               timeout=_RESOLVE_GET_TIMEOUT) as resp:
+            if resp.status in (301, 302):
+                return resp.headers.get('Location', '')
+            resp.raise_for_status()
+            text = await resp.text(errors='replace')
+
+    m = re.search(r"window\.location\.replace\([\"\'](.*?)[\"\']", text)
+    if m:
+        return m.group(1)
+    return full_url
+
+
+async def _get_article_content(session: aiohttp.ClientSession, limiter: _HostLimiter, url: str) -> str:
+    """
+    边下载边提取正文：读取量达到 WEB_ARTICLE_MAX_BYTES，或 <article> 正文已完整/已足够时停止读取。
+    """
     try:
+        hit, text = _cache_get('article', url)
+        if hit:
+            return text
         headers = dict(HEADERS)
         if 'mp.weixin.qq.com' in url:
             headers.update({'Host': 'mp.weixin.qq.com', 'Referer': 'https://mp.weixin.qq.com/'})
-        resp = requests.get(url, headers=headers, timeout=12)
-        resp.raise_for_status()  # 确保请求成功
-        
-        # 将原始二进制内容传给BeautifulSoup，让它来处理编码问题，更为可靠
-        soup = BeautifulSoup(resp.content, 'html.parser')
-
-        # 移除噪声
-        for tag in soup(['script', 'style', 'iframe']):
-            tag.decompose()
-
-        article = (
-            soup.find('article') or
-            soup.find('div', id='js_content') or
-            soup.find('div', class_='rich_media_content') or
-            soup.find('div', class_=re.compile(r'(article|content|text|main)', re.I)) or
-            soup.find('div', id=re.compile(r'(article|content|text|main)', re.I))
-        )
-        text = ''
-        if article:
-            text = article.get_text(' ', strip=True)
-        else:
-            text = soup.body.get_text(' ', strip=True) if soup.body else ''
-
-        # 清理
-        text = re.sub(r"\s+", " ", text)
-        return text[:4000]
+        max_bytes = current_app.config.get('WEB_ARTICLE_MAX_BYTES', DEFAULT_ARTICLE_MAX_BYTES)
+        extractor = html_extract.ArticleTextExtractor(ARTICLE_MAX_CHARS)
+        async with limiter(url):
+            async with session.get(url, headers=headers, timeout=_ARTICLE_TIMEOUT) as resp:
+                resp.raise_for_status()  # 确保请求成功
+                decoder = None
+                received = 0
+                async for chunk in resp.content.iter_chunked(_ARTICLE_CHUNK_SIZE):
+                    if decoder is None:
+                        encoding = html_extract.sniff_encoding(chunk, resp.charset)
+                        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+                    extractor.feed(decoder.decode(chunk))
+                    received += len(chunk)
+                    if received >= max_bytes or extractor.done:
+                        break
+        extractor.close()
+        text = extractor.text()
+        _cache_set('article', url, text)
+        return text
     except Exception:
         return ''
 
@@ -93,101 +173,139 @@ def _get_article_content(url: str) -> str:
 def _extract_relevant_sentences(original_address: str, text: str, max_sentences: int = 3) -> str:
     if not text:
         return ''
-    # 分句（中文/英文标点）
-    sentences = re.split(r'[。！？!?；;\n]+', text)
-    if not sentences:
-        return ''
+    # 分句后按地址关键词与行政区关键词评分，取得分最高的几句
+    ranked = sentence_rank.SentenceRanker(original_address).rank(sentence_rank.split_sentences(text))
+    return '。'.join(sentence for _, _, sentence in ranked[:max_sentences])
 
-    # 地址关键词与行政区关键词
-    addr_tokens = [t for t in re.split(r'[\s,，、]+', original_address) if t]
-    keywords = [
-        '位于', '坐落', '地处', '隶属于', '行政区', '辖区', '省', '市', '县', '区', '镇', '乡', '街道',
-        '大道', '公路', '道路', '路', '巷', '村', '社区', '附近', '坐标', '经度', '纬度'
-    ]
-
-    def score(s: str) -> float:
-        sc = 0.0
-        s_low = s.lower()
-        for k in keywords:
-            if k in s:
-                sc += 1.0
-        for tok in addr_tokens[-3:]:  # 取地址尾部3个片段更有辨识度
-            if tok and tok.lower() in s_low:
-                sc += 1.5
-        # 略惩罚过短/过长
-        if len(s) < 8:
-            sc -= 0.5
-        if len(s) > 120:
-            sc -= 0.2
-        return sc
-
-    ranked = sorted([s for s in sentences if s.strip()], key=score, reverse=True)
-    picked = ranked[:max_sentences]
-    return '。'.join(picked)
 
+def _parse_serp(html: str):
+    """解析搜狗结果页，返回 (结果容器数, [(标题, 链接, 简介), ...])。"""
+    soup = BeautifulSoup(html, 'html.parser')
 
-def search_sogou(query: str, max_results: int = 10) -> list[dict]:
-    """使用搜狗网页搜索抓取前若干条搜索结果，输出简要摘录。
+    # 兼容多种结果容器
+    containers = soup.find_all('div', class_='vrwrap')
+    if not containers:
+        containers = soup.select('div.results, div.rb, div.vrResult')
 
-    返回的每一项结构为：
-    { 'excerpt': '标题 - 简介', 'sources': ['https://xxx'] }
+    entries = []
+    for item in containers:
+        # 标题
+        a = item.select_one('h3 a') or item.find('a')
+        title = a.get_text(strip=True) if a else ''
+        href = a.get('href') if a and a.has_attr('href') else ''
+        # 简介
+        desc_elem = item.select_one('.text-layout') or item.find('p') or item.find('div')
+        desc = desc_elem.get_text(strip=True) if desc_elem else ''
+        # 清理文本
+        title = re.sub(r"\s+", " ", title)
+        desc = re.sub(r"\s+", " ", desc)
+        if title or desc or href:
+            entries.append((title, href, desc))
+    return len(containers), entries
+
+
+async def _fetch_entry(session: aiohttp.ClientSession, limiter: _HostLimiter, href: str):
+    """解析真实链接并抓取正文，返回 (真实链接, 正文)。"""
+    real_url = await _get_real_url(session, limiter, href) if href else ''
+    body_text = await _get_article_content(session, limiter, real_url) if real_url else ''
+    return real_url, body_text
+
+
+def _build_result(query: str, title: str, href: str, desc: str, real_url: str, body_text: str):
+    # 抽取与地址相关句子
+    picked = _extract_relevant_sentences(query, body_text, max_sentences=3)
+    excerpt_core = picked or desc or title
+    if not excerpt_core:
+        return None
+    # 将标题附在前面，正文摘录在后
+    if title and excerpt_core and not excerpt_core.startswith(title):
+        excerpt = f"{title}：{excerpt_core}"
+    else:
+        excerpt = excerpt_core
+    sources = [real_url or href] if (real_url or href) else []
+    return {
+        'title': title,
+        'url': (real_url or href or ''),
+        'excerpt': excerpt[:800],
+        'sources': sources,
+        'raw_content': body_text
+    }
+
+
+async def search_sogou_async(query: str, max_results: int = 10, deadline: float = None,
+                             per_host_limit: int = None) -> list[dict]:
+    """`search_sogou` 的异步实现，须在事件循环中调用（使用该循环的共享HTTP会话）。
+
+    各结果的真实链接解析与正文抓取并发进行，同一主机的并发数受 per_host_limit 限制。
+    到达整体截止时间 deadline（秒，含搜索页本身的请求）时，尚未完成的结果不再等待，
+    只用搜索页上的标题与简介生成摘录，raw_content 为空。
+    搜索页解析结果、真实链接与正文文本按 WEB_CACHE_TTL 缓存在磁盘上，命中时不再请求与解析。
     """
     if not query:
         return []
 
+    if deadline is None:
+        deadline = current_app.config.get('WEB_SEARCH_DEADLINE_SECONDS', DEFAULT_DEADLINE_SECONDS)
+    if per_host_limit is None:
+        per_host_limit = current_app.config.get('WEB_SEARCH_PER_HOST_LIMIT', DEFAULT_PER_HOST_LIMIT)
+
+    loop = asyncio.get_running_loop()
+    deadline_at = loop.time() + deadline
+    session = http_client.get_session()
+    limiter = _HostLimiter(per_host_limit)
+
     results: list[dict] = []
     try:
-        url = f"https://www.sogou.com/web?query={requests.utils.quote(query)}&page=1"
-        resp = requests.get(url, headers=HEADERS, timeout=10)
-        resp.raise_for_status()
-        resp.encoding = 'utf-8'
-        soup = BeautifulSoup(resp.text, 'html.parser')
-
-        # 兼容多种结果容器
-        containers = soup.find_all('div', class_='vrwrap')
-        if not containers:
-            containers = soup.select('div.results, div.rb, div.vrResult')
-
-        current_app.logger.info(f"搜狗搜索 '{query}' 找到 {len(containers)} 个结果容器。")
-
-        for item in containers:
-            # 标题
-            a = item.select_one('h3 a') or item.find('a')
-            title = a.get_text(strip=True) if a else ''
-            href = a.get('href') if a and a.has_attr('href') else ''
-            real_url = _get_real_url(href) if href else ''
-            # 简介
-            desc_elem = item.select_one('.text-layout') or item.find('p') or item.find('div')
-            desc = desc_elem.get_text(strip=True) if desc_elem else ''
-            # 清理文本
-            title = re.sub(r"\s+", " ", title)
-            desc = re.sub(r"\s+", " ", desc)
-
-            # 抓取正文并抽取与地址相关句子
-            body_text = _get_article_content(real_url) if real_url else ''
-            picked = _extract_relevant_sentences(query, body_text, max_sentences=3)
-            excerpt_core = picked or desc or title
-            if excerpt_core:
-                # 将标题附在前面，正文摘录在后
-                if title and excerpt_core and not excerpt_core.startswith(title):
-                    excerpt = f"{title}：{excerpt_core}"
-                else:
-                    excerpt = excerpt_core
-                sources = [real_url or href] if (real_url or href) else []
-                results.append({
-                    'title': title,
-                    'url': (real_url or href or ''),
-                    'excerpt': excerpt[:800],
-                    'sources': sources,
-                    'raw_content': body_text
-                })
-            if len(results) >= max_results:
-                break
+        url = f"https://www.sogou.com/web?query={urllib.parse.quote(query)}&page=1"
+
+        async def _fetch_serp():
+            async with session.get(url, headers=HEADERS, timeout=_SERP_TIMEOUT) as resp:
+                resp.raise_for_status()
+                return await resp.text(encoding='utf-8', errors='replace')
+
+        serp_key = normalize_detail_text(query)
+        hit, serp = _cache_get('serp', serp_key)
+        if hit:
+            container_count, entries = serp['container_count'], [tuple(e) for e in serp['entries']]
+        else:
+            html = await asyncio.wait_for(_fetch_serp(), timeout=max(0.0, deadline_at - loop.time()))
+            container_count, entries = await loop.run_in_executor(None, _parse_serp, html)
+            if entries:
+                _cache_set('serp', serp_key, {'container_count': container_count, 'entries': entries})
+        current_app.logger.info(f"搜狗搜索 '{query}' 找到 {container_count} 个结果容器。")
+
+        entries = entries[:max_results]
+        tasks = [asyncio.ensure_future(_fetch_entry(session, limiter, href)) for _, href, _ in entries]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=max(0.0, deadline_at - loop.time()))
+            if pending:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                current_app.logger.warning(
+                    f"搜狗搜索 '{query}' 超过截止时间 {deadline}s，{len(pending)}/{len(tasks)} 条结果未抓取到正文。"
+                )
+
+        for (title, href, desc), task in zip(entries, tasks):
+            real_url, body_text = '', ''
+            if task.done() and not task.cancelled() and task.exception() is None:
+                real_url, body_text = task.result()
+            result = _build_result(query, title, href, desc, real_url, body_text)
+            if result:
+                results.append(result)
     except Exception as e:
         # 静默失败，返回已收集的结果
-        current_app.logger.error(f"搜狗搜索失败，查询: '{query}'. 错误: {e}", exc_info=True)
-        pass
+        current_app.logger.error(f"搜狗搜索失败，查询: '{query}'. 错误: {e!r}", exc_info=True)
 
     return results
 
 
+def search_sogou(query: str, max_results: int = 10) -> list[dict]:
+    """使用搜狗网页搜索抓取前若干条搜索结果，输出简要摘录。
+
+    返回的每一项结构为：
+    { 'excerpt': '标题 - 简介', 'sources': ['https://xxx'] }
+
+    同步入口：通过 `http_client.run` 运行 `search_sogou_async`。
+    """
+    return http_client.run(search_sogou_async(query, max_results))
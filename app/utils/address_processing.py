@@ -1,7 +1,8 @@
-import re
 import Levenshtein
 import jionlp as jio
 from ..utils.location_loader import get_location_types_data
+from ..utils.admin_gazetteer import parse_admin_location
+from ..utils import confidence_core
 from flask import current_app
 
 def remove_suffixes(address_text: str, suffixes_to_remove: list[str] = None) -> str:
@@ -18,16 +19,7 @@ def remove_suffixes(address_text: str, suffixes_to_remove: list[str] = None) ->
     # 关键修复：必须按长度降序排序，以确保优先匹配并移除最长的后缀
     # 例如，对于"历史文化街区"，应先匹配"历史文化街区"而不是"街区"
     actual_suffixes.sort(key=len, reverse=True)
-
-    if not actual_suffixes: # 如果仍然为空（例如，LOCATION_TYPES_DATA 为空）
-        return address_text
-    
-    processed_text = address_text
-    for suffix in actual_suffixes:
-        if suffix and processed_text.endswith(suffix):
-            processed_text = processed_text[:-len(suffix)]
-            break 
-    return processed_text
+    return confidence_core.remove_suffixes(address_text, actual_suffixes)
 
 def extract_province_city(keyword):
     """
@@ -125,23 +117,7 @@ def calculate_confidence_B(provider: str, result_dict: dict) -> float:
     return 0.0
 
 def _normalize_detail_for_confidence(text_input) -> str:
-    if not text_input:
-        return ""
-    text = str(text_input) # 确保输入是字符串
-
-    # 全角转半角
-    normalized_chars = []
-    for char_text in text:
-        num = ord(char_text)
-        if num == 0x3000:  # 全角空格
-            num = 32
-        elif 0xFF01 <= num <= 0xFF5E:  # 全角字符 (不包括空格)
-            num -= 0xFEE0
-        normalized_chars.append(chr(num))
-    text = ''.join(normalized_chars)
-
-    # 转为小写并移除所有空白符
-    return re.sub(r'\s+', '', text.lower())
+    return confidence_core.normalize_detail_text(text_input)
 
 def generate_completed_address(parsed_address: dict) -> str:
     """
@@ -200,6 +176,8 @@ def complete_address_jionlp(address: str, return_dict=False):
     使用 jionlp 尝试补全单个地址的行政区划。
     如果补全成功，返回新地址；如果失败或输入不合法，返回原地址。
     可以根据 return_dict 参数决定返回字符串还是字典。
+
+    优先使用行政区划索引 (admin_gazetteer) 的快速路径，只有快速路径无法确定时才调用 jionlp。
     """
     if not address or not isinstance(address, str):
         if return_dict:
@@ -207,8 +185,8 @@ def complete_address_jionlp(address: str, return_dict=False):
         return address
         
     try:
-        # 使用 jionlp 解析地址
-        parsed = jio.parse_location(address)
+        # 快速路径：行政区划索引；无法确定时回退到 jionlp 解析地址
+        parsed = parse_admin_location(address) or jio.parse_location(address)
         
         # 检查是否包含最基本的省和市信息
         if parsed and parsed.get('province') and parsed.get('city'):
@@ -230,6 +208,13 @@ def complete_address_jionlp(address: str, return_dict=False):
             return {'completed_address': address, 'parsed_address': {}}
         return address
 
+def _location_suffixes():
+    """数据库中已批准的地名后缀，按长度降序排列。"""
+    suffixes = get_location_types_data()
+    suffixes.sort(key=len, reverse=True)
+    return suffixes
+
+
 def calculate_unified_confidence(
     original_address: str, 
     candidate_data: dict, 
@@ -238,149 +223,32 @@ def calculate_unified_confidence(
 ) -> float:
     """
     统一置信度计算函数，实现SOP中定义的融合匹配模型。
-    
-    Args:
-        original_address: 原始地址字符串 (对应 Source-Full)
-        candidate_data: 候选数据字典 (POI或Geocoding结果)
-        parsed_original: 预解析的原始地址结构 (对应 Source-Detail)
-        mode: 计算模式，'geocoding'或'poi'
-    
-    Returns:
-        float: 置信度分数 (0.0 - 1.0)
+    计算逻辑见 confidence_core.calculate_unified_confidence，这里自动传入数据库中的地名后缀。
     """
-    if not original_address or not candidate_data:
-        return 0.0
-    
-    # --- 步骤 0: 确保结构化查询存在 ---
-    if parsed_original is None:
-        # 降级方案：如果上游没有提供解析结果，则即时解析
-        parsed_original = jio.parse_location(original_address)
-    
-    # --- 步骤 1: 行政区划硬性过滤 ---
-    if not _check_administrative_match(parsed_original, candidate_data, mode):
-        return 0.0
-    
-    # --- 步骤 2: 准备 "比较源" (Query Sources) ---
-    # 源1: 查询详情 (Source-Detail)
-    source_detail_raw = (parsed_original.get('detail') or '').strip()
-    source_detail = _normalize_detail_for_confidence(remove_suffixes(source_detail_raw))
-    # 源2: 查询全文 (Source-Full)
-    source_full = _normalize_detail_for_confidence(remove_suffixes(original_address))
-
-    # --- 步骤 3: 准备 "候选维度" & 执行计算策略 ---
-    confidences = []
-
-    def _get_candidate_details(text: str) -> str:
-        """安全地解析候选文本并返回其标准化的detail部分"""
-        if not text:
-            return ""
-        try:
-            parsed = jio.parse_location(text)
-            detail = (parsed.get('detail') or '').strip()
-        except Exception:
-            # 解析失败时，使用原始文本作为降级
-            detail = text
-        return _normalize_detail_for_confidence(remove_suffixes(detail))
-
-    if mode == 'poi':
-        # --- POI模式：执行融合策略 ---
-        # 维度1: 候选名称
-        cand_name_full_raw = (candidate_data.get('name') or '').strip()
-        if cand_name_full_raw:
-            # 补充维度: 候选名称全文 (Dim-Name-Full)
-            cand_name_full = _normalize_detail_for_confidence(remove_suffixes(cand_name_full_raw))
-            confidences.append(_calculate_text_similarity_with_containment(
-                source_full, cand_name_full, "全文 vs POI名称全文"
-            ))
-            # 主要维度: 候选名称详情 (Dim-Name-Detail)
-            cand_name_detail = _get_candidate_details(cand_name_full_raw)
-            if cand_name_detail:
-                 confidences.append(_calculate_text_similarity_with_containment(
-                    source_detail, cand_name_detail, "详情 vs POI名称详情"
-                ))
-
-        # 维度2: 候选地址
-        cand_addr_full_raw = (candidate_data.get('address') or '').strip()
-        if cand_addr_full_raw:
-            # 补充维度: 候选地址全文 (Dim-Address-Full)
-            cand_addr_full = _normalize_detail_for_confidence(remove_suffixes(cand_addr_full_raw))
-            confidences.append(_calculate_text_similarity_with_containment(
-                source_full, cand_addr_full, "全文 vs POI地址全文"
-            ))
-            # 主要维度: 候选地址详情 (Dim-Address-Detail)
-            cand_addr_detail = _get_candidate_details(cand_addr_full_raw)
-            if cand_addr_detail:
-                confidences.append(_calculate_text_similarity_with_containment(
-                    source_detail, cand_addr_detail, "详情 vs POI地址详情"
-                ))
-
-    elif mode == 'geocoding':
-        # --- 地理编码模式：执行简化策略 ---
-        cand_addr_full_raw = (candidate_data.get('formatted_address') or '').strip()
-        if cand_addr_full_raw:
-            # 主要维度: 候选地址详情 (Dim-Address-Detail)
-            cand_addr_detail = _get_candidate_details(cand_addr_full_raw)
-            confidences.append(_calculate_text_similarity_with_containment(
-                source_detail, cand_addr_detail, "详情 vs Geocoding地址详情"
-            ))
+    return confidence_core.calculate_unified_confidence(
+        original_address, candidate_data, parsed_original, mode, _location_suffixes()
+    )
 
-    # --- 步骤 4: 选择最优结果 ---
-    if not confidences:
-        current_app.logger.warning(
-            f"置信度计算无法进行有效比较, 模式='{mode}', 原始地址='{original_address}', "
-            f"候选名称='{candidate_data.get('name', 'N/A')}', "
-            f"候选地址='{candidate_data.get('address') or candidate_data.get('formatted_address', 'N/A')}'"
-        )
-        return 0.5  # 如果没有任何有效维度可以比较，返回一个中立的分数
 
-    best_confidence = max(confidences)
-    
-    current_app.logger.debug(
-        f"统一置信度计算: 模式='{mode}', 原始='{original_address}', "
-        f"候选='{candidate_data.get('name', '')}', "
-        f"比较分数列表={confidences}, 最终置信度={best_confidence:.3f}"
+def rank_candidates_by_confidence(
+    original_address: str,
+    candidates: list,
+    parsed_original: dict = None,
+    mode: str = 'poi',
+    top_k: int = None,
+    floor: float = 0.0
+) -> list:
+    """
+    批量计算候选列表的置信度，并对不可能进入前 top_k 的候选进行剪枝。
+    计算逻辑见 confidence_core.rank_candidates_by_confidence，这里自动传入数据库中的地名后缀。
+    """
+    return confidence_core.rank_candidates_by_confidence(
+        original_address, candidates, parsed_original, mode, top_k, floor, _location_suffixes()
     )
-    
-    return best_confidence
 
 
 def _check_administrative_match(parsed_original: dict, candidate_data: dict, mode: str) -> bool:
-    """检查行政区划匹配，统一处理两种模式的字段差异"""
-    
-    # 省级匹配
-    original_province = (parsed_original.get('province') or '').strip()
-    if mode == 'geocoding':
-        candidate_province = (candidate_data.get('province') or '').strip()
-    else:  # poi
-        candidate_province = (candidate_data.get('pname') or '').strip()
-    
-    if original_province and candidate_province and original_province != candidate_province:
-        current_app.logger.debug(f"置信度过滤：省份不匹配 '{original_province}' vs '{candidate_province}'")
-        return False
-    
-    # 市级匹配
-    original_city = (parsed_original.get('city') or '').strip()
-    if mode == 'geocoding':
-        candidate_city = (candidate_data.get('city') or '').strip()
-    else:  # poi
-        candidate_city = (candidate_data.get('cityname') or '').strip()
-    
-    if original_city and candidate_city and original_city != candidate_city:
-        current_app.logger.debug(f"置信度过滤：城市不匹配 '{original_city}' vs '{candidate_city}'")
-        return False
-    
-    # 区县级条件匹配
-    original_county = (parsed_original.get('county') or '').strip()
-    if mode == 'geocoding':
-        candidate_district = (candidate_data.get('district') or '').strip()
-    else:  # poi
-        candidate_district = (candidate_data.get('adname') or '').strip()
-    
-    if original_county and candidate_district and original_county != candidate_district:
-        current_app.logger.debug(f"置信度过滤：区县不匹配 '{original_county}' vs '{candidate_district}'")
-        return False
-    
-    return True
+    return confidence_core.check_administrative_match(parsed_original, candidate_data, mode)
 
 
 def _calculate_geocoding_confidence(parsed_original: dict, candidate_data: dict) -> float:
@@ -500,73 +368,5 @@ def _calculate_poi_confidence(parsed_original: dict, poi_data: dict, original_ad
 
 
 def _calculate_text_similarity_with_containment(text1: str, text2: str, dimension_name: str) -> float:
-    """
-    计算两个文本的相似度，考虑包含关系的增强算法。
-    
-    Args:
-        text1: 第一个文本（通常是原始地址）
-        text2: 第二个文本（通常是POI名称或地址）
-        dimension_name: 维度名称，用于日志
-    
-    Returns:
-        相似度分数 (0.0 - 1.0)
-    """
-    current_app.logger.debug(f"[CONFIDENCE_DEBUG] Similarity Check ('{dimension_name}'): '{text1}' vs '{text2}'")
-    if not text1 and not text2:
-        return 1.0
-    
-    if not text1 or not text2:
-        return 0.5
-    
-    # 基础编辑距离相似度
-    base_similarity = Levenshtein.ratio(text1, text2)
-    current_app.logger.debug(f"[CONFIDENCE_DEBUG]   -> Base Levenshtein Ratio: {base_similarity:.3f}")
-    
-    # 包含关系增强
-    enhanced_similarity = base_similarity
-    
-    if text1 in text2:
-        # text1包含在text2中，如"迁江老街"在"迁江老街米粉"中
-        # 这种情况通常表示用户搜索地名，POI是该地名的具体商户，匹配度应该很高
-        contain_ratio = len(text1) / len(text2)
-        
-        # 改进算法：基线更高，但增长更平缓
-        if contain_ratio >= 0.8:
-            # 几乎完全匹配，如"迁江老街" vs "迁江老街店"
-            enhanced_similarity = max(base_similarity, 0.95 + contain_ratio * 0.05)  # 95%-100%
-        elif contain_ratio >= 0.5:
-            # 高度匹配，如"迁江老街" vs "迁江老街米粉"
-            enhanced_similarity = max(base_similarity, 0.90 + contain_ratio * 0.10)  # 90%-95%
-        else:
-            # 中等匹配，如"迁江老街" vs "迁江老街米粉餐厅连锁店"
-            enhanced_similarity = max(base_similarity, 0.80 + contain_ratio * 0.20)  # 80%-90%
-            
-        current_app.logger.debug(
-            f"{dimension_name}包含关系A: '{text1}' in '{text2}', 长度比例={contain_ratio:.3f}, 基础相似度={base_similarity:.3f}, 增强置信度={enhanced_similarity:.3f}"
-        )
-    elif text2 in text1:
-        # text2包含在text1中，如"米粉店" in "广西来宾市迁江老街米粉店"
-        # 这种情况表示POI名称是用户搜索的一部分，需要谨慎评分
-        contain_ratio = len(text2) / len(text1)
-        
-        # 更加保守的评分策略，因为POI名称可能过于泛化
-        if len(text2) >= 4 and contain_ratio >= 0.3:
-            # POI名称足够具体且占比合理，如"迁江老街米粉" in "迁江老街米粉店"
-            enhanced_similarity = max(base_similarity, 0.75 + contain_ratio * 0.20)  # 75%-95%
-        elif len(text2) >= 3 and contain_ratio >= 0.2:
-            # POI名称中等具体，如"米粉店" in "迁江老街米粉店"
-            enhanced_similarity = max(base_similarity, 0.65 + contain_ratio * 0.20)  # 65%-85%
-        else:
-            # POI名称太短或占比太小，如"店" in "迁江老街米粉店"，可能是泛化词汇
-            enhanced_similarity = max(base_similarity, 0.50 + contain_ratio * 0.25)  # 50%-75%
-            
-        current_app.logger.debug(
-            f"{dimension_name}包含关系B: '{text2}' in '{text1}', 长度比例={contain_ratio:.3f}, POI长度={len(text2)}, 基础相似度={base_similarity:.3f}, 增强置信度={enhanced_similarity:.3f}"
-        )
-    else:
-        current_app.logger.debug(
-            f"{dimension_name}基础相似度: '{text1}' vs '{text2}' = {base_similarity:.3f}"
-        )
-    
-    current_app.logger.debug(f"[CONFIDENCE_DEBUG]   -> Final Enhanced Similarity for '{dimension_name}': {enhanced_similarity:.3f}")
-    return enhanced_similarity
\ No newline at end of file
+    """计算两个文本的相似度，考虑包含关系的增强算法（见 confidence_core.text_similarity_with_containment）。"""
+    return confidence_core.text_similarity_with_containment(text1, text2, dimension_name)
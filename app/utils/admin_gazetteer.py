@@ -0,0 +1,384 @@
+"""
+行政区划词典（Gazetteer）快速解析。
+
+针对只需要省/市/县三级补全的地址，基于预先构建的二进制索引文件
+(`app/data/admin_gazetteer.bin`，由 `scripts/build_admin_gazetteer.py` 从 jionlp
+内置行政区划数据生成) 进行前缀匹配，直接得到行政区划与 adcode，避免每次都调用
+`jio.parse_location`。
+
+索引文件通过 mmap 只读映射，多进程 (gunicorn worker) 之间共享同一份页缓存。
+文件内部包含两张按字节序排序的定长记录表：
+- 名称表：名称(全称或别名) -> (adcode, 层级, 是否别名)，按名称排序，
+  在有序数组上逐字收窄区间，等价于一次 trie 遍历；
+- 编码表：(adcode, 层级) -> (上级 adcode, 全称)，用于向上补全省、市。
+
+快速路径只在结果无歧义时返回，否则返回 None，由调用方回退到 jionlp。
+"""
+import bisect
+import functools
+import logging
+import mmap
+import os
+import struct
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 层级定义
+LEVEL_PROVINCE = 1
+LEVEL_CITY = 2
+LEVEL_COUNTY = 3
+
+# 无法在索引中确定的名称（港澳台区县、已撤并更名的旧行政区划等）使用该编码占位，
+# 命中时快速路径放弃解析，交由 jionlp 处理（jionlp 会做新旧名称转换）
+UNRESOLVABLE_CODE = 0
+
+GAZETTEER_MAGIC = b'GZT1'
+GAZETTEER_VERSION = 1
+NAME_WIDTH = 48  # 名称字段字节宽度 (UTF-8, 以 \0 填充)
+
+# 文件头: magic, version, name_width, 名称表记录数, 编码表记录数
+HEADER_STRUCT = struct.Struct('<4sHHII')
+# 名称表记录: 名称, adcode, 层级, 是否别名
+NAME_RECORD_STRUCT = struct.Struct(f'<{NAME_WIDTH}sIBB2x')
+# 编码表记录: adcode, 层级, 上级adcode, 全称
+CODE_RECORD_STRUCT = struct.Struct(f'<IB3xI{NAME_WIDTH}s')
+
+DEFAULT_GAZETTEER_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'admin_gazetteer.bin'
+)
+
+
+def pack_gazetteer(name_entries, code_entries) -> bytes:
+    """
+    将行政区划条目序列化为索引文件内容。
+
+    Args:
+        name_entries: [(name, adcode, level, is_alias), ...]
+        code_entries: [(adcode, level, parent_adcode, full_name), ...]
+    """
+    def _encode_name(name: str) -> bytes:
+        raw = name.encode('utf-8')
+        if len(raw) > NAME_WIDTH:
+            raise ValueError(f"行政区划名称过长，无法写入索引: {name}")
+        return raw
+
+    names = sorted(
+        {(_encode_name(n), int(code), int(level), int(bool(alias))) for n, code, level, alias in name_entries}
+    )
+    codes = sorted(
+        {(int(code), int(level), int(parent), _encode_name(full)) for code, level, parent, full in code_entries}
+    )
+
+    parts = [HEADER_STRUCT.pack(GAZETTEER_MAGIC, GAZETTEER_VERSION, NAME_WIDTH, len(names), len(codes))]
+    parts.extend(NAME_RECORD_STRUCT.pack(*rec) for rec in names)
+    parts.extend(CODE_RECORD_STRUCT.pack(*rec) for rec in codes)
+    return b''.join(parts)
+
+
+class AdminGazetteer:
+    """基于 mmap 的行政区划索引，只读、线程安全。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, name_width, self._name_count, self._code_count = HEADER_STRUCT.unpack_from(self._mm, 0)
+        if magic != GAZETTEER_MAGIC or version != GAZETTEER_VERSION or name_width != NAME_WIDTH:
+            raise ValueError(f"行政区划索引文件格式不兼容: {path}")
+
+        self._name_offset = HEADER_STRUCT.size
+        self._code_offset = self._name_offset + self._name_count * NAME_RECORD_STRUCT.size
+        self._names = self._NameColumn(self)
+
+    # --- 名称表 ---
+
+    def _name_at(self, idx: int) -> bytes:
+        start = self._name_offset + idx * NAME_RECORD_STRUCT.size
+        return self._mm[start:start + NAME_WIDTH]
+
+    class _NameColumn:
+        """把名称表的名称字段暴露为只读序列，供 bisect 使用。"""
+
+        def __init__(self, gazetteer):
+            self._gazetteer = gazetteer
+
+        def __len__(self):
+            return self._gazetteer._name_count
+
+        def __getitem__(self, idx):
+            return self._gazetteer._name_at(idx)
+
+    def _name_record(self, idx: int):
+        name, code, level, alias = NAME_RECORD_STRUCT.unpack_from(
+            self._mm, self._name_offset + idx * NAME_RECORD_STRUCT.size
+        )
+        return code, level, bool(alias)
+
+    def match_prefix(self, text: str, pos: int = 0):
+        """
+        返回 text[pos:] 上最长的行政区划名称匹配。
+
+        名称表按字节序排序，每读入一个字符就用二分把候选区间收窄到以当前前缀开头的记录，
+        区间为空即停止，效果等同于沿 trie 向下走一层。
+
+        Returns:
+            (匹配字符数, [(adcode, level, is_alias), ...])；无匹配时返回 (0, [])
+        """
+        names = self._names
+        lo, hi = 0, self._name_count
+        prefix = b''
+        best_len, best_range = 0, None
+        for char_idx in range(pos, len(text)):
+            prefix += text[char_idx].encode('utf-8')
+            depth = len(prefix)
+            if depth > NAME_WIDTH:
+                break
+            lo = bisect.bisect_left(names, prefix, lo, hi, key=lambda name: name[:depth])
+            hi = bisect.bisect_right(names, prefix, lo, hi, key=lambda name: name[:depth])
+            if lo >= hi:
+                break
+            # 以 \0 填充的完整名称排在区间最前面
+            exact_hi = bisect.bisect_right(names, prefix + b'\0', lo, hi, key=lambda name: name[:depth + 1])
+            if exact_hi > lo:
+                best_len, best_range = char_idx - pos + 1, (lo, exact_hi)
+
+        if not best_range:
+            return 0, []
+        return best_len, [self._name_record(i) for i in range(*best_range)]
+
+    # --- 编码表 ---
+
+    def get_unit(self, adcode: int, level: int):
+        """按 (adcode, level) 查找行政单元，返回 (上级adcode, 全称) 或 None。"""
+        lo, hi = 0, self._code_count
+        target = (adcode, level)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            code, lvl, parent, name = CODE_RECORD_STRUCT.unpack_from(
+                self._mm, self._code_offset + mid * CODE_RECORD_STRUCT.size
+            )
+            if (code, lvl) < target:
+                lo = mid + 1
+            elif (code, lvl) > target:
+                hi = mid
+            else:
+                return parent, name.rstrip(b'\0').decode('utf-8')
+        return None
+
+    def ancestors(self, adcode: int, level: int) -> dict:
+        """返回 {level: (adcode, 全称)}，包含自身及全部上级。"""
+        chain = {}
+        while level >= LEVEL_PROVINCE:
+            unit = self.get_unit(adcode, level)
+            if unit is None:
+                break
+            parent, name = unit
+            chain[level] = (adcode, name)
+            adcode, level = parent, level - 1
+        return chain
+
+    def lookup_adcode(self, province: str = None, city: str = None, county: str = None):
+        """
+        根据已拆分好的省/市/县名称（全称或简称均可）查找最深一级的 adcode。
+        名称无法识别或存在歧义时返回 None。
+        """
+        current = None
+        for name in (province, city, county):
+            name = (name or '').strip()
+            if not name:
+                continue
+            length, records = self.match_prefix(name)
+            if length != len(name) or any(code == UNRESOLVABLE_CODE for code, _, _ in records):
+                return None
+            nodes = {(code, level) for code, level, _ in records}
+            if current is not None:
+                nodes = {node for node in nodes if node == current or self._is_descendant(node, current)}
+            if not nodes:
+                return None
+            deepest = max(level for _, level in nodes)
+            nodes = {node for node in nodes if node[1] == deepest}
+            if len(nodes) != 1:
+                return None
+            current = nodes.pop()
+        return current[0] if current else None
+
+    def _is_descendant(self, node, ancestor) -> bool:
+        code, level = node
+        anc_code, anc_level = ancestor
+        if level <= anc_level:
+            return False
+        chain = self.ancestors(code, level)
+        return chain.get(anc_level, (None,))[0] == anc_code
+
+    # --- 解析 ---
+
+    def parse(self, address: str):
+        """
+        快速解析地址的行政区划部分，输出与 `jio.parse_location` 相同结构的字典。
+
+        仅在以下条件全部满足时返回结果，否则返回 None 交由 jionlp 处理：
+        - 地址以行政区划名称开头，且各级名称之间层级一致、无歧义；
+        - 最后一个被识别的行政区划使用的是全称（避免把"南京路"中的"南京"当作城市）；
+        - 最终可以确定省与市。
+        """
+        if not address or not isinstance(address, str) or any(ch.isspace() for ch in address):
+            return None
+
+        pos = 0
+        current = None       # 已确定的最深层行政单元 (adcode, level)
+        last_is_alias = False
+        while pos < len(address):
+            length, records = self.match_prefix(address, pos)
+            if not length:
+                break
+            if any(code == UNRESOLVABLE_CODE for code, _, _ in records):
+                return None
+
+            candidates = {
+                (code, level): alias for code, level, alias in records
+                # 区县只接受全称匹配，避免"朝阳公园"之类的误判
+                if not (alias and level == LEVEL_COUNTY)
+            }
+            if current is not None:
+                candidates = {
+                    node: alias for node, alias in candidates.items() if self._is_descendant(node, current)
+                }
+
+            if not candidates:
+                if current is not None and any(
+                    not alias or self._is_descendant((code, level), current) for code, level, alias in records
+                ):
+                    # 紧随其后的是另一个不相容的行政区划全称（如"杭州市鼓楼区"），
+                    # 或是下级区县的简称（如"昆明市西山"），交给 jionlp 判断
+                    return None
+                break
+            if len(candidates) > 1:
+                # 同名行政区（如多个"鼓楼区"）或省市同名别名，无法确定
+                deepest = max(level for _, level in candidates)
+                same_unit = {node for node in candidates if node[1] == deepest}
+                # 直辖市的省级与市级共用同一名称，取更深一级即可
+                if len(same_unit) != 1 or len({code for code, _ in candidates}) != 1:
+                    return None
+                node = same_unit.pop()
+                alias = candidates[node]
+            else:
+                node, alias = next(iter(candidates.items()))
+
+            current = node
+            last_is_alias = alias
+            pos += length
+
+        if current is None or last_is_alias:
+            return None
+        if current[1] < LEVEL_COUNTY and pos > 0:
+            # 名称首尾重叠的情况（如"乐山市中区"中的"市中区"）无法用最长匹配区分，交给 jionlp 判断
+            length, records = self.match_prefix(address, pos - 1)
+            if any(not alias and self._is_descendant((code, level), current) for code, level, alias in records):
+                return None
+
+        chain = self.ancestors(*current)
+        province = chain.get(LEVEL_PROVINCE, (None, None))[1]
+        city = chain.get(LEVEL_CITY, (None, None))[1]
+        county = chain.get(LEVEL_COUNTY, (None, None))[1]
+        if not province or not city:
+            return None
+
+        detail = address[pos:]
+        full_location = province + (city if city != province else '') + (county or '') + detail
+        return {
+            'province': province,
+            'city': city,
+            'county': county,
+            'detail': detail,
+            'full_location': full_location,
+            'orig_location': address,
+            'adcode': chain[max(chain)][0],
+        }
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+_gazetteer_unavailable = False
+
+
+def get_gazetteer(path: str = None):
+    """
+    懒加载并缓存行政区划索引。索引文件缺失或损坏时返回 None（调用方应回退到 jionlp）。
+    """
+    global _gazetteer, _gazetteer_unavailable
+    if _gazetteer is not None or _gazetteer_unavailable:
+        return _gazetteer
+
+    with _gazetteer_lock:
+        if _gazetteer is None and not _gazetteer_unavailable:
+            try:
+                _gazetteer = AdminGazetteer(path or DEFAULT_GAZETTEER_FILE)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning("加载行政区划索引失败，将仅使用 jionlp 解析: %s", e, exc_info=True)
+                _gazetteer_unavailable = True
+    return _gazetteer
+
+
+def normalize_adcode(value):
+    """把服务商返回的 adcode（字符串/整数/空列表等）规范为 6 位整数，无效时返回 None。"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        code = value
+    elif isinstance(value, str) and value.strip().isdigit():
+        code = int(value.strip())
+    else:
+        return None
+    return code if 100000 <= code <= 999999 else None
+
+
+def adcode_depth(adcode: int) -> int:
+    """adcode 的有效位数：省级 2 位，地市级 4 位，区县级 6 位。"""
+    if adcode % 100:
+        return 6
+    if adcode % 10000:
+        return 4
+    return 2
+
+
+def adcode_prefix_equal(code_a: int, code_b: int, depth: int) -> bool:
+    """比较两个 adcode 的前 depth 位。"""
+    divisor = 10 ** (6 - depth)
+    return code_a // divisor == code_b // divisor
+
+
+@functools.lru_cache(maxsize=4096)
+def _lookup_adcode_cached(province: str, city: str, county: str):
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        return None
+    return gazetteer.lookup_adcode(province, city, county)
+
+
+def resolve_adcode(admin: dict, province_key='province', city_key='city', county_key='county'):
+    """
+    返回行政区划字典对应的 adcode：优先使用字典中已有的 'adcode' 字段，
+    否则通过行政区划索引按名称查找。
+    """
+    if not admin:
+        return None
+    code = normalize_adcode(admin.get('adcode'))
+    if code:
+        return code
+
+    def _name(key):
+        value = admin.get(key)
+        return value.strip() if isinstance(value, str) else ''
+
+    province, city, county = _name(province_key), _name(city_key), _name(county_key)
+    if not (province or city or county):
+        return None
+    return _lookup_adcode_cached(province, city, county)
+
+
+def parse_admin_location(address: str):
+    """快速路径入口：能够确定解析结果时返回 jionlp 结构的字典，否则返回 None。"""
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        return None
+    return gazetteer.parse(address)
@@ -0,0 +1,544 @@
+"""
+置信度计算核心：不依赖 Flask 与数据库的打分与文本标准化逻辑。
+
+地名后缀列表等配置均通过参数显式传入，因此既可在请求上下文中使用，也可用于离线脚本和
+ProcessPoolExecutor 工作进程。日志通过标准 logging 按需输出：在 Flask 应用中会随 'app'
+日志器输出，在未配置日志的工作进程中则静默；未开启 DEBUG 时不会构造调试日志字符串。
+
+Flask 侧的封装（自动从数据库加载地名后缀）见 address_processing。
+"""
+import logging
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import Levenshtein
+import jionlp as jio
+
+from .admin_gazetteer import resolve_adcode, adcode_depth, adcode_prefix_equal
+
+_logger = logging.getLogger(__name__)
+
+
+def _debug(message_factory):
+    """调试日志按需格式化：只有 DEBUG 级别开启时才调用 message_factory 构造日志内容。"""
+    if _logger.isEnabledFor(logging.DEBUG):
+        _logger.debug(message_factory())
+
+
+def prepare_suffixes(suffixes) -> tuple:
+    """把地名后缀列表整理为按长度降序排列的元组，保证优先匹配最长的后缀。"""
+    return tuple(sorted((s for s in (suffixes or ()) if s), key=len, reverse=True))
+
+
+def remove_suffixes(address_text: str, suffixes) -> str:
+    """
+    从地址文本的末尾移除一个地名后缀。
+    suffixes 需按长度降序排列（见 prepare_suffixes），例如"历史文化街区"应先于"街区"匹配。
+    """
+    if not address_text:
+        return address_text
+    for suffix in suffixes:
+        if suffix and address_text.endswith(suffix):
+            return address_text[:-len(suffix)]
+    return address_text
+
+
+def normalize_detail_text(text_input) -> str:
+    """全角转半角、转小写并移除所有空白符。"""
+    if not text_input:
+        return ""
+    text = str(text_input) # 确保输入是字符串
+
+    # 全角转半角
+    normalized_chars = []
+    for char_text in text:
+        num = ord(char_text)
+        if num == 0x3000:  # 全角空格
+            num = 32
+        elif 0xFF01 <= num <= 0xFF5E:  # 全角字符 (不包括空格)
+            num -= 0xFEE0
+        normalized_chars.append(chr(num))
+    text = ''.join(normalized_chars)
+
+    # 转为小写并移除所有空白符
+    return re.sub(r'\s+', '', text.lower())
+
+
+def calculate_unified_confidence(
+    original_address: str, 
+    candidate_data: dict, 
+    parsed_original: dict = None,
+    mode: str = 'geocoding',
+    suffixes=()
+) -> float:
+    """
+    统一置信度计算函数，实现SOP中定义的融合匹配模型。
+    
+    Args:
+        original_address: 原始地址字符串 (对应 Source-Full)
+        candidate_data: 候选数据字典 (POI或Geocoding结果)
+        parsed_original: 预解析的原始地址结构 (对应 Source-Detail)
+        mode: 计算模式，'geocoding'或'poi'
+        suffixes: 按长度降序排列的地名后缀（见 prepare_suffixes）
+    
+    Returns:
+        float: 置信度分数 (0.0 - 1.0)
+    """
+    if not original_address or not candidate_data:
+        return 0.0
+    
+    # --- 步骤 0: 确保结构化查询存在 ---
+    if parsed_original is None:
+        # 降级方案：如果上游没有提供解析结果，则即时解析
+        parsed_original = jio.parse_location(original_address)
+    
+    # --- 步骤 1: 行政区划硬性过滤 ---
+    if not check_administrative_match(parsed_original, candidate_data, mode):
+        return 0.0
+    
+    # --- 步骤 2: 准备 "比较源" (Query Sources) ---
+    # 源1: 查询详情 (Source-Detail)
+    source_detail_raw = (parsed_original.get('detail') or '').strip()
+    source_detail = normalize_detail_text(remove_suffixes(source_detail_raw, suffixes))
+    # 源2: 查询全文 (Source-Full)
+    source_full = normalize_detail_text(remove_suffixes(original_address, suffixes))
+
+    # --- 步骤 3: 准备 "候选维度" & 执行计算策略 ---
+    confidences = []
+
+    def _get_candidate_details(text: str) -> str:
+        """安全地解析候选文本并返回其标准化的detail部分"""
+        if not text:
+            return ""
+        try:
+            parsed = jio.parse_location(text)
+            detail = (parsed.get('detail') or '').strip()
+        except Exception:
+            # 解析失败时，使用原始文本作为降级
+            detail = text
+        return normalize_detail_text(remove_suffixes(detail, suffixes))
+
+    if mode == 'poi':
+        # --- POI模式：执行融合策略 ---
+        # 维度1: 候选名称
+        cand_name_full_raw = (candidate_data.get('name') or '').strip()
+        if cand_name_full_raw:
+            # 补充维度: 候选名称全文 (Dim-Name-Full)
+            cand_name_full = normalize_detail_text(remove_suffixes(cand_name_full_raw, suffixes))
+            confidences.append(text_similarity_with_containment(
+                source_full, cand_name_full, "全文 vs POI名称全文"
+            ))
+            # 主要维度: 候选名称详情 (Dim-Name-Detail)
+            cand_name_detail = _get_candidate_details(cand_name_full_raw)
+            if cand_name_detail:
+                 confidences.append(text_similarity_with_containment(
+                    source_detail, cand_name_detail, "详情 vs POI名称详情"
+                ))
+
+        # 维度2: 候选地址
+        cand_addr_full_raw = (candidate_data.get('address') or '').strip()
+        if cand_addr_full_raw:
+            # 补充维度: 候选地址全文 (Dim-Address-Full)
+            cand_addr_full = normalize_detail_text(remove_suffixes(cand_addr_full_raw, suffixes))
+            confidences.append(text_similarity_with_containment(
+                source_full, cand_addr_full, "全文 vs POI地址全文"
+            ))
+            # 主要维度: 候选地址详情 (Dim-Address-Detail)
+            cand_addr_detail = _get_candidate_details(cand_addr_full_raw)
+            if cand_addr_detail:
+                confidences.append(text_similarity_with_containment(
+                    source_detail, cand_addr_detail, "详情 vs POI地址详情"
+                ))
+
+    elif mode == 'geocoding':
+        # --- 地理编码模式：执行简化策略 ---
+        cand_addr_full_raw = (candidate_data.get('formatted_address') or '').strip()
+        if cand_addr_full_raw:
+            # 主要维度: 候选地址详情 (Dim-Address-Detail)
+            cand_addr_detail = _get_candidate_details(cand_addr_full_raw)
+            confidences.append(text_similarity_with_containment(
+                source_detail, cand_addr_detail, "详情 vs Geocoding地址详情"
+            ))
+
+    # --- 步骤 4: 选择最优结果 ---
+    if not confidences:
+        _logger.warning(
+            f"置信度计算无法进行有效比较, 模式='{mode}', 原始地址='{original_address}', "
+            f"候选名称='{candidate_data.get('name', 'N/A')}', "
+            f"候选地址='{candidate_data.get('address') or candidate_data.get('formatted_address', 'N/A')}'"
+        )
+        return 0.5  # 如果没有任何有效维度可以比较，返回一个中立的分数
+
+    best_confidence = max(confidences)
+    
+    _debug(lambda: (
+        f"统一置信度计算: 模式='{mode}', 原始='{original_address}', "
+        f"候选='{candidate_data.get('name', '')}', "
+        f"比较分数列表={confidences}, 最终置信度={best_confidence:.3f}"
+    ))
+    
+    return best_confidence
+
+
+def rank_candidates_by_confidence(
+    original_address: str,
+    candidates: list,
+    parsed_original: dict = None,
+    mode: str = 'poi',
+    top_k: int = None,
+    floor: float = 0.0,
+    suffixes=()
+) -> list:
+    """
+    批量计算候选列表的置信度，并对不可能进入前 top_k 的候选进行剪枝。
+
+    精确计算的主要开销在于对候选名称/地址逐个调用 jionlp 解析 detail。这里先用廉价的
+    上界（字符重叠数、最长公共子串长度）估计每个候选 detail 维度可能达到的最高分，
+    按上界从高到低依次精确计算；当上界已低于当前第 top_k 名的精确分数或低于 floor 时，
+    跳过该候选的精确计算。前 top_k 名的结果与逐个调用 calculate_unified_confidence 完全一致。
+
+    Args:
+        original_address: 原始地址字符串
+        candidates: 候选数据字典列表，字段要求同 calculate_unified_confidence
+        parsed_original: 预解析的原始地址结构，缺省时只解析一次
+        mode: 计算模式，'geocoding'或'poi'
+        top_k: 需要保证精确的名次数，None 表示不剪枝
+        floor: 上界低于该值的候选不做精确计算
+        suffixes: 按长度降序排列的地名后缀（见 prepare_suffixes）
+
+    Returns:
+        list: 与 candidates 等长的 (置信度, 是否精确) 列表。被剪枝的候选返回其廉价维度
+              （全文维度）的分数，它是精确置信度的下界。
+    """
+    if not candidates:
+        return []
+    if not original_address:
+        return [(0.0, True) for _ in candidates]
+
+    if parsed_original is None:
+        parsed_original = jio.parse_location(original_address)
+
+    if top_k is None and floor <= 0:
+        return [
+            (calculate_unified_confidence(original_address, cand, parsed_original, mode, suffixes) if cand else 0.0, True)
+            for cand in candidates
+        ]
+
+    source_detail = normalize_detail_text(remove_suffixes((parsed_original.get('detail') or '').strip(), suffixes))
+    source_full = normalize_detail_text(remove_suffixes(original_address, suffixes))
+
+    results = [None] * len(candidates)
+    bounds = []
+    for idx, cand in enumerate(candidates):
+        if not cand or not check_administrative_match(parsed_original, cand, mode):
+            results[idx] = (0.0, True)
+            continue
+        lower, upper = _confidence_bounds(source_full, source_detail, cand, mode, suffixes)
+        bounds.append((upper, lower, idx))
+
+    # 按上界从高到低精确计算，维护前 top_k 名的最小精确分数
+    bounds.sort(key=lambda item: item[0], reverse=True)
+    top_scores = []
+    pruned = 0
+    for upper, lower, idx in bounds:
+        kth_best = min(top_scores) if top_k and len(top_scores) >= top_k else None
+        if upper < floor or (kth_best is not None and upper < kth_best):
+            results[idx] = (lower, False)
+            pruned += 1
+            continue
+        score = calculate_unified_confidence(original_address, candidates[idx], parsed_original, mode, suffixes)
+        results[idx] = (score, True)
+        if top_k:
+            top_scores.append(score)
+            if len(top_scores) > top_k:
+                top_scores.remove(min(top_scores))
+
+    if pruned:
+        _debug(lambda: f"候选剪枝: 共 {len(candidates)} 个候选，跳过 {pruned} 个的精确置信度计算")
+    return results
+
+
+def _confidence_bounds(source_full: str, source_detail: str, candidate_data: dict, mode: str, suffixes) -> tuple:
+    """
+    返回 (下界, 上界)：下界为无需 jionlp 解析的全文维度精确分数，
+    上界在此基础上加入 detail 维度可能达到的最高分。
+    """
+    lower = None
+    upper = 0.0
+    if mode == 'poi':
+        for field, dimension_name in (('name', "全文 vs POI名称全文"), ('address', "全文 vs POI地址全文")):
+            raw = (candidate_data.get(field) or '').strip()
+            if not raw:
+                continue
+            score = text_similarity_with_containment(
+                source_full, normalize_detail_text(remove_suffixes(raw, suffixes)), dimension_name
+            )
+            lower = score if lower is None else max(lower, score)
+            upper = max(upper, score, _detail_similarity_upper_bound(
+                source_detail, normalize_detail_text(raw), allow_empty=False
+            ))
+    elif mode == 'geocoding':
+        raw = (candidate_data.get('formatted_address') or '').strip()
+        if raw:
+            upper = _detail_similarity_upper_bound(
+                source_detail, normalize_detail_text(raw), allow_empty=True
+            )
+
+    if lower is None:
+        # 没有可比较的廉价维度；精确计算在没有任何维度时返回中立分数 0.5
+        lower = 0.0
+        upper = max(upper, 0.5)
+    return lower, upper
+
+
+def _detail_similarity_upper_bound(source: str, text: str, allow_empty: bool) -> float:
+    """
+    source 与 text 的任意子串之间相似度的上界（候选 detail 是候选文本的子串）。
+
+    - 编辑距离部分：Levenshtein.ratio = 2*LCS/(len1+len2)，而 LCS 不超过两串的字符重叠数 ov，
+      对任意子串取最大值得到 2*ov/(len(source)+ov)。
+    - 包含关系部分：source 是 text 的子串时上界为 1.0；子串包含于 source 时，
+      子串长度不超过两者的最长公共子串长度。
+    """
+    if not source:
+        return 1.0
+    if not text:
+        return 0.5 if allow_empty else 0.0
+    if source in text:
+        return 1.0
+
+    bound = 0.5 if allow_empty else 0.0
+    text_counts = {}
+    for ch in text:
+        text_counts[ch] = text_counts.get(ch, 0) + 1
+    overlap = 0
+    for ch in source:
+        if text_counts.get(ch, 0) > 0:
+            text_counts[ch] -= 1
+            overlap += 1
+    if not overlap:
+        return bound
+    bound = max(bound, 2 * overlap / (len(source) + overlap))
+
+    common_len = _longest_common_substring_length(source, text)
+    contain_ratio = common_len / len(source)
+    if common_len >= 4:
+        bound = max(bound, 0.75 + contain_ratio * 0.20)
+    elif common_len >= 3:
+        bound = max(bound, 0.65 + contain_ratio * 0.20)
+    else:
+        bound = max(bound, 0.50 + contain_ratio * 0.25)
+    return min(bound, 1.0)
+
+
+def _longest_common_substring_length(short_text: str, long_text: str) -> int:
+    best = 0
+    for start in range(len(short_text)):
+        end = start + best + 1
+        while end <= len(short_text) and short_text[start:end] in long_text:
+            best = end - start
+            end += 1
+    return best
+
+
+# 各模式下候选数据中省/市/区县字段的名称
+_CANDIDATE_ADMIN_KEYS = {
+    'geocoding': ('province', 'city', 'district'),
+    'poi': ('pname', 'cityname', 'adname'),
+}
+
+
+def check_administrative_match(parsed_original: dict, candidate_data: dict, mode: str) -> bool:
+    """检查行政区划匹配，统一处理两种模式的字段差异"""
+
+    # 优先比较 adcode 整数前缀：消除"恩施州"与"恩施土家族苗族自治州"这类简称/全称差异造成的误判
+    province_key, city_key, district_key = _CANDIDATE_ADMIN_KEYS.get(mode, _CANDIDATE_ADMIN_KEYS['poi'])
+    original_adcode = resolve_adcode(parsed_original)
+    candidate_adcode = resolve_adcode(candidate_data, province_key, city_key, district_key) if original_adcode else None
+    if original_adcode and candidate_adcode:
+        depth = min(adcode_depth(original_adcode), adcode_depth(candidate_adcode))
+        # 省、市两级的编码稳定，直接作为硬性过滤
+        if not adcode_prefix_equal(original_adcode, candidate_adcode, min(depth, 4)):
+            _debug(lambda: f"置信度过滤：adcode不匹配 {original_adcode} vs {candidate_adcode}")
+            return False
+        if depth == 6 and original_adcode == candidate_adcode:
+            return True
+        # 区县级编码可能因撤县设区等调整而变化，继续按名称做区县条件匹配
+        return _check_county_name_match(parsed_original, candidate_data, mode)
+
+    # 省级匹配
+    original_province = (parsed_original.get('province') or '').strip()
+    if mode == 'geocoding':
+        candidate_province = (candidate_data.get('province') or '').strip()
+    else:  # poi
+        candidate_province = (candidate_data.get('pname') or '').strip()
+    
+    if original_province and candidate_province and original_province != candidate_province:
+        _debug(lambda: f"置信度过滤：省份不匹配 '{original_province}' vs '{candidate_province}'")
+        return False
+    
+    # 市级匹配
+    original_city = (parsed_original.get('city') or '').strip()
+    if mode == 'geocoding':
+        candidate_city = (candidate_data.get('city') or '').strip()
+    else:  # poi
+        candidate_city = (candidate_data.get('cityname') or '').strip()
+    
+    if original_city and candidate_city and original_city != candidate_city:
+        _debug(lambda: f"置信度过滤：城市不匹配 '{original_city}' vs '{candidate_city}'")
+        return False
+    
+    return _check_county_name_match(parsed_original, candidate_data, mode)
+
+
+def _check_county_name_match(parsed_original: dict, candidate_data: dict, mode: str) -> bool:
+    """区县级条件匹配（按名称）"""
+    original_county = (parsed_original.get('county') or '').strip()
+    if mode == 'geocoding':
+        candidate_district = (candidate_data.get('district') or '').strip()
+    else:  # poi
+        candidate_district = (candidate_data.get('adname') or '').strip()
+    
+    if original_county and candidate_district and original_county != candidate_district:
+        _debug(lambda: f"置信度过滤：区县不匹配 '{original_county}' vs '{candidate_district}'")
+        return False
+    
+    return True
+
+
+def text_similarity_with_containment(text1: str, text2: str, dimension_name: str = '') -> float:
+    """
+    计算两个文本的相似度，考虑包含关系的增强算法。
+    
+    Args:
+        text1: 第一个文本（通常是原始地址）
+        text2: 第二个文本（通常是POI名称或地址）
+        dimension_name: 维度名称，用于日志
+    
+    Returns:
+        相似度分数 (0.0 - 1.0)
+    """
+    _debug(lambda: f"[CONFIDENCE_DEBUG] Similarity Check ('{dimension_name}'): '{text1}' vs '{text2}'")
+    if not text1 and not text2:
+        return 1.0
+    
+    if not text1 or not text2:
+        return 0.5
+    
+    # 基础编辑距离相似度
+    base_similarity = Levenshtein.ratio(text1, text2)
+    _debug(lambda: f"[CONFIDENCE_DEBUG]   -> Base Levenshtein Ratio: {base_similarity:.3f}")
+    
+    # 包含关系增强
+    enhanced_similarity = base_similarity
+    
+    if text1 in text2:
+        # text1包含在text2中，如"迁江老街"在"迁江老街米粉"中
+        # 这种情况通常表示用户搜索地名，POI是该地名的具体商户，匹配度应该很高
+        contain_ratio = len(text1) / len(text2)
+        
+        # 改进算法：基线更高，但增长更平缓
+        if contain_ratio >= 0.8:
+            # 几乎完全匹配，如"迁江老街" vs "迁江老街店"
+            enhanced_similarity = max(base_similarity, 0.95 + contain_ratio * 0.05)  # 95%-100%
+        elif contain_ratio >= 0.5:
+            # 高度匹配，如"迁江老街" vs "迁江老街米粉"
+            enhanced_similarity = max(base_similarity, 0.90 + contain_ratio * 0.10)  # 90%-95%
+        else:
+            # 中等匹配，如"迁江老街" vs "迁江老街米粉餐厅连锁店"
+            enhanced_similarity = max(base_similarity, 0.80 + contain_ratio * 0.20)  # 80%-90%
+            
+        _debug(lambda: (
+            f"{dimension_name}包含关系A: '{text1}' in '{text2}', 长度比例={contain_ratio:.3f}, 基础相似度={base_similarity:.3f}, 增强置信度={enhanced_similarity:.3f}"
+        ))
+    elif text2 in text1:
+        # text2包含在text1中，如"米粉店" in "广西来宾市迁江老街米粉店"
+        # 这种情况表示POI名称是用户搜索的一部分，需要谨慎评分
+        contain_ratio = len(text2) / len(text1)
+        
+        # 更加保守的评分策略，因为POI名称可能过于泛化
+        if len(text2) >= 4 and contain_ratio >= 0.3:
+            # POI名称足够具体且占比合理，如"迁江老街米粉" in "迁江老街米粉店"
+            enhanced_similarity = max(base_similarity, 0.75 + contain_ratio * 0.20)  # 75%-95%
+        elif len(text2) >= 3 and contain_ratio >= 0.2:
+            # POI名称中等具体，如"米粉店" in "迁江老街米粉店"
+            enhanced_similarity = max(base_similarity, 0.65 + contain_ratio * 0.20)  # 65%-85%
+        else:
+            # POI名称太短或占比太小，如"店" in "迁江老街米粉店"，可能是泛化词汇
+            enhanced_similarity = max(base_similarity, 0.50 + contain_ratio * 0.25)  # 50%-75%
+            
+        _debug(lambda: (
+            f"{dimension_name}包含关系B: '{text2}' in '{text1}', 长度比例={contain_ratio:.3f}, POI长度={len(text2)}, 基础相似度={base_similarity:.3f}, 增强置信度={enhanced_similarity:.3f}"
+        ))
+    else:
+        _debug(lambda: (
+            f"{dimension_name}基础相似度: '{text1}' vs '{text2}' = {base_similarity:.3f}"
+        ))
+    
+    _debug(lambda: f"[CONFIDENCE_DEBUG]   -> Final Enhanced Similarity for '{dimension_name}': {enhanced_similarity:.3f}")
+    return enhanced_similarity
+
+
+# ==============================================================================
+# 多进程批量打分
+# ==============================================================================
+
+_worker_suffixes = ()
+
+
+def _init_scoring_worker(suffixes):
+    """工作进程初始化：地名后缀只在进程启动时传递一次，避免每个任务重复序列化。"""
+    global _worker_suffixes
+    _worker_suffixes = tuple(suffixes)
+
+
+def _score_task(task):
+    original_address, candidates, parsed_original, mode, top_k, floor = task
+    return rank_candidates_by_confidence(
+        original_address, candidates, parsed_original, mode, top_k, floor, _worker_suffixes
+    )
+
+
+def score_candidates_parallel(
+    pairs,
+    suffixes,
+    mode: str = 'poi',
+    top_k: int = None,
+    floor: float = 0.0,
+    max_workers: int = None,
+    chunksize: int = 16,
+    mp_context=None
+) -> list:
+    """
+    使用进程池并行计算大量 (原始地址, 候选列表) 的置信度。
+
+    Args:
+        pairs: 可迭代对象，元素为 (original_address, candidates) 或
+               (original_address, candidates, parsed_original)
+        suffixes: 地名后缀列表（无需预先排序）
+        mode: 计算模式，'geocoding'或'poi'
+        top_k, floor: 剪枝参数，含义同 rank_candidates_by_confidence
+        max_workers: 进程数，默认等于 CPU 核数
+        chunksize: 每次派发给工作进程的任务数
+        mp_context: multiprocessing 上下文。默认使用 'spawn'，避免在多线程的 Web 进程中 fork
+
+    Returns:
+        list: 与 pairs 顺序一致，每个元素为 rank_candidates_by_confidence 的返回值
+    """
+    tasks = []
+    for pair in pairs:
+        original_address, candidates = pair[0], pair[1]
+        parsed_original = pair[2] if len(pair) > 2 else None
+        tasks.append((original_address, list(candidates), parsed_original, mode, top_k, floor))
+    if not tasks:
+        return []
+
+    executor = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=mp_context or multiprocessing.get_context('spawn'),
+        initializer=_init_scoring_worker,
+        initargs=(prepare_suffixes(suffixes),)
+    )
+    with executor:
+        return list(executor.map(_score_task, tasks, chunksize=chunksize))
@@ -0,0 +1,232 @@
+"""
+流式批量坐标转换。
+
+CSV / JSON 数组 / JSON Lines 输入按行（记录）增量读取，每凑满 chunk_size 条记录
+调用一次向量化转换，然后立即输出转换后的文本片段。内存占用只与 chunk_size 有关，与文件大小无关。
+
+转换结果写入新增的两列 `<经度列>_<目标坐标系>`、`<纬度列>_<目标坐标系>`（如 lng_gcj02），
+原始坐标列保持不变；坐标缺失或无法解析为数字的记录对应的新列留空。
+"""
+import csv
+import io
+import itertools
+import json
+
+import numpy as np
+
+from . import geo_transforms
+
+SUPPORTED_SYSTEMS = ('WGS84', 'GCJ02', 'BD09')
+DEFAULT_CHUNK_SIZE = 5000
+# JSON 增量解析时每次从输入流读取的字符数
+_JSON_READ_SIZE = 64 * 1024
+_NO_ITEM = object()
+
+
+class CoordinateStreamError(ValueError):
+    """输入文件格式或参数错误（在开始输出之前即可发现的错误）。"""
+
+
+def output_column_names(lng_col: str, lat_col: str, to_sys: str):
+    suffix = to_sys.lower()
+    return f'{lng_col}_{suffix}', f'{lat_col}_{suffix}'
+
+
+def _to_float(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return number
+
+
+def _convert_chunk(lng_values, lat_values, from_sys, to_sys, transform):
+    """返回转换后的 (lng列表, lat列表)，无效坐标对应 None。"""
+    lngs = np.array([_to_float(v) for v in lng_values], dtype=np.float64)
+    lats = np.array([_to_float(v) for v in lat_values], dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        out_lngs, out_lats = transform(lngs, lats, from_sys, to_sys)
+    # NaN 与 ±inf 都视为无效坐标，避免输出非法的 JSON 数值
+    invalid = ~np.isfinite(lngs) | ~np.isfinite(lats)
+    out_lngs = [None if bad else value for bad, value in zip(invalid.tolist(), out_lngs.tolist())]
+    out_lats = [None if bad else value for bad, value in zip(invalid.tolist(), out_lats.tolist())]
+    return out_lngs, out_lats
+
+
+def _format_coord(value):
+    return '' if value is None else repr(value)
+
+
+def transform_csv_stream(text_stream, from_sys, to_sys, lng_col='lng', lat_col='lat',
+                         chunk_size=DEFAULT_CHUNK_SIZE, transform=None):
+    """
+    流式转换 CSV。表头在调用时立即读取并校验（缺少坐标列时抛出 CoordinateStreamError），
+    返回一个逐块产出 CSV 文本的生成器。
+
+    Args:
+        text_stream: 文本流（按行迭代）
+        transform: 批量转换函数，签名同 geo_transforms.coordinate_transform_batch
+    """
+    transform = transform or geo_transforms.coordinate_transform_batch
+    reader = csv.reader(text_stream)
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise CoordinateStreamError('CSV 文件为空')
+    if lng_col not in header or lat_col not in header:
+        raise CoordinateStreamError(f'CSV 表头中缺少坐标列: {lng_col}, {lat_col}')
+    lng_idx, lat_idx = header.index(lng_col), header.index(lat_col)
+    new_header = header + list(output_column_names(lng_col, lat_col, to_sys))
+
+    def _generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(new_header)
+
+        def _flush(rows):
+            out_lngs, out_lats = _convert_chunk(
+                [row[lng_idx] if len(row) > lng_idx else None for row in rows],
+                [row[lat_idx] if len(row) > lat_idx else None for row in rows],
+                from_sys, to_sys, transform
+            )
+            for row, lng, lat in zip(rows, out_lngs, out_lats):
+                writer.writerow(row + [_format_coord(lng), _format_coord(lat)])
+            data = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            return data
+
+        rows = []
+        for row in reader:
+            rows.append(row)
+            if len(rows) >= chunk_size:
+                yield _flush(rows)
+                rows = []
+        yield _flush(rows)
+
+    return _generate()
+
+
+def _iter_json_array(text_stream):
+    """增量解析 JSON 数组，逐个产出数组元素，不把整个文件读入内存。"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def _fill():
+        nonlocal buffer, pos, eof
+        chunk = text_stream.read(_JSON_READ_SIZE)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def _skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            _fill()
+
+    _skip_whitespace()
+    if pos >= len(buffer) or buffer[pos] != '[':
+        raise CoordinateStreamError('JSON 输入必须是对象数组')
+    pos += 1
+
+    expect_value = True
+    has_items = False
+    while True:
+        _skip_whitespace()
+        if pos >= len(buffer):
+            raise CoordinateStreamError('JSON 数组不完整')
+        char = buffer[pos]
+        if not expect_value:
+            # 元素之后只能是逗号或数组结束
+            if char == ']':
+                return
+            if char != ',':
+                raise CoordinateStreamError('JSON 格式错误：数组元素之间缺少逗号')
+            pos += 1
+            expect_value = True
+            continue
+        if char == ']':
+            if has_items:
+                raise CoordinateStreamError('JSON 格式错误：数组末尾多余的逗号')
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise CoordinateStreamError('JSON 格式错误')
+            _fill()
+            continue
+        # 数字等标量可能恰好在缓冲区末尾被截断，继续读取后再解析
+        if end >= len(buffer) and not eof and not isinstance(item, (dict, list)):
+            _fill()
+            continue
+        pos = end
+        expect_value = False
+        has_items = True
+        yield item
+
+
+def _iter_json_lines(text_stream):
+    for line_no, line in enumerate(text_stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            raise CoordinateStreamError(f'JSON Lines 第 {line_no} 行格式错误')
+
+
+def transform_json_stream(text_stream, from_sys, to_sys, lng_col='lng', lat_col='lat',
+                          chunk_size=DEFAULT_CHUNK_SIZE, json_lines=False, transform=None):
+    """
+    流式转换 JSON 对象数组（或 JSON Lines），返回逐块产出 JSON 文本的生成器。
+    非对象元素原样输出。
+    """
+    transform = transform or geo_transforms.coordinate_transform_batch
+    out_lng_col, out_lat_col = output_column_names(lng_col, lat_col, to_sys)
+    items = _iter_json_lines(text_stream) if json_lines else _iter_json_array(text_stream)
+    # 预读第一条记录，使输入格式错误在开始输出之前就能被发现
+    first_item = next(items, _NO_ITEM)
+    if first_item is not _NO_ITEM:
+        items = itertools.chain([first_item], items)
+
+    def _convert(records):
+        targets = [r for r in records if isinstance(r, dict)]
+        out_lngs, out_lats = _convert_chunk(
+            [r.get(lng_col) for r in targets], [r.get(lat_col) for r in targets], from_sys, to_sys, transform
+        )
+        for record, lng, lat in zip(targets, out_lngs, out_lats):
+            record[out_lng_col] = lng
+            record[out_lat_col] = lat
+        return [json.dumps(r, ensure_ascii=False) for r in records]
+
+    def _generate():
+        first = True
+        if not json_lines:
+            yield '['
+        records = []
+        for item in items:
+            records.append(item)
+            if len(records) >= chunk_size:
+                yield _join(_convert(records), first)
+                first = False
+                records = []
+        if records:
+            yield _join(_convert(records), first)
+        if not json_lines:
+            yield ']'
+
+    def _join(lines, first):
+        if json_lines:
+            return ''.join(line + '\n' for line in lines)
+        return ('' if first else ',') + ','.join(lines)
+
+    return _generate()
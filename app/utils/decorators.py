@@ -1,15 +1,17 @@
-import asyncio
 from functools import wraps
 from asgiref.sync import async_to_sync
 
+from . import http_client
+
 def async_route(f):
     """
     一个装饰器，用于将异步的Flask路由函数包装起来，
     以便在同步的Flask应用中运行。
+    每次调用使用独立的事件循环，结束前关闭该循环上的共享HTTP会话。
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        return asyncio.run(f(*args, **kwargs))
+        return http_client.run(f(*args, **kwargs))
     return decorated_function
 
 def wrap_async(f):
@@ -17,4 +19,4 @@ def wrap_async(f):
     def sync_f(*args, **kwargs):
         return async_to_sync(f)(*args, **kwargs)
     sync_f.__name__ = f.__name__
-    return sync_f 
\ No newline at end of file
+    return sync_f
@@ -0,0 +1,117 @@
+"""
+按内容寻址的磁盘缓存（JSON 文件）。
+
+缓存键经 SHA-256 摘要后作为文件名，按命名空间与摘要前两位分目录存放；每个条目单独指定 TTL，
+过期条目在读取时删除，也可通过 `prune()` 批量清理。写入先落到临时文件再原子替换，
+多个进程/线程同时读写同一目录是安全的（最后写入者生效）。
+指定 max_entries 时，命中会刷新文件的修改时间，每写入 EVICT_INTERVAL 次按修改时间淘汰最久未使用的条目。
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+
+class DiskCache:
+    EVICT_INTERVAL = 256
+
+    def __init__(self, directory: str, clock=time.time, max_entries: int = None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._clock = clock
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, namespace: str, key) -> str:
+        raw = json.dumps([namespace, key], ensure_ascii=False, sort_keys=True, default=str)
+        digest = hashlib.sha256(raw.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, namespace, digest[:2], f'{digest}.json')
+
+    def get(self, namespace: str, key):
+        """返回 (是否命中, value)。文件不存在、损坏或已过期均视为未命中。"""
+        path = self._path(namespace, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if entry['expires_at'] > self._clock():
+                if self.max_entries:
+                    os.utime(path)
+                self.hits += 1
+                return True, entry['value']
+            os.remove(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        self.misses += 1
+        return False, None
+
+    def set(self, namespace: str, key, value, ttl: float):
+        if ttl <= 0:
+            return
+        path = self._path(namespace, key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump({'expires_at': self._clock() + ttl, 'value': value}, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except (OSError, TypeError, ValueError):
+            # 缓存写入失败不影响主流程
+            return
+        self._writes += 1
+        if self.max_entries and self._writes % self.EVICT_INTERVAL == 0:
+            self.evict(self.max_entries)
+
+    def prune(self) -> int:
+        """删除所有已过期或无法读取的条目，返回删除的文件数。"""
+        removed = 0
+        now = self._clock()
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        expired = json.load(f)['expires_at'] <= now
+                except (OSError, ValueError, KeyError, TypeError):
+                    expired = True
+                if expired:
+                    try:
+                        os.remove(path)
+                        removed += 1
+                    except OSError:
+                        pass
+        return removed
+
+    def evict(self, max_entries: int) -> int:
+        """条目数超过 max_entries 时按修改时间删除最久未使用的条目，返回删除的文件数。"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    try:
+                        entries.append((os.stat(path).st_mtime, path))
+                    except OSError:
+                        pass
+        excess = len(entries) - max_entries
+        if excess <= 0:
+            return 0
+        entries.sort()
+        removed = 0
+        for _, path in entries[:excess]:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def stats(self) -> dict:
+        return {'directory': self.directory, 'max_entries': self.max_entries, 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,196 @@
+"""
+基于预计算偏移网格的 GCJ-02 快速转换引擎（可选）。
+
+GCJ-02 相对 WGS84 的偏移量 (dlng, dlat) 是 `geo_transforms.transform_lat/transform_lng`
+给出的光滑函数。对整份已保存任务、导入数据集等超大批量转换，可以先在覆盖中国范围的规则
+网格上计算一次偏移场，写入二进制文件 (`app/data/gcj02_offset_grid.bin`，由
+`scripts/build_gcj02_grid.py` 生成，体积较大，不纳入版本库)，转换时通过 np.memmap
+只读映射并做双线性插值，不再逐点计算三角函数。
+
+误差：偏移场中周期最短的分量是 sin(6πΔlng)（周期 1/3 度，振幅约 13 米），
+双线性插值的误差与网格步长的平方成正比。默认 0.02 度网格相对解析公式的实测偏差：
+平均约 0.14 米，最大约 0.37 米（约 4e-6 度），远小于服务商坐标本身的误差；
+速度约为解析批量转换的 2~3 倍（点位集中在同一城市时更快）。
+运行 `scripts/bench_gcj02_grid.py` 可重新测量误差与速度。
+
+网格文件缺失时所有函数自动回退到 geo_transforms 中的解析批量转换。
+"""
+import logging
+import os
+import struct
+import threading
+
+import numpy as np
+
+from . import geo_transforms
+
+logger = logging.getLogger(__name__)
+
+GRID_MAGIC = b'GCJG'
+GRID_VERSION = 1
+
+# 网格覆盖范围与 out_of_china 的判定范围一致
+GRID_MIN_LNG = 73.66
+GRID_MAX_LNG = 135.05
+GRID_MIN_LAT = 3.86
+GRID_MAX_LAT = 53.55
+DEFAULT_GRID_STEP = 0.02
+
+# 文件头: magic, version, 保留, 起点经度, 起点纬度, 经度步长, 纬度步长, 经度格点数, 纬度格点数
+# 头部之后是 float32 数组，形状为 (2, 纬度格点数, 经度格点数)，依次为 dlng、dlat 平面
+HEADER_STRUCT = struct.Struct('<4sHHddddII')
+
+DEFAULT_GRID_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'gcj02_offset_grid.bin'
+)
+
+
+def build_offset_grid(step: float = DEFAULT_GRID_STEP, rows_per_chunk: int = 256):
+    """
+    在中国范围的规则网格上计算 WGS84 -> GCJ02 偏移场。
+
+    Returns:
+        (header_bytes, offsets)，offsets 为 float32 数组，形状 (2, n_lat, n_lng)
+    """
+    n_lng = int(np.ceil((GRID_MAX_LNG - GRID_MIN_LNG) / step)) + 1
+    n_lat = int(np.ceil((GRID_MAX_LAT - GRID_MIN_LAT) / step)) + 1
+    lngs = GRID_MIN_LNG + np.arange(n_lng, dtype=np.float64) * step
+
+    offsets = np.empty((2, n_lat, n_lng), dtype=np.float32)
+    for row_start in range(0, n_lat, rows_per_chunk):
+        row_end = min(n_lat, row_start + rows_per_chunk)
+        lats = GRID_MIN_LAT + np.arange(row_start, row_end, dtype=np.float64) * step
+        grid_lng, grid_lat = np.meshgrid(lngs, lats)
+        dlng, dlat = geo_transforms._gcj02_offset_batch(grid_lng, grid_lat)
+        offsets[0, row_start:row_end] = dlng
+        offsets[1, row_start:row_end] = dlat
+
+    header = HEADER_STRUCT.pack(
+        GRID_MAGIC, GRID_VERSION, 0, GRID_MIN_LNG, GRID_MIN_LAT, step, step, n_lng, n_lat
+    )
+    return header, offsets
+
+
+class Gcj02OffsetGrid:
+    """基于 np.memmap 的只读偏移网格，线程安全。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_STRUCT.size)
+        (magic, version, _, self.lng0, self.lat0,
+         self.step_lng, self.step_lat, self.n_lng, self.n_lat) = HEADER_STRUCT.unpack(header)
+        if magic != GRID_MAGIC or version != GRID_VERSION:
+            raise ValueError(f"GCJ02 偏移网格文件格式不兼容: {path}")
+        self._offsets = np.memmap(
+            path, dtype=np.float32, mode='r', offset=HEADER_STRUCT.size, shape=(2, self.n_lat, self.n_lng)
+        )
+
+    def offsets(self, lngs, lats):
+        """
+        双线性插值得到 (dlng, dlat)。调用方需保证坐标位于网格范围内（即不在 out_of_china 范围外）。
+        """
+        fx = (lngs - self.lng0) / self.step_lng
+        fy = (lats - self.lat0) / self.step_lat
+        ix = np.clip(np.floor(fx).astype(np.intp), 0, self.n_lng - 2)
+        iy = np.clip(np.floor(fy).astype(np.intp), 0, self.n_lat - 2)
+        tx = fx - ix
+        ty = fy - iy
+        # 四个角点在展平数组中的下标只计算一次，两个偏移平面共用
+        idx00 = iy * self.n_lng + ix
+        idx10 = idx00 + self.n_lng
+
+        result = []
+        for plane in self._offsets:
+            flat = plane.reshape(-1)
+            v00 = flat.take(idx00).astype(np.float64)
+            v01 = flat.take(idx00 + 1)
+            v10 = flat.take(idx10).astype(np.float64)
+            v11 = flat.take(idx10 + 1)
+            top = v00 + (v01 - v00) * tx
+            bottom = v10 + (v11 - v10) * tx
+            result.append(top + (bottom - top) * ty)
+        return result[0], result[1]
+
+
+_grid = None
+_grid_lock = threading.Lock()
+_grid_unavailable = False
+
+
+def get_offset_grid(path: str = None):
+    """
+    懒加载并缓存偏移网格。文件缺失或损坏时返回 None（调用方应回退到解析公式）。
+    """
+    global _grid, _grid_unavailable
+    if _grid is not None or _grid_unavailable:
+        return _grid
+
+    with _grid_lock:
+        if _grid is None and not _grid_unavailable:
+            try:
+                _grid = Gcj02OffsetGrid(path or DEFAULT_GRID_FILE)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning("加载GCJ02偏移网格失败，将使用解析公式转换: %s", e, exc_info=True)
+                _grid_unavailable = True
+    return _grid
+
+
+def _grid_offsets(lngs, lats, grid):
+    """对国内坐标插值得到偏移量，国外坐标（含 NaN）偏移为 0。"""
+    inside = ~geo_transforms.out_of_china_batch(lngs, lats)
+    if inside.all():
+        return grid.offsets(lngs, lats)
+    dlng = np.zeros_like(lngs)
+    dlat = np.zeros_like(lats)
+    if inside.any():
+        dlng[inside], dlat[inside] = grid.offsets(lngs[inside], lats[inside])
+    return dlng, dlat
+
+
+def wgs84_to_gcj02_grid(lngs, lats, grid=None):
+    """
+    WGS84转GCJ02，网格插值版本；网格不可用时回退到 geo_transforms.wgs84_to_gcj02_batch
+    """
+    grid = grid or get_offset_grid()
+    if grid is None:
+        return geo_transforms.wgs84_to_gcj02_batch(lngs, lats)
+    lngs, lats = geo_transforms._as_float_arrays(lngs, lats)
+    dlng, dlat = _grid_offsets(lngs, lats, grid)
+    return lngs + dlng, lats + dlat
+
+
+def gcj02_to_wgs84_grid(lngs, lats, grid=None):
+    """
+    GCJ02转WGS84，网格插值版本；网格不可用时回退到 geo_transforms.gcj02_to_wgs84_batch
+    """
+    grid = grid or get_offset_grid()
+    if grid is None:
+        return geo_transforms.gcj02_to_wgs84_batch(lngs, lats)
+    lngs, lats = geo_transforms._as_float_arrays(lngs, lats)
+    dlng, dlat = _grid_offsets(lngs, lats, grid)
+    return lngs - dlng, lats - dlat
+
+
+def coordinate_transform_grid(lngs, lats, from_sys, to_sys, grid=None):
+    """批量坐标系统转换（网格插值引擎），转换路径与 geo_transforms.coordinate_transform_batch 一致"""
+    lngs, lats = geo_transforms._as_float_arrays(lngs, lats)
+    if from_sys == to_sys:
+        return lngs, lats
+
+    if from_sys == 'WGS84' and to_sys == 'GCJ02':
+        return wgs84_to_gcj02_grid(lngs, lats, grid)
+    elif from_sys == 'GCJ02' and to_sys == 'WGS84':
+        return gcj02_to_wgs84_grid(lngs, lats, grid)
+    elif from_sys == 'GCJ02' and to_sys == 'BD09':
+        return geo_transforms.gcj02_to_bd09_batch(lngs, lats)
+    elif from_sys == 'BD09' and to_sys == 'GCJ02':
+        # 百度转GCJ02，先转WGS84再转GCJ02
+        wgs_lngs, wgs_lats = gcj02_to_wgs84_grid(*geo_transforms._bd09_to_gcj02_batch(lngs, lats), grid)
+        return wgs84_to_gcj02_grid(wgs_lngs, wgs_lats, grid)
+    elif from_sys == 'WGS84' and to_sys == 'BD09':
+        return geo_transforms.gcj02_to_bd09_batch(*wgs84_to_gcj02_grid(lngs, lats, grid))
+    elif from_sys == 'BD09' and to_sys == 'WGS84':
+        return gcj02_to_wgs84_grid(*geo_transforms._bd09_to_gcj02_batch(lngs, lats), grid)
+    else:
+        raise ValueError(f'不支持的坐标系统转换: {from_sys} -> {to_sys}')
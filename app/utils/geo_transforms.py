@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 def gcj02_to_wgs84(lng, lat):
     """
     GCJ02(火星坐标系)转GPS84
@@ -157,4 +159,150 @@ def coordinate_transform(lng, lat, from_sys, to_sys):
         # GCJ02转WGS84
         return gcj02_to_wgs84(gcj02_lng, gcj02_lat)
     else:
-        raise ValueError(f'不支持的坐标系统转换: {from_sys} -> {to_sys}') 
\ No newline at end of file
+        raise ValueError(f'不支持的坐标系统转换: {from_sys} -> {to_sys}') 
+
+# ==============================================================================
+# 批量转换（NumPy 向量化）
+# 与上面的单点函数逐项等价：参数为经纬度数组（或可转换为数组的序列），返回 (lng数组, lat数组)。
+# 国外坐标（含 NaN）按 out_of_china 的规则原样返回。
+# ==============================================================================
+
+def _as_float_arrays(lngs, lats):
+    lngs = np.asarray(lngs, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    if lngs.shape != lats.shape:
+        raise ValueError(f'经纬度数组长度不一致: {lngs.shape} vs {lats.shape}')
+    return lngs, lats
+
+def out_of_china_batch(lngs, lats):
+    """
+    out_of_china 的向量化版本，返回布尔数组
+    """
+    lngs, lats = _as_float_arrays(lngs, lats)
+    return ~((lngs > 73.66) & (lngs < 135.05) & (lats > 3.86) & (lats < 53.55))
+
+def transform_lat_batch(lng, lat):
+    """
+    GCJ02 纬度转换（向量化）
+    """
+    PI = 3.1415926535897932384626
+    ret = -100.0 + 2.0 * lng + 3.0 * lat + 0.2 * lat * lat + \
+          0.1 * lng * lat + 0.2 * np.sqrt(np.abs(lng))
+    ret += (20.0 * np.sin(6.0 * lng * PI) + 20.0 * \
+            np.sin(2.0 * lng * PI)) * 2.0 / 3.0
+    ret += (20.0 * np.sin(lat * PI) + 40.0 * \
+            np.sin(lat / 3.0 * PI)) * 2.0 / 3.0
+    ret += (160.0 * np.sin(lat / 12.0 * PI) + 320 * \
+            np.sin(lat * PI / 30.0)) * 2.0 / 3.0
+    return ret
+
+def transform_lng_batch(lng, lat):
+    """
+    GCJ02 经度转换（向量化）
+    """
+    PI = 3.1415926535897932384626
+    ret = 300.0 + lng + 2.0 * lat + 0.1 * lng * lng + \
+          0.1 * lng * lat + 0.1 * np.sqrt(np.abs(lng))
+    ret += (20.0 * np.sin(6.0 * lng * PI) + 20.0 * \
+            np.sin(2.0 * lng * PI)) * 2.0 / 3.0
+    ret += (20.0 * np.sin(lng * PI) + 40.0 * \
+            np.sin(lng / 3.0 * PI)) * 2.0 / 3.0
+    ret += (150.0 * np.sin(lng / 12.0 * PI) + 300.0 * \
+            np.sin(lng / 30.0 * PI)) * 2.0 / 3.0
+    return ret
+
+def _gcj02_offset_batch(lngs, lats):
+    """计算 WGS84 -> GCJ02 的偏移量 (dlng, dlat)"""
+    PI = 3.1415926535897932384626
+    ee = 0.00669342162296594323
+    a = 6378245.0
+
+    dlat = transform_lat_batch(lngs - 105.0, lats - 35.0)
+    dlng = transform_lng_batch(lngs - 105.0, lats - 35.0)
+    radlat = lats / 180.0 * PI
+    magic = np.sin(radlat)
+    magic = 1 - ee * magic * magic
+    sqrtmagic = np.sqrt(magic)
+    dlat = (dlat * 180.0) / ((a * (1 - ee)) / (magic * sqrtmagic) * PI)
+    dlng = (dlng * 180.0) / (a / sqrtmagic * np.cos(radlat) * PI)
+    return dlng, dlat
+
+def wgs84_to_gcj02_batch(lngs, lats):
+    """
+    WGS84转GCJ02(火星坐标系)，批量版本
+    """
+    lngs, lats = _as_float_arrays(lngs, lats)
+    dlng, dlat = _gcj02_offset_batch(lngs, lats)
+    outside = out_of_china_batch(lngs, lats)
+    return np.where(outside, lngs, lngs + dlng), np.where(outside, lats, lats + dlat)
+
+def gcj02_to_wgs84_batch(lngs, lats):
+    """
+    GCJ02(火星坐标系)转GPS84，批量版本
+    """
+    lngs, lats = _as_float_arrays(lngs, lats)
+    dlng, dlat = _gcj02_offset_batch(lngs, lats)
+    outside = out_of_china_batch(lngs, lats)
+    return (np.where(outside, lngs, lngs * 2 - (lngs + dlng)),
+            np.where(outside, lats, lats * 2 - (lats + dlat)))
+
+def _bd09_to_gcj02_batch(lngs, lats):
+    x_pi = 3.14159265358979324 * 3000.0 / 180.0
+    x = lngs - 0.0065
+    y = lats - 0.006
+    z = np.sqrt(x * x + y * y) - 0.00002 * np.sin(y * x_pi)
+    theta = np.arctan2(y, x) - 0.000003 * np.cos(x * x_pi)
+    return z * np.cos(theta), z * np.sin(theta)
+
+def bd09_to_wgs84_batch(lngs, lats):
+    """
+    百度坐标系(BD-09)转WGS84，批量版本
+    """
+    lngs, lats = _as_float_arrays(lngs, lats)
+    return gcj02_to_wgs84_batch(*_bd09_to_gcj02_batch(lngs, lats))
+
+def gcj02_to_bd09_batch(lngs, lats):
+    """
+    火星坐标系(GCJ-02)转百度坐标系(BD-09)，批量版本
+    """
+    lngs, lats = _as_float_arrays(lngs, lats)
+    x_pi = 3.14159265358979324 * 3000.0 / 180.0
+    z = np.sqrt(lngs * lngs + lats * lats) + 0.00002 * np.sin(lats * x_pi)
+    theta = np.arctan2(lats, lngs) + 0.000003 * np.cos(lngs * x_pi)
+    return z * np.cos(theta) + 0.0065, z * np.sin(theta) + 0.006
+
+def wgs84_to_bd09_batch(lngs, lats):
+    """
+    WGS84转百度坐标系(BD-09)，批量版本（与 wgs84_to_bd09 一致，使用 math.pi 作为扰动系数）
+    """
+    x, y = wgs84_to_gcj02_batch(lngs, lats)
+    z = np.sqrt(x * x + y * y) + 0.00002 * np.sin(y * math.pi)
+    theta = np.arctan2(y, x) + 0.000003 * np.cos(x * math.pi)
+    return z * np.cos(theta) + 0.0065, z * np.sin(theta) + 0.006
+
+def coordinate_transform_batch(lngs, lats, from_sys, to_sys):
+    """批量坐标系统转换，转换路径与 coordinate_transform 完全一致
+    支持的坐标系统：
+    - WGS84: 世界大地测量系统
+    - GCJ02: 国测局坐标系
+    - BD09: 百度坐标系
+    """
+    lngs, lats = _as_float_arrays(lngs, lats)
+    if from_sys == to_sys:
+        return lngs, lats
+
+    if from_sys == 'WGS84' and to_sys == 'GCJ02':
+        return wgs84_to_gcj02_batch(lngs, lats)
+    elif from_sys == 'GCJ02' and to_sys == 'WGS84':
+        return gcj02_to_wgs84_batch(lngs, lats)
+    elif from_sys == 'GCJ02' and to_sys == 'BD09':
+        return gcj02_to_bd09_batch(lngs, lats)
+    elif from_sys == 'BD09' and to_sys == 'GCJ02':
+        # 百度转GCJ02，先转WGS84再转GCJ02
+        return wgs84_to_gcj02_batch(*bd09_to_wgs84_batch(lngs, lats))
+    elif from_sys == 'WGS84' and to_sys == 'BD09':
+        return gcj02_to_bd09_batch(*wgs84_to_gcj02_batch(lngs, lats))
+    elif from_sys == 'BD09' and to_sys == 'WGS84':
+        return bd09_to_wgs84_batch(lngs, lats)
+    else:
+        raise ValueError(f'不支持的坐标系统转换: {from_sys} -> {to_sys}')
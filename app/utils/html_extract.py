@@ -0,0 +1,165 @@
+"""
+网页正文提取（单次扫描、可增量输入）。
+
+基于标准库 html.parser 的事件流，不构建文档树：扫描过程中跳过 script/style 等噪声标签，
+同时按优先级记录各候选正文容器中第一个出现者的文本：
+    <article> > div#js_content > div.rich_media_content > class 含 article/content/text/main 的 div
+    > id 含 article/content/text/main 的 div > <body>
+HTML 可以分块 feed；最高优先级的 <article> 已结束或已收集到足够文本时 `done` 为 True，
+调用方可以停止读取剩余内容。
+"""
+import codecs
+import re
+from html.parser import HTMLParser
+
+DEFAULT_MAX_CHARS = 4000
+
+NOISE_TAGS = frozenset(('script', 'style', 'iframe', 'noscript', 'template'))
+VOID_TAGS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+    'source', 'track', 'wbr',
+))
+
+_CONTAINER_PATTERN = re.compile(r'(article|content|text|main)', re.I)
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+_META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w-]+)', re.I)
+# 国标编码统一按其超集 GB18030 解码
+_ENCODING_ALIASES = {'gb2312': 'gb18030', 'gbk': 'gb18030', 'gb_2312-80': 'gb18030'}
+
+# 候选容器的优先级（数值越小越优先）
+_LEVEL_ARTICLE, _LEVEL_JS_CONTENT, _LEVEL_RICH_MEDIA, _LEVEL_CLASS, _LEVEL_ID, _LEVEL_BODY = range(6)
+
+
+def _container_levels(tag, attrs):
+    if tag == 'article':
+        return (_LEVEL_ARTICLE,)
+    if tag == 'body':
+        return (_LEVEL_BODY,)
+    if tag != 'div':
+        return ()
+    attrs = dict(attrs)
+    element_id = attrs.get('id') or ''
+    classes = attrs.get('class') or ''
+    levels = []
+    if element_id == 'js_content':
+        levels.append(_LEVEL_JS_CONTENT)
+    if 'rich_media_content' in classes.split():
+        levels.append(_LEVEL_RICH_MEDIA)
+    if _CONTAINER_PATTERN.search(classes):
+        levels.append(_LEVEL_CLASS)
+    if _CONTAINER_PATTERN.search(element_id):
+        levels.append(_LEVEL_ID)
+    return tuple(levels)
+
+
+class _Capture:
+    __slots__ = ('depth', 'pieces', 'chars', 'closed')
+
+    def __init__(self, depth):
+        self.depth = depth  # 容器开始标签入栈前的栈深度
+        self.pieces = []
+        self.chars = 0  # 已收集的非空白字符数（下界），用于判断是否已足够
+        self.closed = False
+
+
+class ArticleTextExtractor(HTMLParser):
+    """增量式正文提取器：多次 feed(str) 后调用 close()，再用 text() 取结果。"""
+
+    def __init__(self, max_chars: int = DEFAULT_MAX_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self._stack = []
+        self._noise_depth = None
+        self._captures = {}
+        self._active = []
+
+    @property
+    def done(self) -> bool:
+        article = self._captures.get(_LEVEL_ARTICLE)
+        return article is not None and (article.closed or article.chars >= self.max_chars)
+
+    def _separate(self):
+        for capture in self._active:
+            if capture.pieces and capture.pieces[-1] != ' ':
+                capture.pieces.append(' ')
+
+    def handle_starttag(self, tag, attrs):
+        if self._noise_depth is not None:
+            return
+        self._separate()
+        if tag in VOID_TAGS:
+            return
+        if tag in NOISE_TAGS:
+            self._noise_depth = len(self._stack)
+        else:
+            for level in _container_levels(tag, attrs):
+                if level not in self._captures:
+                    capture = self._captures[level] = _Capture(len(self._stack))
+                    self._active.append(capture)
+        self._stack.append(tag)
+
+    def handle_endtag(self, tag):
+        # 容错：未闭合的子元素随父元素一起出栈；找不到对应开始标签的结束标签忽略
+        for idx in range(len(self._stack) - 1, -1, -1):
+            if self._stack[idx] == tag:
+                break
+        else:
+            return
+        del self._stack[idx:]
+        depth = len(self._stack)
+        if self._noise_depth is not None:
+            if depth > self._noise_depth:
+                return
+            self._noise_depth = None
+        if self._active:
+            for capture in self._active:
+                if capture.depth >= depth:
+                    capture.closed = True
+            self._active = [capture for capture in self._active if not capture.closed]
+        self._separate()
+
+    def handle_data(self, data):
+        if self._noise_depth is not None or not self._active:
+            return
+        size = len(data.strip())
+        if not size:
+            self._separate()
+            return
+        for capture in self._active:
+            if capture.chars < self.max_chars:
+                capture.pieces.append(data)
+                capture.chars += size
+
+    def text(self) -> str:
+        """返回优先级最高的容器的文本（空白折叠、截断到 max_chars），没有 <body> 等容器时返回空串。"""
+        if not self._captures:
+            return ''
+        capture = self._captures[min(self._captures)]
+        return _WHITESPACE_PATTERN.sub(' ', ''.join(capture.pieces)).strip()[:self.max_chars]
+
+
+def sniff_encoding(head: bytes, declared: str = None) -> str:
+    """确定网页编码：优先响应头声明的 charset，其次页面开头的 <meta charset>，默认 UTF-8。"""
+    candidates = [declared]
+    match = _META_CHARSET_PATTERN.search(head or b'')
+    if match:
+        candidates.append(match.group(1).decode('ascii', 'ignore'))
+    for name in candidates:
+        if not name:
+            continue
+        name = _ENCODING_ALIASES.get(name.strip().lower(), name.strip().lower())
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            continue
+    return 'utf-8'
+
+
+def extract_article_text(content, max_chars: int = DEFAULT_MAX_CHARS, encoding: str = None) -> str:
+    """一次性提取整段 HTML（str 或 bytes）的正文文本。"""
+    if isinstance(content, bytes):
+        content = content.decode(sniff_encoding(content[:4096], encoding), errors='replace')
+    extractor = ArticleTextExtractor(max_chars)
+    extractor.feed(content)
+    extractor.close()
+    return extractor.text()
@@ -0,0 +1,144 @@
+"""
+共享的异步 HTTP 客户端（aiohttp 连接池）。
+
+每个事件循环持有一个 aiohttp.ClientSession，同一循环内的所有第三方请求复用同一连接池
+（TCP/TLS 连接、DNS 缓存），避免每次请求都新建会话。ClientSession 与创建它的事件循环绑定，
+因此按循环分别缓存；`decorators.async_route`、`run()` 与 `iterate()` 在事件循环关闭之前调用
+`close_session()` 释放连接。
+
+Flask 每个请求使用各自的事件循环，请求结束时该循环的会话随之关闭，连接无法跨请求复用。
+频繁访问同一主机的调用（智谱 LLM、POI 服务商）改为通过 `in_background()` / `iterate_in_background()`
+在进程内一个长驻的后台事件循环上执行，其会话在进程存续期间保持 keep-alive 连接。
+"""
+import asyncio
+import atexit
+import os
+import threading
+import weakref
+
+import aiohttp
+
+# 连接池总连接数与单个主机的最大并发连接数
+POOL_LIMIT = 100
+POOL_LIMIT_PER_HOST = 20
+DNS_CACHE_TTL = 300
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=10)
+
+_sessions = weakref.WeakKeyDictionary()
+
+
+def get_session() -> aiohttp.ClientSession:
+    """返回当前事件循环的共享会话，不存在或已关闭时新建。必须在事件循环中调用。"""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=POOL_LIMIT, limit_per_host=POOL_LIMIT_PER_HOST, ttl_dns_cache=DNS_CACHE_TTL
+        )
+        session = aiohttp.ClientSession(connector=connector, timeout=DEFAULT_TIMEOUT)
+        _sessions[loop] = session
+    return session
+
+
+async def close_session():
+    """关闭当前事件循环的共享会话（如果存在）。"""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def run(coro):
+    """同步代码的入口：用 asyncio.run 运行协程，事件循环关闭前释放该循环的共享会话。"""
+    async def _run():
+        try:
+            return await coro
+        finally:
+            await close_session()
+    return asyncio.run(_run())
+
+
+def iterate(agen):
+    """
+    同步代码的流式入口（如 Flask 流式响应）：在独立事件循环中逐项驱动异步生成器并产出各项。
+    迭代结束或被提前关闭（客户端断开）时关闭异步生成器、释放该循环的共享会话并关闭循环。
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                item = loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                break
+            yield item
+    finally:
+        try:
+            loop.run_until_complete(agen.aclose())
+            loop.run_until_complete(close_session())
+        finally:
+            loop.close()
+
+
+# 后台事件循环（每个进程一个，首次使用时在守护线程中启动；gunicorn fork 后按进程号重建）
+_background = None
+_background_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _background
+    with _background_lock:
+        if _background is None or _background[0] != os.getpid():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='http-client-loop', daemon=True)
+            thread.start()
+            _background = (os.getpid(), loop)
+        return _background[1]
+
+
+async def in_background(coro):
+    """
+    在后台事件循环上运行协程并等待结果，协程内 get_session() 返回跨请求复用的会话。
+    协程在另一个线程执行，不能访问调用方事件循环的对象或 Flask 上下文（current_app 等需事先取好）；
+    调用方被取消时后台任务随之取消。
+    """
+    loop = _background_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+async def iterate_in_background(agen):
+    """在后台事件循环上逐项驱动异步生成器（限制同 in_background），调用方提前结束时关闭该生成器。"""
+    async def _next():
+        return await agen.__anext__()
+
+    async def _close():
+        await agen.aclose()
+
+    try:
+        while True:
+            try:
+                item = await in_background(_next())
+            except StopAsyncIteration:
+                break
+            yield item
+    finally:
+        await in_background(_close())
+
+
+async def get_text(url: str, **kwargs):
+    """在当前事件循环的共享会话上发起 GET，返回 (状态码, 响应文本)。"""
+    session = get_session()
+    async with session.get(url, **kwargs) as resp:
+        return resp.status, await resp.text()
+
+
+@atexit.register
+def _close_background():
+    if _background is None or _background[0] != os.getpid():
+        return
+    loop = _background[1]
+    try:
+        asyncio.run_coroutine_threadsafe(close_session(), loop).result(timeout=5)
+    except Exception:
+        pass
+    loop.call_soon_threadsafe(loop.stop)
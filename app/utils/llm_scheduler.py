@@ -0,0 +1,236 @@
+"""
+LLM 调用的全局调度器：并发上限、单用户并发上限、滚动 token 预算与优先级。
+
+所有 LLM 请求在发出前向同一个 LLMScheduler 申请名额，满足以下条件才放行：
+- 同时进行中的请求数 < max_concurrency；批量任务最多只能占用 max_concurrency - interactive_reserve 个，
+  其余名额留给交互请求；
+- 同一用户进行中的请求数 < per_user_concurrency；
+- 最近 window 秒内已放行请求的 token 数（放行时按估算值计入，完成后更正为实际用量）加上本次估算
+  不超过 tokens_per_window（窗口内没有记录时总是放行，避免单个超大请求永远等待）；
+- 不处于上游限流后的暂停期（pause）。
+等待中的请求按 (优先级, 到达顺序) 放行：交互请求总是先于批量任务；排在前面的请求被全局条件挡住时，
+后面的请求也不会越过它，只有被单用户上限挡住的请求会被跳过。
+
+应用以多线程运行、每个请求使用各自的事件循环，因此调度器内部用线程锁保护状态，
+通过 call_soon_threadsafe 唤醒其他事件循环中的等待者。
+调用方的用户与优先级通过 scope() 写入上下文变量，在同一请求（及其派生的任务）内生效。
+"""
+import asyncio
+import contextlib
+import contextvars
+import itertools
+import threading
+import time
+from collections import deque
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+# 没有定时条件时等待者最长的自检间隔（秒），防止极端情况下错过唤醒
+MAX_IDLE_WAIT = 5.0
+
+_user_var = contextvars.ContextVar('llm_user', default=None)
+_priority_var = contextvars.ContextVar('llm_priority', default=PRIORITY_INTERACTIVE)
+
+
+@contextlib.contextmanager
+def scope(user=None, priority=None):
+    """在当前上下文中指定后续 LLM 调用所属的用户与优先级（None 表示沿用外层设置）。"""
+    tokens = []
+    if user is not None:
+        tokens.append((_user_var, _user_var.set(user)))
+    if priority is not None:
+        tokens.append((_priority_var, _priority_var.set(priority)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def current_user():
+    return _user_var.get()
+
+
+def current_priority() -> int:
+    return _priority_var.get()
+
+
+class Grant:
+    """一次放行的凭据；请求完成后把实际用量写入 tokens 再交还调度器。"""
+    __slots__ = ('user', 'priority', 'tokens', '_record')
+
+    def __init__(self, user, priority, tokens, record):
+        self.user = user
+        self.priority = priority
+        self.tokens = tokens
+        self._record = record
+
+
+class _Waiter:
+    __slots__ = ('user', 'priority', 'tokens', 'seq', 'loop', 'future', 'grant')
+
+    def __init__(self, user, priority, tokens, seq, loop):
+        self.user = user
+        self.priority = priority
+        self.tokens = tokens
+        self.seq = seq
+        self.loop = loop
+        self.future = loop.create_future()
+        self.grant = None
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int, per_user_concurrency: int = None, tokens_per_window: int = 0,
+                 window: float = 60.0, interactive_reserve: int = 0, clock=time.monotonic):
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_user_concurrency = per_user_concurrency
+        self.tokens_per_window = tokens_per_window
+        self.window = window
+        # 至少给批量任务留一个名额
+        self.interactive_reserve = max(0, min(interactive_reserve, self.max_concurrency - 1))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._waiters = []
+        self._in_flight = 0
+        self._per_user = {}
+        self._records = deque()  # [放行时间, token 数]
+        self._window_tokens = 0
+        self._paused_until = 0.0
+
+    # ---- 对外接口 ----
+
+    async def acquire(self, user=None, priority: int = PRIORITY_INTERACTIVE, tokens: int = 0) -> Grant:
+        """等待直到获得放行；等待期间被取消时不占用名额。"""
+        waiter = _Waiter(user, priority, tokens, next(self._seq), asyncio.get_running_loop())
+        with self._lock:
+            self._waiters.append(waiter)
+            self._dispatch()
+        try:
+            while True:
+                with self._lock:
+                    if waiter.grant is not None:
+                        return waiter.grant
+                    delay = self._next_check()
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), delay)
+                except asyncio.TimeoutError:
+                    with self._lock:
+                        self._dispatch()
+        except BaseException:
+            with self._lock:
+                if waiter.grant is not None:
+                    self._release(waiter.grant)
+                else:
+                    self._waiters.remove(waiter)
+                self._dispatch()
+            raise
+
+    def release(self, grant: Grant):
+        with self._lock:
+            self._release(grant)
+            self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, user=None, priority: int = PRIORITY_INTERACTIVE, tokens: int = 0):
+        """async with 形式的 acquire/release；可在块内修改 grant.tokens 为实际用量。"""
+        grant = await self.acquire(user, priority, tokens)
+        try:
+            yield grant
+        finally:
+            self.release(grant)
+
+    def pause(self, seconds: float):
+        """上游返回限流时调用：seconds 秒内不再放行新的请求（已在进行中的不受影响）。"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire(self._clock())
+            return {
+                'in_flight': self._in_flight,
+                'waiting': len(self._waiters),
+                'window_tokens': self._window_tokens,
+                'paused_for': max(0.0, self._paused_until - self._clock()),
+            }
+
+    # ---- 以下方法均需在持有 self._lock 时调用 ----
+
+    def _expire(self, now):
+        while self._records and self._records[0][0] <= now - self.window:
+            self._window_tokens -= self._records.popleft()[1]
+
+    def _release(self, grant):
+        self._in_flight -= 1
+        if grant.user is not None:
+            remaining = self._per_user.get(grant.user, 1) - 1
+            if remaining > 0:
+                self._per_user[grant.user] = remaining
+            else:
+                self._per_user.pop(grant.user, None)
+        record = grant._record
+        actual = max(0, int(grant.tokens or 0))
+        if record[1] != actual and self._records and record[0] > self._clock() - self.window:
+            self._window_tokens += actual - record[1]
+            record[1] = actual
+
+    def _blocked(self, waiter, now):
+        """返回阻挡该等待者的条件：None 可放行，'user' 仅被单用户上限挡住，'global' 被全局条件挡住。"""
+        if now < self._paused_until:
+            return 'global'
+        capacity = self.max_concurrency
+        if waiter.priority != PRIORITY_INTERACTIVE:
+            capacity -= self.interactive_reserve
+        if self._in_flight >= capacity:
+            return 'global'
+        if self.tokens_per_window and self._window_tokens > 0 and \
+                self._window_tokens + waiter.tokens > self.tokens_per_window:
+            return 'global'
+        if waiter.user is not None and self.per_user_concurrency and \
+                self._per_user.get(waiter.user, 0) >= self.per_user_concurrency:
+            return 'user'
+        return None
+
+    def _dispatch(self):
+        now = self._clock()
+        self._expire(now)
+        self._waiters.sort(key=lambda w: (w.priority, w.seq))
+        remaining = []
+        for idx, waiter in enumerate(self._waiters):
+            blocked = self._blocked(waiter, now)
+            if blocked == 'global':
+                remaining.extend(self._waiters[idx:])
+                break
+            if blocked == 'user':
+                remaining.append(waiter)
+                continue
+            record = [now, waiter.tokens]
+            self._records.append(record)
+            self._window_tokens += waiter.tokens
+            self._in_flight += 1
+            if waiter.user is not None:
+                self._per_user[waiter.user] = self._per_user.get(waiter.user, 0) + 1
+            waiter.grant = Grant(waiter.user, waiter.priority, waiter.tokens, record)
+            try:
+                waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+            except RuntimeError:
+                # 等待者所在的事件循环已关闭：收回名额
+                self._release(waiter.grant)
+        self._waiters = remaining
+
+    def _next_check(self):
+        """等待者下一次自检的间隔：暂停结束或窗口内最早的记录过期时。"""
+        now = self._clock()
+        candidates = [MAX_IDLE_WAIT]
+        if self._paused_until > now:
+            candidates.append(self._paused_until - now)
+        if self.tokens_per_window and self._records:
+            candidates.append(self._records[0][0] + self.window - now)
+        return max(0.01, min(candidates))
@@ -14,5 +14,7 @@ class ContextFilter(logging.Filter):
         为日志记录添加一个 'context' 属性。
         如果上下文变量中有值，日志格式化器 (formatter) 就可以使用它。
         """
-        record.context = request_context_var.get()
+        # 已注入过的记录不再覆盖：经队列转交到后台线程的记录必须保留产生日志时的上下文
+        if not hasattr(record, 'context'):
+            record.context = request_context_var.get()
         return True 
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+非阻塞、分级的应用日志。
+
+- `install_queue_logging(app)`：把 app.logger 的处理器换成 QueueHandler，真正的格式化与
+  stdout/文件写入由后台 QueueListener 线程完成，请求线程只负责把日志记录放入队列。
+  日志上下文（log_context.request_context_var）仍在产生日志的线程中读取。
+- `log_payload(logger, label, payload)`：按 LOG_PAYLOAD_SAMPLE_RATE 抽样记录第三方API的原始请求/响应，
+  未抽中时不做任何序列化；抽中时的 json.dumps 也推迟到后台线程格式化时才执行。
+
+模块内使用标准的 `logging.getLogger(__name__)`（位于 'app' 日志器之下），
+并使用 `logger.info("...%s", value)` 形式的惰性格式化。
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+
+from .log_context import ContextFilter
+
+# 原始载荷日志的默认截断长度（字符）
+DEFAULT_PAYLOAD_MAX_CHARS = 2000
+
+_payload_sample_rate = 0.0
+_payload_max_chars = DEFAULT_PAYLOAD_MAX_CHARS
+
+
+class _DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """
+    入队时不格式化消息（默认实现会在当前线程调用 format）：消息参数的 __str__ 与异常堆栈
+    都在监听线程中格式化。日志上下文已由本处理器上的 ContextFilter 在当前线程写入记录。
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class LazyJson:
+    """在真正格式化时才执行 json.dumps 并截断，作为日志参数使用。"""
+
+    __slots__ = ('payload', 'max_chars')
+
+    def __init__(self, payload, max_chars=None):
+        self.payload = payload
+        self.max_chars = max_chars or _payload_max_chars
+
+    def __str__(self):
+        try:
+            text = json.dumps(self.payload, ensure_ascii=False, default=str)
+        except (TypeError, ValueError):
+            text = repr(self.payload)
+        if len(text) > self.max_chars:
+            return f"{text[:self.max_chars]}...(共 {len(text)} 字符)"
+        return text
+
+
+def redact(params: dict, fields=('key', 'ak', 'tk', 'api_key')) -> dict:
+    """返回隐藏了密钥字段的参数副本，用于记录请求参数。"""
+    return {k: ('***' if k in fields and v else v) for k, v in (params or {}).items()}
+
+
+def payload_sampled() -> bool:
+    return _payload_sample_rate > 0 and random.random() < _payload_sample_rate
+
+
+def log_payload(logger: logging.Logger, label: str, payload, level: int = logging.INFO):
+    """抽样记录原始载荷。未抽中或该级别未开启时直接返回。"""
+    if payload_sampled() and logger.isEnabledFor(level):
+        logger.log(level, "[RAW_PAYLOAD %s] %s", label, LazyJson(payload), stacklevel=2)
+
+
+def install_queue_logging(app):
+    """
+    为 app.logger 安装队列日志：现有处理器移到后台监听线程，app.logger 只保留一个 QueueHandler。
+    日志级别取 LOG_LEVEL，原始载荷抽样率取 LOG_PAYLOAD_SAMPLE_RATE。
+    """
+    global _payload_sample_rate, _payload_max_chars
+    _payload_sample_rate = float(app.config.get('LOG_PAYLOAD_SAMPLE_RATE', 0.0))
+    _payload_max_chars = int(app.config.get('LOG_PAYLOAD_MAX_CHARS', DEFAULT_PAYLOAD_MAX_CHARS))
+
+    level = app.config.get('LOG_LEVEL')
+    if level:
+        app.logger.setLevel(level)
+
+    if not app.config.get('LOG_USE_QUEUE', True):
+        return None
+
+    targets = [h for h in app.logger.handlers if not isinstance(h, logging.handlers.QueueHandler)]
+    if not targets:
+        return None
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _DeferredFormatQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    for handler in targets:
+        app.logger.removeHandler(handler)
+    app.logger.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, *targets, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    app.extensions['log_queue_listener'] = listener
+    return listener
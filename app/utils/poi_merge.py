@@ -0,0 +1,187 @@
+"""
+多源POI结果合并与去重。
+
+不同服务商常常返回同一个地点（坐标相差几十米，名称写法略有差异）。合并时先按 GCJ-02 坐标的
+geohash 网格分桶，只在同一格及相邻 8 格内查找候选，再用名称相似度确认是否为同一地点；
+同一服务商返回的结果之间不做去重。
+"""
+import re
+
+import Levenshtein
+
+from .confidence_core import normalize_detail_text
+
+_GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_GEOHASH_DECODE = {char: idx for idx, char in enumerate(_GEOHASH_BASE32)}
+
+# geohash 精度 7 的格子约 153m x 153m
+DEFAULT_GEOHASH_PRECISION = 7
+DEFAULT_NAME_SIMILARITY = 0.8
+
+_NAME_STRIP_PATTERN = re.compile(r'[^\w]')
+# 括号内通常是分店、出入口等补充说明，如"天安门(北京)"、"肯德基(王府井店)"
+_NAME_BRACKET_PATTERN = re.compile(r'[（(\[【][^）)\]】]*[）)\]】]')
+
+
+def geohash_encode(lat: float, lng: float, precision: int = DEFAULT_GEOHASH_PRECISION) -> str:
+    """标准 geohash 编码（经度位、纬度位交替，base32 输出）。"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def geohash_bounds(geohash: str):
+    """返回 geohash 格子的 (min_lat, max_lat, min_lng, max_lng)。"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _GEOHASH_DECODE[char]
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lng_range[0], lng_range[1]
+
+
+def geohash_neighbors(geohash: str):
+    """
+    返回格子本身及其相邻格子的 geohash（按格子中心偏移一个格宽重新编码）。
+
+    结果为元组，顺序固定：格子本身在最前，其余按纬度、经度偏移从小到大排列并去重
+    （靠近两极时部分偏移越界被跳过）。
+    """
+    min_lat, max_lat, min_lng, max_lng = geohash_bounds(geohash)
+    center_lat, center_lng = (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+    d_lat, d_lng = max_lat - min_lat, max_lng - min_lng
+    cells = [geohash]
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            lat = center_lat + i * d_lat
+            if not -90.0 <= lat <= 90.0:
+                continue
+            lng = (center_lng + j * d_lng + 180.0) % 360.0 - 180.0
+            cell = geohash_encode(lat, lng, len(geohash))
+            if cell not in cells:
+                cells.append(cell)
+    return tuple(cells)
+
+
+def _normalize_name(name) -> str:
+    return _NAME_STRIP_PATTERN.sub('', normalize_detail_text(name)).replace('_', '')
+
+
+def _name_keys(name):
+    """返回 (完整名称, 去掉括号说明后的名称)，均已标准化。"""
+    text = str(name or '')
+    return _normalize_name(text), _normalize_name(_NAME_BRACKET_PATTERN.sub('', text))
+
+
+def _name_similarity(keys_a, keys_b) -> float:
+    """名称相似度：完整名称或去括号名称相同为 1.0，否则为完整名称的 Levenshtein.ratio。"""
+    full_a, base_a = keys_a
+    full_b, base_b = keys_b
+    if not full_a or not full_b:
+        return 0.0
+    if full_a == full_b or (base_a and base_a == base_b):
+        return 1.0
+    return Levenshtein.ratio(full_a, full_b)
+
+
+def _poi_coords(poi):
+    try:
+        return float(poi['latitude_gcj02']), float(poi['longitude_gcj02'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def merge_poi_results(results_by_source: dict, precision: int = DEFAULT_GEOHASH_PRECISION,
+                      name_threshold: float = DEFAULT_NAME_SIMILARITY) -> list:
+    """
+    合并多个服务商的POI结果并去除跨服务商的重复项。
+
+    Args:
+        results_by_source: {source: [poi, ...]}，字典顺序即置信度相同时的服务商优先级
+        precision: geohash 分桶精度
+        name_threshold: 名称相似度（Levenshtein.ratio）阈值，达到即视为同一地点
+
+    Returns:
+        按置信度降序排列的列表。每个结果增加 `sources`（提供该地点的服务商列表）字段，
+        被合并掉的重复项以 {'source', 'name', 'longitude_gcj02', 'latitude_gcj02', 'confidence'}
+        的形式记录在 `duplicates` 中。
+    """
+    source_order = {source: idx for idx, source in enumerate(results_by_source)}
+    candidates = [
+        (poi.get('confidence') or 0.0, source_order[source], rank, source, poi)
+        for source, pois in results_by_source.items()
+        for rank, poi in enumerate(pois or [])
+    ]
+    # 置信度高者优先成为代表项，其余同一地点的结果并入其中
+    candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+
+    groups = []
+    buckets = {}
+    for confidence, _, _, source, poi in candidates:
+        merged = dict(poi)
+        merged['sources'] = [source]
+        merged['duplicates'] = []
+        coords = _poi_coords(poi)
+        if coords is None:
+            groups.append(merged)
+            continue
+
+        name = _name_keys(poi.get('name'))
+        cell = geohash_encode(coords[0], coords[1], precision)
+        # 在相邻格子的候选组中选名称最相似的；相似度相同时选先建立的组（置信度更高）
+        target = None
+        best_key = None
+        for neighbor in geohash_neighbors(cell):
+            for group, group_name, group_index in buckets.get(neighbor, ()):
+                if source in group['sources']:
+                    continue
+                similarity = _name_similarity(name, group_name)
+                if similarity <= 0.0 or similarity < name_threshold:
+                    continue
+                key = (-similarity, group_index)
+                if best_key is None or key < best_key:
+                    target, best_key = group, key
+
+        if target is None:
+            buckets.setdefault(cell, []).append((merged, name, len(groups)))
+            groups.append(merged)
+        else:
+            target['sources'].append(source)
+            target['duplicates'].append({
+                'source': source,
+                'name': poi.get('name', ''),
+                'longitude_gcj02': poi.get('longitude_gcj02'),
+                'latitude_gcj02': poi.get('latitude_gcj02'),
+                'confidence': confidence,
+            })
+
+    # 置信度相同时，多个服务商共同确认的地点排在前面
+    groups.sort(key=lambda g: (-(g.get('confidence') or 0.0), -len(g['sources'])))
+    return groups
@@ -0,0 +1,127 @@
+"""
+本地抽取式句子排序：在调用LLM之前只保留与原始地址最相关的句子，缩短提示词。
+
+评分规则沿用 web_search_local._extract_relevant_sentences：
+- 每出现一个定位关键词（位于/坐落/街道/路/村...）加 1 分（同一关键词只计一次，允许重叠，如"道路"同时命中"道路"与"路"）；
+- 地址尾部 3 个片段出现在句中各加 1.5 分；
+- 过短（<8 字）减 0.5 分，过长（>120 字）减 0.2 分。
+另外按地址字符二元组在句中的覆盖率加分（最多 ADDRESS_BIGRAM_WEIGHT 分），
+使不含空格的完整地址也能参与匹配。关键词匹配使用预编译的前瞻正则，一次扫描得到全部命中。
+"""
+import math
+import re
+
+DEFAULT_KEYWORDS = (
+    '位于', '坐落', '地处', '隶属于', '行政区', '辖区', '省', '市', '县', '区', '镇', '乡', '街道',
+    '大道', '公路', '道路', '路', '巷', '村', '社区', '附近', '坐标', '经度', '纬度',
+)
+ADDRESS_BIGRAM_WEIGHT = 2.0
+
+_SENTENCE_SPLIT_PATTERN = re.compile(r'[。！？!?；;\n]+')
+_ADDRESS_TOKEN_SPLIT_PATTERN = re.compile(r'[\s,，、]+')
+_CJK_PATTERN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]')
+_NON_SPACE_PATTERN = re.compile(r'\S')
+
+
+class KeywordMatcher:
+    """把关键词表编译为一个前瞻正则，返回文本中出现过的关键词集合。"""
+
+    def __init__(self, keywords):
+        self.keywords = tuple(keywords)
+        alternatives = '|'.join(re.escape(k) for k in sorted(set(self.keywords), key=len, reverse=True))
+        # 前瞻匹配不消耗字符，每个位置都会尝试，重叠的关键词都能命中
+        self._pattern = re.compile(f'(?=({alternatives}))') if alternatives else None
+
+    def distinct(self, text: str) -> set:
+        if self._pattern is None or not text:
+            return set()
+        return set(self._pattern.findall(text))
+
+
+_default_matcher = KeywordMatcher(DEFAULT_KEYWORDS)
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计 token 数：每个汉字约 1 个 token，其余非空白字符每 4 个约 1 个 token。"""
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    others = len(_NON_SPACE_PATTERN.findall(text)) - cjk
+    return cjk + math.ceil(others / 4)
+
+
+def split_sentences(text: str) -> list:
+    return [s.strip() for s in _SENTENCE_SPLIT_PATTERN.split(text or '') if s.strip()]
+
+
+def _bigrams(text: str) -> set:
+    compact = re.sub(r'\s+', '', text or '')
+    return {compact[i:i + 2] for i in range(len(compact) - 1)}
+
+
+class SentenceRanker:
+    """针对一个原始地址预先计算地址片段与二元组，可对多段文本重复使用。"""
+
+    def __init__(self, original_address: str, matcher: KeywordMatcher = None):
+        self.matcher = matcher or _default_matcher
+        tokens = [t for t in _ADDRESS_TOKEN_SPLIT_PATTERN.split(original_address or '') if t]
+        self._tail_tokens = [t.lower() for t in tokens[-3:]]  # 取地址尾部3个片段更有辨识度
+        self._address_bigrams = _bigrams(original_address)
+
+    def score(self, sentence: str) -> float:
+        sc = float(len(self.matcher.distinct(sentence)))
+        s_low = sentence.lower()
+        for tok in self._tail_tokens:
+            if tok in s_low:
+                sc += 1.5
+        if self._address_bigrams:
+            covered = sum(1 for bg in self._address_bigrams if bg in sentence)
+            sc += ADDRESS_BIGRAM_WEIGHT * covered / len(self._address_bigrams)
+        # 略惩罚过短/过长
+        if len(sentence) < 8:
+            sc -= 0.5
+        if len(sentence) > 120:
+            sc -= 0.2
+        return sc
+
+    def rank(self, sentences) -> list:
+        """返回 [(得分, 原始序号, 句子)]，按得分降序、原始顺序升序排列，重复句子只保留第一次出现。"""
+        seen = set()
+        ranked = []
+        for idx, sentence in enumerate(sentences):
+            if sentence in seen:
+                continue
+            seen.add(sentence)
+            ranked.append((self.score(sentence), idx, sentence))
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return ranked
+
+    def select(self, sentences, token_budget: int, max_sentences: int = None) -> list:
+        """
+        按得分从高到低选取句子，直到总 token 数达到预算（至少选 1 句），结果按原文顺序返回。
+        超出剩余预算的句子跳过，继续尝试得分更低但更短的句子。
+        """
+        picked = []
+        used = 0
+        for _, idx, sentence in self.rank(sentences):
+            if max_sentences is not None and len(picked) >= max_sentences:
+                break
+            cost = estimate_tokens(sentence)
+            if used + cost > token_budget:
+                if picked:
+                    continue
+                # 第一句就超出预算（如整段没有标点）时截断
+                sentence = sentence[:max(1, token_budget)]
+                cost = estimate_tokens(sentence)
+            picked.append((idx, sentence))
+            used += cost
+        picked.sort()
+        return [sentence for _, sentence in picked]
+
+
+def select_relevant_text(original_address: str, text: str, token_budget: int, joiner: str = '。') -> str:
+    """把正文分句后选取与地址最相关的句子（按原文顺序、token 预算内），用 joiner 连接。"""
+    sentences = split_sentences(text)
+    if not sentences:
+        return ''
+    return joiner.join(SentenceRanker(original_address).select(sentences, token_budget))
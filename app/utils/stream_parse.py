@@ -0,0 +1,69 @@
+"""
+LLM 流式输出的增量解析：边接收文本片段边取出已经完整的部分。
+
+- LineAssembler：按换行切分，返回已完整的行；流结束时 flush() 取出最后一行。
+- JSONObjectScanner：扫描 JSON 文本（允许被 ```json 代码块包裹），每当数组中的一个对象元素
+  （例如 {"suggestions": [{...}, {...}]} 中的每一项）闭合时立即解析并返回，无需等待整个 JSON 结束。
+  只返回最外层的数组元素，对象内部嵌套的数组元素不单独返回；字符串中的括号与转义引号不影响计数。
+"""
+import json
+
+
+class LineAssembler:
+    def __init__(self):
+        self._buffer = ''
+
+    def feed(self, text: str) -> list:
+        self._buffer += text or ''
+        if '\n' not in self._buffer:
+            return []
+        *lines, self._buffer = self._buffer.split('\n')
+        return lines
+
+    def flush(self) -> list:
+        rest, self._buffer = self._buffer, ''
+        return [rest] if rest else []
+
+
+class JSONObjectScanner:
+    def __init__(self):
+        self._stack = []  # 尚未闭合的容器（'{' 或 '['）
+        self._in_string = False
+        self._escaped = False
+        self._start = None  # 正在收集的对象在 _stack 中的位置
+        self._current = []
+
+    def feed(self, text: str) -> list:
+        objects = []
+        for ch in text or '':
+            collecting = self._start is not None
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = bool(self._stack)
+            elif ch in '{[':
+                if ch == '{' and not collecting and self._stack and self._stack[-1] == '[':
+                    self._start = len(self._stack)
+                    collecting = True
+                self._stack.append(ch)
+            elif ch in '}]' and self._stack:
+                self._stack.pop()
+                if collecting and len(self._stack) == self._start:
+                    self._current.append(ch)
+                    try:
+                        obj = json.loads(''.join(self._current))
+                    except ValueError:
+                        obj = None
+                    if isinstance(obj, dict):
+                        objects.append(obj)
+                    self._start = None
+                    self._current = []
+                    continue
+            if collecting:
+                self._current.append(ch)
+        return objects
@@ -0,0 +1,180 @@
+"""
+address_processing 热点函数的基准测试。
+
+基于 scripts/bench_data/address_corpus.json 中的固定语料（合成数据，由 scripts/gen_address_corpus.py 生成），
+逐个函数统计吞吐量 (calls/s) 以及单次调用的 p50/p99 延迟，并与基线文件比较，超出阈值即以非零状态码退出。
+
+用法：
+    python scripts/bench_address_processing.py                  # 与基线比较
+    python scripts/bench_address_processing.py --save-baseline  # 在当前机器上重新生成基线
+    python scripts/bench_address_processing.py --only remove_suffixes --repeat 5
+
+基线（scripts/bench_data/address_processing_baseline.json）记录的是本机的绝对耗时，与运行机器相关，
+因此不纳入版本库：首次使用、更换机器或升级 jionlp 后先在改动前的代码上用 --save-baseline 生成，
+再在改动后的代码上比较。它只用于本地对比同一台机器上的前后两次运行，不是固定的回归门槛。
+
+退出码：0 未发现退化；1 发现退化；2 找不到基线文件（避免在没有基线的环境中静默通过）。
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+# 将项目根目录添加到 Python 路径，确保能导入 app 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_data')
+DEFAULT_CORPUS_FILE = os.path.join(BENCH_DATA_DIR, 'address_corpus.json')
+DEFAULT_BASELINE_FILE = os.path.join(BENCH_DATA_DIR, 'address_processing_baseline.json')
+# 默认允许的性能退化幅度：p50/p99 延迟超过基线 30% 即视为退化
+DEFAULT_THRESHOLD = 0.30
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def _run_case(func, calls, repeat):
+    """对一组调用参数重复执行 repeat 轮，返回吞吐量与延迟分位数（微秒）。"""
+    # 预热一轮，排除首次加载（jionlp 词典、行政区划索引等）的开销
+    for args in calls:
+        func(*args)
+
+    latencies = []
+    total_start = time.perf_counter()
+    for _ in range(repeat):
+        for args in calls:
+            start = time.perf_counter_ns()
+            func(*args)
+            latencies.append(time.perf_counter_ns() - start)
+    total_elapsed = time.perf_counter() - total_start
+
+    latencies.sort()
+    return {
+        'calls': len(latencies),
+        'throughput': len(latencies) / total_elapsed if total_elapsed > 0 else 0.0,
+        'p50_us': _percentile(latencies, 50) / 1000.0,
+        'p99_us': _percentile(latencies, 99) / 1000.0,
+    }
+
+
+def build_cases(corpus):
+    """根据语料构造每个被测函数的调用参数列表。"""
+    from app.utils import address_processing as ap
+
+    items = corpus['items']
+    suffixes = corpus['suffixes']
+    parsed = [ap.complete_address_jionlp(item['address'], return_dict=True)['parsed_address'] for item in items]
+
+    norm_pairs = []
+    for item in items:
+        source = ap._normalize_detail_for_confidence(ap.remove_suffixes(item['address'], list(suffixes)))
+        for cand in item['candidates']:
+            target = ap._normalize_detail_for_confidence(ap.remove_suffixes(cand['name'], list(suffixes)))
+            norm_pairs.append((source, target, '基准测试'))
+
+    confidence_calls = []
+    for item, parsed_original in zip(items, parsed):
+        for cand in item['candidates']:
+            confidence_calls.append((item['address'], cand, parsed_original, 'poi'))
+        if item.get('geocode_candidate'):
+            confidence_calls.append((item['address'], item['geocode_candidate'], parsed_original, 'geocoding'))
+
+    raw_texts = [item['address'] for item in items] + [cand['name'] for item in items for cand in item['candidates']]
+
+    return {
+        'complete_address_jionlp': (
+            lambda address: ap.complete_address_jionlp(address, return_dict=True),
+            [(item['address'],) for item in items],
+        ),
+        'calculate_unified_confidence': (ap.calculate_unified_confidence, confidence_calls),
+        'remove_suffixes': (ap.remove_suffixes, [(text, suffixes) for text in raw_texts]),
+        '_calculate_text_similarity_with_containment': (ap._calculate_text_similarity_with_containment, norm_pairs),
+        '_normalize_detail_for_confidence': (ap._normalize_detail_for_confidence, [(text,) for text in raw_texts]),
+    }
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """返回退化项列表：(函数名, 指标, 基线值, 当前值)。"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        for metric in ('p50_us', 'p99_us'):
+            if base[metric] > 0 and current[metric] > base[metric] * (1 + threshold):
+                regressions.append((name, metric, base[metric], current[metric]))
+        if base['throughput'] > 0 and current['throughput'] < base['throughput'] / (1 + threshold):
+            regressions.append((name, 'throughput', base['throughput'], current['throughput']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='address_processing 热点函数基准测试')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS_FILE, help='语料文件路径')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_FILE, help='基线文件路径')
+    parser.add_argument('--repeat', type=int, default=3, help='每个函数重复执行的轮数')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='允许的退化幅度，例如 0.3 表示 30%%')
+    parser.add_argument('--only', action='append', help='只运行指定函数，可重复指定')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果写入基线文件')
+    args = parser.parse_args()
+
+    with open(args.corpus, 'r', encoding='utf-8') as f:
+        corpus = json.load(f)
+
+    from app import create_app
+    from app.utils import location_loader
+
+    app = create_app()
+    # 置信度计算中的 debug 日志只保留格式化开销，不输出到终端
+    app.logger.setLevel(logging.WARNING)
+
+    with app.app_context():
+        # 地名后缀固定使用语料中的列表，避免结果受本地数据库内容影响
+        location_loader._location_types_data = list(corpus['suffixes'])
+
+        cases = build_cases(corpus)
+        if args.only:
+            unknown = set(args.only) - set(cases)
+            if unknown:
+                parser.error(f"未知的函数: {', '.join(sorted(unknown))}")
+            cases = {name: case for name, case in cases.items() if name in args.only}
+
+        results = {}
+        print(f"语料: {len(corpus['items'])} 条地址, 重复 {args.repeat} 轮")
+        print(f"{'函数':<46}{'调用次数':>10}{'吞吐(次/秒)':>14}{'p50(us)':>12}{'p99(us)':>12}")
+        for name, (func, calls) in cases.items():
+            stats = _run_case(func, calls, args.repeat)
+            results[name] = stats
+            print(f"{name:<46}{stats['calls']:>10}{stats['throughput']:>14.1f}{stats['p50_us']:>12.1f}{stats['p99_us']:>12.1f}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'repeat': args.repeat, 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"基线已写入 {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"未找到基线文件 {args.baseline}（基线不纳入版本库），请先在本机使用 --save-baseline 生成", file=sys.stderr)
+        return 2
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n性能退化（阈值 {args.threshold:.0%}）:", file=sys.stderr)
+        for name, metric, base_value, current_value in regressions:
+            print(f"  {name} {metric}: 基线 {base_value:.1f} -> 当前 {current_value:.1f}", file=sys.stderr)
+        return 1
+
+    print(f"\n未发现超过 {args.threshold:.0%} 的性能退化")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
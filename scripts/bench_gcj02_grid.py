@@ -0,0 +1,82 @@
+"""
+GCJ-02 偏移网格引擎的速度与精度报告。
+
+在中国范围内随机取点，分别用解析公式 (geo_transforms.*_batch) 与网格插值
+(gcj02_grid.*_grid) 完成转换，输出两者的耗时以及网格结果相对解析结果的偏差（米）。
+
+用法：
+    python scripts/build_gcj02_grid.py          # 先生成网格文件
+    python scripts/bench_gcj02_grid.py --points 2000000
+    python scripts/bench_gcj02_grid.py --max-error-m 0.5   # 偏差超过阈值时以非零状态码退出
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# 将项目根目录添加到 Python 路径，确保能导入 app 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import geo_transforms
+from app.utils.gcj02_grid import (
+    DEFAULT_GRID_FILE, GRID_MAX_LAT, GRID_MAX_LNG, GRID_MIN_LAT, GRID_MIN_LNG, Gcj02OffsetGrid,
+    coordinate_transform_grid
+)
+
+EARTH_RADIUS_M = 6378137.0
+
+
+def _error_meters(lng_a, lat_a, lng_b, lat_b):
+    """小范围内的近似地面距离（米）"""
+    dlat = np.radians(lat_a - lat_b)
+    dlng = np.radians(lng_a - lng_b) * np.cos(np.radians(lat_b))
+    return EARTH_RADIUS_M * np.hypot(dlat, dlng)
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GCJ-02 偏移网格速度与精度报告')
+    parser.add_argument('--grid', default=DEFAULT_GRID_FILE, help='网格文件路径')
+    parser.add_argument('--points', type=int, default=1_000_000, help='随机点数量')
+    parser.add_argument('--seed', type=int, default=20240601, help='随机种子')
+    parser.add_argument('--max-error-m', type=float, default=None, help='允许的最大偏差（米）')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.grid):
+        print(f"未找到网格文件 {args.grid}，请先运行 scripts/build_gcj02_grid.py", file=sys.stderr)
+        return 1
+
+    grid = Gcj02OffsetGrid(args.grid)
+    rng = np.random.default_rng(args.seed)
+    lngs = rng.uniform(GRID_MIN_LNG + 1e-6, GRID_MAX_LNG - 1e-6, args.points)
+    lats = rng.uniform(GRID_MIN_LAT + 1e-6, GRID_MAX_LAT - 1e-6, args.points)
+
+    print(f"网格: {grid.n_lng} x {grid.n_lat}, 步长 {grid.step_lng} 度; 随机点: {args.points}")
+    print(f"{'转换':<18}{'解析(秒)':>10}{'网格(秒)':>10}{'加速比':>8}{'平均偏差(m)':>14}{'p99偏差(m)':>12}{'最大偏差(m)':>14}")
+
+    worst = 0.0
+    for from_sys, to_sys in (('WGS84', 'GCJ02'), ('GCJ02', 'WGS84'), ('BD09', 'WGS84'), ('WGS84', 'BD09')):
+        (exact_lng, exact_lat), t_exact = _timed(geo_transforms.coordinate_transform_batch, lngs, lats, from_sys, to_sys)
+        (grid_lng, grid_lat), t_grid = _timed(coordinate_transform_grid, lngs, lats, from_sys, to_sys, grid)
+        errors = _error_meters(grid_lng, grid_lat, exact_lng, exact_lat)
+        worst = max(worst, float(errors.max()))
+        print(
+            f"{from_sys + '->' + to_sys:<18}{t_exact:>10.3f}{t_grid:>10.3f}{t_exact / t_grid:>8.1f}"
+            f"{errors.mean():>14.4f}{np.percentile(errors, 99):>12.4f}{errors.max():>14.4f}"
+        )
+
+    if args.max_error_m is not None and worst > args.max_error_m:
+        print(f"\n最大偏差 {worst:.4f} 米超过阈值 {args.max_error_m} 米", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+网页正文提取的基准测试：对比旧实现（整页下载后用 BeautifulSoup(html.parser) 建树、多次 find 回退）
+与 app.utils.html_extract 的单次扫描提取器（按 16KB 分块输入，达到字节上限或 <article> 结束即停止）。
+
+页面取自 scripts/bench_data/html_pages/ 下保存的 HTML（可用 --pages 指定其他目录）。
+统计每页的 CPU 时间（time.process_time），并检查两种实现提取出的正文是否一致。
+
+注意：自带的页面是合成的，不是真实采集的网页。它们按公众号文章、GBK 编码门户新闻、论坛帖子、
+百科词条的大致结构拼接，填充了大量样式、脚本和重复段落，正文位置也是按提取器的查找规则放置的，
+因此在这些页面上得到的耗时降低和“正文一致”结论只能作为回归检查，不能代表真实网页。
+评估真实效果时，请在浏览器中将真实网页“另存为（仅 HTML）”到一个目录后用 --pages 指定，
+至少包括一篇微信公众号文章（mp.weixin.qq.com）和一个 GBK/GB2312 编码的门户新闻页，
+并确认“正文一致”一列在这些页面上均为“是”。
+
+用法：
+    python scripts/bench_html_extract.py
+    python scripts/bench_html_extract.py --pages /path/to/saved_pages --repeat 20 --max-bytes 262144
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+# 将项目根目录添加到 Python 路径，确保能导入 app 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_data')
+DEFAULT_PAGES_DIR = os.path.join(BENCH_DATA_DIR, 'html_pages')
+CHUNK_SIZE = 16 * 1024
+
+
+def legacy_extract(content: bytes) -> str:
+    """改造前 web_search_local._get_article_content 的解析部分。"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, 'html.parser')
+    for tag in soup(['script', 'style', 'iframe']):
+        tag.decompose()
+    article = (
+        soup.find('article') or
+        soup.find('div', id='js_content') or
+        soup.find('div', class_='rich_media_content') or
+        soup.find('div', class_=re.compile(r'(article|content|text|main)', re.I)) or
+        soup.find('div', id=re.compile(r'(article|content|text|main)', re.I))
+    )
+    if article:
+        text = article.get_text(' ', strip=True)
+    else:
+        text = soup.body.get_text(' ', strip=True) if soup.body else ''
+    text = re.sub(r"\s+", " ", text)
+    return text[:4000]
+
+
+def streaming_extract(content: bytes, max_bytes: int):
+    """按网络读取的方式分块输入新提取器，返回 (正文, 实际读取的字节数)。"""
+    import codecs
+
+    from app.utils import html_extract
+
+    extractor = html_extract.ArticleTextExtractor()
+    decoder = None
+    received = 0
+    for start in range(0, len(content), CHUNK_SIZE):
+        chunk = content[start:start + CHUNK_SIZE]
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(html_extract.sniff_encoding(chunk))(errors='replace')
+        extractor.feed(decoder.decode(chunk))
+        received += len(chunk)
+        if received >= max_bytes or extractor.done:
+            break
+    extractor.close()
+    return extractor.text(), received
+
+
+def _cpu_time(func, repeat):
+    func()  # 预热
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='网页正文提取基准测试')
+    parser.add_argument('--pages', default=DEFAULT_PAGES_DIR, help='保存的HTML页面目录')
+    parser.add_argument('--repeat', type=int, default=10, help='每个页面重复执行的次数')
+    parser.add_argument('--max-bytes', type=int, default=512 * 1024, help='新提取器的读取字节上限')
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.pages, '*.htm*')))
+    if not paths:
+        print(f"目录 {args.pages} 中没有 HTML 页面", file=sys.stderr)
+        return 1
+
+    print(f"{'页面':<28}{'大小(KB)':>10}{'读取(KB)':>10}{'旧(ms)':>10}{'新(ms)':>10}{'降低':>8}  正文一致")
+    total_legacy = total_new = 0.0
+    for path in paths:
+        with open(path, 'rb') as f:
+            content = f.read()
+        legacy_text = legacy_extract(content)
+        new_text, received = streaming_extract(content, args.max_bytes)
+        legacy_cpu = _cpu_time(lambda: legacy_extract(content), args.repeat)
+        new_cpu = _cpu_time(lambda: streaming_extract(content, args.max_bytes), args.repeat)
+        total_legacy += legacy_cpu
+        total_new += new_cpu
+        reduction = 1 - new_cpu / legacy_cpu if legacy_cpu > 0 else 0.0
+        same = '是' if legacy_text == new_text else f'否（{len(legacy_text)} / {len(new_text)} 字符）'
+        print(f"{os.path.basename(path):<28}{len(content) / 1024:>10.1f}{received / 1024:>10.1f}"
+              f"{legacy_cpu * 1000:>10.2f}{new_cpu * 1000:>10.2f}{reduction:>8.0%}  {same}")
+
+    if total_legacy > 0:
+        print(f"\n合计 CPU 时间: 旧 {total_legacy * 1000:.2f}ms -> 新 {total_new * 1000:.2f}ms，"
+              f"降低 {1 - total_new / total_legacy:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+从 jionlp 内置的行政区划数据生成 `app/data/admin_gazetteer.bin`。
+
+jionlp 版本升级或行政区划调整后重新运行本脚本：
+    python scripts/build_admin_gazetteer.py
+"""
+import os
+import sys
+
+# 将项目根目录添加到 Python 路径，确保能导入 app 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jionlp as jio
+
+from app.utils.admin_gazetteer import (
+    DEFAULT_GAZETTEER_FILE, LEVEL_PROVINCE, LEVEL_CITY, LEVEL_COUNTY, UNRESOLVABLE_CODE, pack_gazetteer
+)
+
+# 港澳台的下级行政区在 jionlp 中共用同一个 adcode，无法建立索引，仅以占位编码登记名称
+SKIPPED_PROVINCE_PREFIXES = ('71', '81', '82')
+# 开发区、新区等功能区（区县码末两位 >= 71）在 jionlp 中的解析结果不稳定，不纳入索引
+FUNCTIONAL_ZONE_MIN_SUFFIX = 71
+# 省直辖县级行政区的虚拟上级，jionlp 解析结果中 city 为 None，交由 jionlp 处理
+PSEUDO_CITY_NAMES = ('省直辖行政区划', '自治区直辖县级行政区划')
+# 不设区的地级市（东莞、中山等）下的虚拟区县，jionlp 解析结果中 county 为 None
+PSEUDO_COUNTY_NAMES = ('市直辖行政区划',)
+
+
+def _aliases(node: dict) -> list[str]:
+    alias = node.get('_alias') or []
+    if isinstance(alias, str):
+        alias = [alias]
+    return [a for a in alias if a and a != node['_full_name']]
+
+
+def _children(node: dict):
+    return [(name, child) for name, child in node.items() if not name.startswith('_')]
+
+
+def _changed_names(current_names: set) -> set:
+    """收集已撤并/更名的旧行政区划名称，这类名称需要 jionlp 的新旧转换逻辑。"""
+    changed = set()
+    for change in jio.china_location_change_loader():
+        for level_idx, old in enumerate(change['old_loc']):
+            if not old or not old[0] or old[0] == change['new_loc'][level_idx]:
+                continue
+            full_name, alias = old[0], (old[1] if len(old) > 1 else None)
+            changed.add((full_name, level_idx + 1))
+            if alias and alias not in current_names:
+                changed.add((alias, level_idx + 1))
+    return changed
+
+
+def build_entries():
+    name_entries = []
+    code_entries = []
+    seen_codes = set()
+    location_tree = jio.china_location_loader(detail=True)
+
+    def _add(node, level, parent_code):
+        code = int(node['_admin_code'])
+        if (code, level) in seen_codes:
+            print(f"跳过重复编码: {node['_full_name']} ({code}, level={level})", file=sys.stderr)
+            return False
+        seen_codes.add((code, level))
+        code_entries.append((code, level, parent_code, node['_full_name']))
+        name_entries.append((node['_full_name'], code, level, False))
+        for alias in _aliases(node):
+            name_entries.append((alias, code, level, True))
+        return True
+
+    def _add_unresolvable(node, level):
+        for name in [node['_full_name']] + _aliases(node):
+            name_entries.append((name, UNRESOLVABLE_CODE, level, False))
+
+    for _, province in _children(location_tree):
+        if province['_admin_code'].startswith(SKIPPED_PROVINCE_PREFIXES):
+            for _, city in _children(province):
+                for _, county in _children(city):
+                    _add_unresolvable(county, LEVEL_COUNTY)
+            continue
+        province_code = int(province['_admin_code'])
+        _add(province, LEVEL_PROVINCE, 0)
+
+        for city_name, city in _children(province):
+            if city_name in PSEUDO_CITY_NAMES:
+                for _, county in _children(city):
+                    _add_unresolvable(county, LEVEL_COUNTY)
+                continue
+            city_code = int(city['_admin_code'])
+            if not _add(city, LEVEL_CITY, province_code):
+                continue
+            for county_name, county in _children(city):
+                if county_name in PSEUDO_COUNTY_NAMES:
+                    _add_unresolvable(county, LEVEL_COUNTY)
+                    continue
+                if int(county['_admin_code']) % 100 >= FUNCTIONAL_ZONE_MIN_SUFFIX:
+                    _add_unresolvable(county, LEVEL_COUNTY)
+                    continue
+                _add(county, LEVEL_COUNTY, city_code)
+
+    # 旧名称与现行名称冲突时（如"澄江县"已改为"澄江市"），统一改为占位编码
+    current_names = {name for name, code, _, _ in name_entries if code != UNRESOLVABLE_CODE}
+    changed = _changed_names(current_names)
+    name_entries = [
+        (name, UNRESOLVABLE_CODE, level, False) if (name, level) in changed else (name, code, level, alias)
+        for name, code, level, alias in name_entries
+    ]
+    name_entries.extend((name, UNRESOLVABLE_CODE, level, False) for name, level in changed)
+
+    return name_entries, code_entries
+
+
+def main():
+    name_entries, code_entries = build_entries()
+    out_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_GAZETTEER_FILE
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, 'wb') as f:
+        f.write(pack_gazetteer(name_entries, code_entries))
+    print(f"已写入 {out_path}: {len(name_entries)} 个名称, {len(code_entries)} 个行政单元")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""
+生成 GCJ-02 偏移网格文件 `app/data/gcj02_offset_grid.bin`（供 app.utils.gcj02_grid 使用）。
+
+    python scripts/build_gcj02_grid.py              # 默认 0.02 度网格，约 61MB
+    python scripts/build_gcj02_grid.py --step 0.05  # 更小的文件，误差约增大为 6 倍
+"""
+import argparse
+import os
+import sys
+
+# 将项目根目录添加到 Python 路径，确保能导入 app 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.gcj02_grid import DEFAULT_GRID_FILE, DEFAULT_GRID_STEP, build_offset_grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成 GCJ-02 偏移网格文件')
+    parser.add_argument('--step', type=float, default=DEFAULT_GRID_STEP, help='网格步长（度）')
+    parser.add_argument('--output', default=DEFAULT_GRID_FILE, help='输出文件路径')
+    args = parser.parse_args()
+
+    header, offsets = build_offset_grid(args.step)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'wb') as f:
+        f.write(header)
+        f.write(offsets.tobytes(order='C'))
+    size_mb = os.path.getsize(args.output) / 1024 / 1024
+    print(f"已写入 {args.output}: {offsets.shape[2]} x {offsets.shape[1]} 个格点, {size_mb:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+网络情报句子筛选（app.utils.sentence_rank）的召回率与提示词缩减评估。
+
+对 scripts/bench_data/sentence_rank_fixtures.json 中的每条网页正文，按给定 token 预算选取句子，
+统计 relevant 中列出的定位相关句子被保留的比例（召回率），并与原先直接截取前 2500 字的做法比较
+送入LLM的 token 数。总召回率低于 --min-recall 时以非零状态码退出。
+
+自带的测试集是合成数据：模板化的无关填充句中插入少量定位相关句子，二者差异明显，
+因此在其上的召回率只用于发现明显的回归，不代表真实网页上的效果。评估真实效果时，
+请将搜狗搜索结果页的正文摘录并人工标注相关句子，按相同格式保存后通过 --fixtures 指定。
+
+用法：
+    python scripts/eval_sentence_rank.py
+    python scripts/eval_sentence_rank.py --budget 400 --min-recall 0.9
+"""
+import argparse
+import json
+import os
+import sys
+
+# 将项目根目录添加到 Python 路径，确保能导入 app 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_data')
+DEFAULT_FIXTURES_FILE = os.path.join(BENCH_DATA_DIR, 'sentence_rank_fixtures.json')
+# 改造前每个网页送入LLM的正文长度
+LEGACY_TRUNCATE_CHARS = 2500
+
+
+def main():
+    parser = argparse.ArgumentParser(description='网络情报句子筛选评估')
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES_FILE, help='测试集文件路径')
+    parser.add_argument('--budget', type=int, default=600, help='每个网页的 token 预算')
+    parser.add_argument('--min-recall', type=float, default=0.9, help='允许的最低总召回率')
+    args = parser.parse_args()
+
+    from app.utils import sentence_rank
+
+    with open(args.fixtures, 'r', encoding='utf-8') as f:
+        items = json.load(f)['items']
+
+    total_relevant = total_kept = 0
+    total_legacy_tokens = total_new_tokens = 0
+    print(f"{'地址':<30}{'召回':>8}{'原token':>10}{'新token':>10}")
+    for item in items:
+        selected = sentence_rank.select_relevant_text(item['address'], item['text'], args.budget)
+        kept = sum(1 for sentence in item['relevant'] if sentence in selected)
+        legacy_tokens = sentence_rank.estimate_tokens(item['text'][:LEGACY_TRUNCATE_CHARS])
+        new_tokens = sentence_rank.estimate_tokens(selected)
+        total_relevant += len(item['relevant'])
+        total_kept += kept
+        total_legacy_tokens += legacy_tokens
+        total_new_tokens += new_tokens
+        print(f"{item['address'][:28]:<30}{kept:>4}/{len(item['relevant']):<3}{legacy_tokens:>10}{new_tokens:>10}")
+
+    recall = total_kept / total_relevant if total_relevant else 1.0
+    reduction = 1 - total_new_tokens / total_legacy_tokens if total_legacy_tokens else 0.0
+    print(f"\n总召回率 {recall:.1%}（{total_kept}/{total_relevant}），"
+          f"提示词正文 token {total_legacy_tokens} -> {total_new_tokens}，减少 {reduction:.0%}")
+    if recall < args.min_recall:
+        print(f"召回率低于阈值 {args.min_recall:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
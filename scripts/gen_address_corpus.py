@@ -0,0 +1,155 @@
+"""
+生成地址处理基准测试语料 scripts/bench_data/address_corpus.json（合成数据）。
+
+语料不是真实采集的地址：从 jionlp 行政区划数据中随机抽取 240 个区县，按固定模板拼接
+“行政区 + 道路/门牌 + POI名称”（道路、POI名称取自下方词表，如“幸福巷232号”“人民医院”），
+并为每条地址生成 3-10 个高德POI结构的候选（约 70% 与地址同区县）及部分地理编码候选。
+随机种子固定，同一 jionlp 版本下重复运行得到相同的语料。
+
+语料只用于衡量 address_processing 热点函数的耗时，不能代表真实地址的分布；
+需要真实样本时请使用 scripts/fetch_poi_samples.py 采集。
+
+用法：
+    python scripts/gen_address_corpus.py
+    python scripts/gen_address_corpus.py --output /tmp/address_corpus.json --seed 1
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+BENCH_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_data')
+DEFAULT_OUTPUT_FILE = os.path.join(BENCH_DATA_DIR, 'address_corpus.json')
+DEFAULT_SEED = 20240601
+CORPUS_SIZE = 240
+
+ROADS = [
+    '人民', '解放', '中山', '建设', '文化', '新华', '胜利', '和平', '长江', '黄河', '朝阳', '光明', '东风', '滨江', '学府',
+    '天府', '迎宾', '工业', '科技', '春晖', '青年', '幸福', '育才', '金沙', '观音', '永安', '环城', '府前', '体育', '南湖',
+]
+ROAD_SUFFIXES = ['路', '大道', '街', '北路', '南路', '东路', '西路', '中路', '大街', '巷']
+POI_CORES = [
+    '万达广场', '人民医院', '第一中学', '实验小学', '中心医院', '汽车站', '火车站', '图书馆', '体育馆', '博物馆', '公园',
+    '步行街', '农贸市场', '科技园', '软件园', '工业园', '大酒店', '购物中心', '财富中心', '国际大厦', '花园小区',
+    '阳光小区', '锦绣家园', '中医院', '妇幼保健院', '市政府', '区政府', '派出所', '邮政局', '银行营业部', '老街', '古镇',
+    '湿地公园', '森林公园', '景区',
+]
+BRANCHES = ['', '', '', '东门', '西门', '南门', '北门', 'A座', 'B座', '1期', '2期', '分店', '(总店)', '停车场', '地下停车场']
+# 固定在语料中的地址后缀表，使结果不依赖本地 location_types 数据
+SUFFIXES = [
+    '省', '市', '区', '县', '镇', '乡', '村', '街道', '社区', '小区', '花园', '家园', '广场', '大厦', '中心', '公园', '景区',
+    '古镇', '老街', '市场', '医院', '中学', '小学', '学校', '大学', '学院', '图书馆', '体育馆', '博物馆', '车站', '汽车站',
+    '火车站', '酒店', '大酒店', '宾馆', '购物中心', '商场', '超市', '工业园', '科技园', '软件园', '产业园', '开发区', '园区',
+    '湿地公园', '森林公园', '历史文化街区', '街区', '步行街', '路', '大道', '街', '巷', '号', '栋', '座', '楼', '期', '分店',
+    '店', '营业部', '派出所', '政府', '委员会', '管理局', '邮政局', '停车场',
+]
+
+
+def _aliases(node):
+    alias = node.get('_alias')
+    alias = [alias] if isinstance(alias, str) else (alias or [])
+    return [a for a in alias if a]
+
+
+def load_county_units():
+    """返回所有区县 (省, 省别名, 市, 市别名, 区县, 区县别名, 行政区划代码)，不含港澳台与直辖虚拟层级。"""
+    import jionlp as jio
+
+    tree = jio.china_location_loader(detail=True)
+    units = []
+    for pn, p in tree.items():
+        if pn.startswith('_') or p['_admin_code'][:2] in ('71', '81', '82'):
+            continue
+        for cn, c in p.items():
+            if cn.startswith('_') or '直辖' in cn:
+                continue
+            for kn, k in c.items():
+                if kn.startswith('_') or '直辖' in kn:
+                    continue
+                units.append((pn, _aliases(p), cn, _aliases(c), kn, _aliases(k), k['_admin_code']))
+    return units
+
+
+def _admin_text(rng, unit, style):
+    pn, pal, cn, cal, kn, _, _ = unit
+    province = rng.choice(pal) if (style & 1 and pal) else pn
+    city = rng.choice(cal) if (style & 2 and cal) else cn
+    form = rng.randrange(5)
+    if form == 0:
+        return province + city + kn
+    if form == 1:
+        return city + kn
+    if form == 2:
+        return kn
+    if form == 3:
+        return province + kn
+    return city
+
+
+def build_corpus(seed=DEFAULT_SEED, size=CORPUS_SIZE):
+    rng = random.Random(seed)
+    units = load_county_units()
+    items = []
+    for unit in rng.sample(units, size):
+        pn, _, cn, _, kn, _, code = unit
+        road = rng.choice(ROADS) + rng.choice(ROAD_SUFFIXES)
+        core = rng.choice(ROADS) + rng.choice(POI_CORES)
+        kind = rng.randrange(4)
+        prefix = _admin_text(rng, unit, rng.randrange(4))
+        if kind == 0:
+            address = prefix + road + f"{rng.randint(1, 999)}号"
+        elif kind == 1:
+            address = prefix + core
+        elif kind == 2:
+            address = prefix + road + core
+        else:
+            address = core if rng.random() < 0.5 else kn + core
+
+        candidates = []
+        for _ in range(rng.randint(3, 10)):
+            cand_unit = unit if rng.random() < 0.7 else rng.choice(units)
+            name = (core if rng.random() < 0.5 else rng.choice(ROADS) + rng.choice(POI_CORES)) + rng.choice(BRANCHES)
+            cand_address = rng.choice(ROADS) + rng.choice(ROAD_SUFFIXES) + f"{rng.randint(1, 999)}号"
+            if rng.random() < 0.3:
+                cand_address = cand_unit[4] + cand_address
+            candidates.append({
+                'name': name, 'address': cand_address, 'pname': cand_unit[0], 'cityname': cand_unit[2],
+                'adname': cand_unit[4], 'adcode': cand_unit[6],
+            })
+        item = {'address': address, 'candidates': candidates}
+        if rng.random() < 0.3:
+            item['geocode_candidate'] = {
+                'formatted_address': pn + cn + kn + road + f"{rng.randint(1, 999)}号",
+                'province': pn, 'city': cn, 'district': kn, 'adcode': code,
+            }
+        items.append(item)
+
+    return {
+        'description': (
+            f'地址处理基准测试语料（合成数据，由 scripts/gen_address_corpus.py 以随机种子 {seed} 生成）：'
+            '基于 jionlp 行政区划数据按模板拼接的地址及高德POI结构的候选列表（含部分地理编码候选），'
+            '道路与POI名称为虚构，仅用于性能基准，请勿手工修改以保持结果可比。'
+        ),
+        'suffixes': sorted(set(SUFFIXES), key=lambda s: (-len(s), s)),
+        'items': items,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成地址处理基准测试语料（合成数据）')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_FILE, help='输出文件路径')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='随机种子')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.seed)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(corpus, f, ensure_ascii=False, indent=1)
+        f.write('\n')
+    print(f"已生成 {len(corpus['items'])} 条地址、"
+          f"{sum(len(item['candidates']) for item in corpus['items'])} 个候选 -> {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -74,6 +74,85 @@ export async function fetchAPI(url, options = {}) {
     }
 }
 
+/**
+ * POSTs JSON to a Server-Sent Events endpoint and dispatches events as they arrive.
+ * @param {string} url - The streaming endpoint.
+ * @param {object} payload - The JSON request body.
+ * @param {function(string, object):void} onEvent - Called with (eventName, data) for every event.
+ * @param {object} [options]
+ * @param {number[]} [options.silentStatuses] - HTTP statuses the caller handles itself (no toast is shown).
+ * @returns {Promise<object>} - Resolves with the data of the final "done" event.
+ *     Errors for non-2xx responses carry the HTTP status in `error.status`.
+ */
+export async function streamAPI(url, payload, onEvent = () => {}, { silentStatuses = [] } = {}) {
+    const csrfTokenElement = document.querySelector('meta[name="csrf-token"]');
+    const csrfToken = csrfTokenElement ? csrfTokenElement.getAttribute('content') : '';
+    const headers = {
+        'Accept': 'text/event-stream',
+        'Content-Type': 'application/json',
+        'X-Requested-With': 'XMLHttpRequest',
+    };
+    if (csrfToken) {
+        headers['X-CSRFToken'] = csrfToken;
+    }
+
+    try {
+        const response = await fetch(url, { method: 'POST', headers, body: JSON.stringify(payload) });
+        if (response.status === 401) {
+            showToast('请先登录', 'warning');
+            throw new Error('Unauthorized');
+        }
+        if (!response.ok) {
+            let errorData = {};
+            try {
+                errorData = await response.json();
+            } catch (e) {
+                errorData = { message: response.statusText || 'Network response was not ok' };
+            }
+            const httpError = new Error(errorData.message || 'An unknown error occurred.');
+            httpError.status = response.status;
+            throw httpError;
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder('utf-8');
+        let buffer = '';
+        let result = null;
+        const dispatch = (frame) => {
+            let event = 'message';
+            const dataLines = [];
+            frame.split('\n').forEach((line) => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+            });
+            if (!dataLines.length) return;
+            const data = JSON.parse(dataLines.join('\n'));
+            if (event === 'error') throw new Error(data.message || '服务器内部错误');
+            if (event === 'done') result = data;
+            onEvent(event, data);
+        };
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (value) buffer += decoder.decode(value, { stream: !done });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                dispatch(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+            }
+            if (done) break;
+        }
+        if (!result) throw new Error('响应流意外结束');
+        return result;
+    } catch (error) {
+        if (!silentStatuses.includes(error.status)) {
+            console.error('Streaming API call failed:', error);
+            showToast(`操作失败: ${error.message}`, 'danger');
+        }
+        throw error;
+    }
+}
+
 // Helper function to update user state
 function updateUserState(user) {
     if (user && typeof user.points !== 'undefined') {
@@ -1,5 +1,5 @@
 import { showToast, checkUserPoints } from './utils.js';
-import { fetchAPI } from './api.js';
+import { streamAPI } from './api.js';
 
 // 智能地址情报三步骤模块
 class WebIntelligenceManager {
@@ -204,11 +204,20 @@ class WebIntelligenceManager {
             btn.disabled = true;
             resultsDiv.style.display = 'none';
 
-            // 调用后端API
-            const data = await fetchAPI('/geocode/web_intelligence/search_collate', {
-                method: 'POST',
-                body: JSON.stringify({ original_address: this.currentAddress })
-            });
+            // 调用后端流式API：聚合结果每生成一句即显示
+            const streamedExcerpts = [];
+            const data = await streamAPI('/geocode/web_intelligence/search_collate_stream',
+                { original_address: this.currentAddress },
+                (event, payload) => {
+                    if (event === 'excerpt') {
+                        streamedExcerpts.push(payload);
+                        this.displayStep1Results({ collated_excerpts: streamedExcerpts });
+                    } else if (event === 'aggregate_incomplete') {
+                        // 汇总中途失败：已显示的行作废，最终结果改为未汇总的摘录
+                        streamedExcerpts.length = 0;
+                        showToast(payload.message || '汇总未完成', 'warning');
+                    }
+                });
 
             if (data.success) {
                 this.dossier = data.dossier;
@@ -290,15 +299,30 @@ class WebIntelligenceManager {
                 this.currentAddress = input.value.trim();
             }
 
-            const data = await fetchAPI('/geocode/web_intelligence/suggest_keywords', {
-                method: 'POST',
-                body: JSON.stringify({
-                    original_address: this.currentAddress,
-                    poi_candidates: this.poiCandidates,
-                    dossier: this.dossier,
-                    mismatch_reasons: (this.validationResult && this.validationResult.mismatch_reasons) ? this.validationResult.mismatch_reasons : []
-                })
-            });
+            // 调用后端流式API：每生成一条关键词建议即显示
+            const streamedSuggestions = [];
+            const dossierId = (this.dossier && this.dossier.dossier_id) || null;
+            const requestSuggestions = (inlineDossier) => streamAPI('/geocode/web_intelligence/suggest_keywords_stream', {
+                original_address: this.currentAddress,
+                poi_candidates: this.poiCandidates,
+                dossier_id: dossierId,
+                dossier: inlineDossier ? this.dossier : null,
+                mismatch_reasons: (this.validationResult && this.validationResult.mismatch_reasons) ? this.validationResult.mismatch_reasons : []
+            }, (event, payload) => {
+                if (event === 'suggestion') {
+                    streamedSuggestions.push(payload);
+                    this.displayStep3Results(streamedSuggestions);
+                }
+            }, { silentStatuses: dossierId ? [404] : [] });
+
+            // 服务端已保存档案时先只回传 id；档案已过期或不在本实例（404）时带上完整档案重试一次
+            let data;
+            try {
+                data = await requestSuggestions(!dossierId);
+            } catch (error) {
+                if (!(dossierId && error.status === 404 && this.dossier)) throw error;
+                data = await requestSuggestions(true);
+            }
 
             if (data.success) {
                 this.keywordSuggestions = data.keyword_suggestions;